@@ -0,0 +1,70 @@
+'''Compares extracting a table with per-cell WebDriver calls and with a single ``extract`` call
+
+Loads ``fixtures/large_table.html`` from a local HTTP server with ``--rows`` rows.
+
+Usage:
+    python benchmarks/bench_extract.py --browser chrome --rows 1000 --run-headless
+'''
+import argparse
+import time
+
+from selenium.webdriver.common.by import By
+
+from selenium_extensions.core import SeleniumDriver
+
+from server import FixtureServer
+from suite import count_round_trips
+
+ROW_LOCATOR = (By.CSS_SELECTOR, 'tr.product')
+FIELDS = {
+    'id': (None, 'data-id'),
+    'name': 'td.name',
+    'url': ('td.name a', 'href'),
+    'price': 'td.price',
+    'stock': 'td.stock',
+}
+
+
+def naive(driver):
+    records = []
+    for row in driver.find_elements(*ROW_LOCATOR):
+        name = row.find_element(By.CSS_SELECTOR, 'td.name')
+        records.append({
+            'id': row.get_attribute('data-id'),
+            'name': name.text,
+            'url': name.find_element(By.TAG_NAME, 'a').get_attribute('href'),
+            'price': row.find_element(By.CSS_SELECTOR, 'td.price').text,
+            'stock': row.find_element(By.CSS_SELECTOR, 'td.stock').text,
+        })
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--browser', default='chrome')
+    parser.add_argument('--executable-path', default=None)
+    parser.add_argument('--run-headless', action='store_true')
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--chunk-size', type=int, default=500)
+    args = parser.parse_args()
+
+    bot = SeleniumDriver(browser=args.browser, executable_path=args.executable_path,
+                         run_headless=args.run_headless)
+    try:
+        with FixtureServer() as server:
+            bot.driver.get(server.url('large_table.html?rows={}'.format(args.rows)))
+            counter = count_round_trips(bot.driver)
+            for name, run in (('naive', lambda: naive(bot.driver)),
+                              ('extract', lambda: bot.extract(ROW_LOCATOR, FIELDS)),
+                              ('chunked', lambda: list(bot.iter_extract(ROW_LOCATOR, FIELDS, args.chunk_size)))):
+                counter['round_trips'] = 0
+                start = time.time()
+                records = run()
+                print('{:<8} {:6d} rows in {:7.3f}s, {:6d} round-trips'.format(
+                    name, len(records), time.time() - start, counter['round_trips']))
+    finally:
+        bot.shut_down()
+
+
+if __name__ == '__main__':
+    main()
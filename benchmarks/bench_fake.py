@@ -0,0 +1,75 @@
+'''Measures throughput of the ``core`` helpers against the fake in-process browser
+
+No browser is launched, so the numbers are the overhead of ``selenium_extensions`` and Selenium itself plus ``--latency`` simulated seconds per WebDriver command. Pages are ``fixtures/page_variants.html`` and a generated table and form.
+
+Usage:
+    python benchmarks/bench_fake.py --runs 2000
+    python benchmarks/bench_fake.py --runs 200 --latency 0.001
+'''
+import argparse
+import os
+import time
+
+from selenium.webdriver.common.by import By
+
+from selenium_extensions.core import SeleniumDriver
+
+from suite import count_round_trips
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+VARIANTS = 'https://fake.test/page_variants.html'
+TABLE = 'https://fake.test/table.html'
+FORM = 'https://fake.test/form.html'
+
+
+def table(rows):
+    return '<table>{}</table>'.format(''.join(
+        '<tr class="product" data-id="{0}"><td class="name">Product {0}</td><td class="price">{0}.99</td></tr>'.format(i)
+        for i in range(rows)))
+
+
+def form(fields):
+    return '<form action="/done">{}<button id="submit">Submit</button></form>'.format(''.join(
+        '<input id="field-{0}" name="field-{0}">'.format(i) for i in range(fields)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0)
+    args = parser.parse_args()
+
+    with open(os.path.join(FIXTURES, 'page_variants.html')) as fixture:
+        pages = {VARIANTS: fixture.read(), TABLE: table(500), FORM: form(30)}
+    bot = SeleniumDriver(browser='fake', pages=pages, latency=args.latency)
+    counter = count_round_trips(bot.driver)
+    fields = [(By.ID, 'field-{}'.format(i)) for i in range(30)]
+    cases = [
+        (VARIANTS, 'element_is_present[present]', lambda: bot.element_is_present((By.CLASS_NAME, 'result'))),
+        (VARIANTS, 'element_is_present[absent,in_page]', lambda: bot.element_is_present(
+            (By.ID, 'missing'), waiting_time=0, in_page=True)),
+        (VARIANTS, 'elements_are_present[20]', lambda: bot.elements_are_present(
+            [(By.CLASS_NAME, 'result'), (By.ID, 'missing')] * 10)),
+        (VARIANTS, 'click_on_element', lambda: bot.click_on_element((By.CLASS_NAME, 'pagination-next'))),
+        (FORM, 'populate_text_field', lambda: bot.populate_text_field((By.ID, 'field-0'), 'value')),
+        (FORM, 'run_batch[30]', lambda: bot.run_batch([(locator, 'fill', 'value') for locator in fields])),
+        (TABLE, 'extract[500]', lambda: bot.extract(
+            (By.CSS_SELECTOR, 'tr.product'), {'id': (None, 'data-id'), 'name': 'td.name', 'price': 'td.price'})),
+    ]
+    try:
+        for url, name, action in cases:
+            bot.driver.get(url)
+            runs = max(args.runs // 50, 1) if name.startswith('extract') else args.runs
+            counter['round_trips'] = 0
+            start = time.perf_counter()
+            for _ in range(runs):
+                action()
+            elapsed = time.perf_counter() - start
+            print('{:<36} {:10.0f} ops/s  {:5.1f} round-trips/op'.format(
+                name, runs / elapsed, counter['round_trips'] / runs))
+    finally:
+        bot.shut_down()
+
+
+if __name__ == '__main__':
+    main()
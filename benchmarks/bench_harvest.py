@@ -0,0 +1,66 @@
+'''Compares harvesting an infinite feed with ``harvest`` and with a naive scroll-sleep-rescrape loop
+
+Loads ``fixtures/infinite_feed.html`` from a local HTTP server.
+
+Usage:
+    python benchmarks/bench_harvest.py --browser chrome --total 500 --run-headless
+'''
+import argparse
+import time
+
+from selenium.webdriver.common.by import By
+
+from selenium_extensions.core import SeleniumDriver
+
+from server import FixtureServer
+
+POST_LOCATOR = (By.CSS_SELECTOR, 'article.post')
+
+
+def naive(bot, sleep):
+    '''Scrolls, sleeps and re-reads the whole feed until it stops growing'''
+    posts = {}
+    while True:
+        count = len(posts)
+        bot.driver.execute_script('window.scrollTo(0, document.body.scrollHeight);')
+        time.sleep(sleep)
+        for element in bot.driver.find_elements(*POST_LOCATOR):
+            post_id = element.get_attribute('data-id')
+            if post_id not in posts:
+                posts[post_id] = element.find_element(By.TAG_NAME, 'h2').text
+        if len(posts) == count:
+            return posts
+
+
+def harvested(bot, idle_timeout):
+    return {post['id']: post['title'] for post in bot.harvest(
+        POST_LOCATOR, fields={'id': (None, 'data-id'), 'title': 'h2'},
+        key='id', idle_timeout=idle_timeout)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--browser', default='chrome')
+    parser.add_argument('--executable-path', default=None)
+    parser.add_argument('--run-headless', action='store_true')
+    parser.add_argument('--total', type=int, default=500)
+    parser.add_argument('--idle', type=float, default=1, help='idle timeout / sleep between scrolls in seconds')
+    args = parser.parse_args()
+
+    bot = SeleniumDriver(browser=args.browser, executable_path=args.executable_path,
+                         run_headless=args.run_headless)
+    try:
+        with FixtureServer() as server:
+            url = server.url('infinite_feed.html?total={}'.format(args.total))
+            for name, run in (('naive', lambda: naive(bot, args.idle)),
+                              ('harvest', lambda: harvested(bot, args.idle))):
+                bot.driver.get(url)
+                start = time.time()
+                posts = run()
+                print('{:<8} {:5d} posts in {:.3f}s'.format(name, len(posts), time.time() - start))
+    finally:
+        bot.shut_down()
+
+
+if __name__ == '__main__':
+    main()
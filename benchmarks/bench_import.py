@@ -0,0 +1,100 @@
+'''Measures import time of ``selenium_extensions`` modules in fresh interpreters and checks they stay lazy
+
+Every module is imported ``--runs`` times, each time in a new Python process, and the time of the import statement itself is reported - the interpreter startup isn't included. With ``--check`` the script exits with status 1 if a module of ``CHECKED`` imports a module it has to leave to the first use (see ``LAZY``) or if ``selenium_extensions.core`` takes longer than ``--budget`` milliseconds, so it can be used in CI. Results are written in the format of ``suite.py``, so ``compare.py`` can compare them between versions.
+
+Usage:
+    python benchmarks/bench_import.py --runs 20 --check
+    python benchmarks/bench_import.py --output imports-0.1.2.json
+'''
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from collections import OrderedDict
+
+from suite import summarize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = [
+    'selenium_extensions',
+    'selenium_extensions.helpers',
+    'selenium_extensions.drivers',
+    'selenium_extensions.core',
+    'selenium_extensions.runner',
+    'selenium_extensions.pool',
+    'selenium_extensions.fake',
+    'selenium_extensions.hybrid',
+]
+# Modules that importing selenium_extensions.core or the driver factories must leave to the first use
+LAZY = ('selenium.webdriver', 'pyvirtualdisplay', 'selenium_extensions.fake', 'selenium_extensions.profiles',
+        'html.parser', 'zipfile', 'logging')
+CHECKED = ('selenium_extensions', 'selenium_extensions.helpers', 'selenium_extensions.drivers',
+           'selenium_extensions.core')
+PROBE = '''
+import json, sys, time
+before = set(sys.modules)
+start = time.perf_counter()
+import {}
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed, sorted(set(sys.modules) - before)]))
+'''
+
+
+def probe(module):
+    '''Imports ``module`` in a new interpreter, returns the import time and the newly imported modules'''
+    output = subprocess.check_output([sys.executable, '-c', PROBE.format(module)], cwd=ROOT)
+    return json.loads(output.decode())
+
+
+def lazy_violations(imported):
+    '''Returns the modules of ``LAZY`` that are among ``imported`` themselves or through their submodules'''
+    return [lazy for lazy in LAZY if any(name == lazy or name.startswith(lazy + '.') for name in imported)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--check', action='store_true', help='exit with status 1 on a lazy import or budget violation')
+    parser.add_argument('--budget', type=float, default=100, help='import time budget of core in milliseconds')
+    parser.add_argument('--output', default=None, help='file to write the JSON results to')
+    args = parser.parse_args()
+
+    results = OrderedDict()
+    failures = []
+    for module in MODULES:
+        latencies = []
+        for _ in range(args.runs):
+            elapsed, imported = probe(module)
+            latencies.append(elapsed)
+        results['import.' + module] = summarize(latencies, [0] * len(latencies))
+        print('{:<40} median {:7.1f} ms  {:4d} modules'.format(
+            module, results['import.' + module]['median'] * 1000, len(imported)), file=sys.stderr)
+        if module in CHECKED:
+            violations = lazy_violations(imported)
+            if violations:
+                failures.append('{} imports {}'.format(module, ', '.join(violations)))
+    core = results['import.selenium_extensions.core']['median'] * 1000
+    if core > args.budget:
+        failures.append('selenium_extensions.core takes {:.1f} ms, the budget is {:.0f} ms'.format(core, args.budget))
+
+    if args.output:
+        import selenium_extensions
+
+        report = OrderedDict([
+            ('selenium_extensions', selenium_extensions.__version__),
+            ('python', platform.python_version()),
+            ('platform', platform.platform()),
+            ('results', results),
+        ])
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    for failure in failures:
+        print('REGRESSION: ' + failure, file=sys.stderr)
+    if args.check and failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
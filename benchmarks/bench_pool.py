@@ -0,0 +1,45 @@
+'''Compares time-to-first-``get`` of a freshly launched driver and a driver leased from ``DriverPool``
+
+Usage:
+    python benchmarks/bench_pool.py --browser chrome --runs 5 --run-headless
+'''
+import argparse
+import time
+
+from selenium_extensions.core import SeleniumDriver
+from selenium_extensions.pool import DriverPool
+
+
+def time_to_first_get(url, **bot_options):
+    start = time.time()
+    bot = SeleniumDriver(**bot_options)
+    bot.driver.get(url)
+    elapsed = time.time() - start
+    bot.shut_down()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--browser', default='chrome')
+    parser.add_argument('--executable-path', default=None)
+    parser.add_argument('--run-headless', action='store_true')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--url', default='data:text/html,<p>benchmark</p>')
+    args = parser.parse_args()
+    driver_options = {'executable_path': args.executable_path,
+                      'run_headless': args.run_headless}
+
+    cold = [time_to_first_get(args.url, browser=args.browser, **driver_options)
+            for _ in range(args.runs)]
+    with DriverPool(size=1, browser=args.browser, **driver_options) as pool:
+        warm = [time_to_first_get(args.url, pool=pool)
+                for _ in range(args.runs)]
+
+    for name, timings in (('cold', cold), ('pool', warm)):
+        print('{:<5} min {:.3f}s  avg {:.3f}s  max {:.3f}s'.format(
+            name, min(timings), sum(timings) / len(timings), max(timings)))
+
+
+if __name__ == '__main__':
+    main()
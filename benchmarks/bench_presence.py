@@ -0,0 +1,56 @@
+'''Compares classifying a page with an ``element_is_present`` loop and with a single ``elements_are_present`` call
+
+Loads ``fixtures/page_variants.html`` from a local HTTP server and checks ``--locators`` locators of which only a few are present.
+
+Usage:
+    python benchmarks/bench_presence.py --browser chrome --locators 20 --run-headless
+'''
+import argparse
+import time
+
+from selenium.webdriver.common.by import By
+
+from selenium_extensions.core import SeleniumDriver
+
+from server import FixtureServer
+from suite import count_round_trips
+
+
+def measure(counter, check):
+    counter['round_trips'] = 0
+    start = time.time()
+    check()
+    return time.time() - start, counter['round_trips']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--browser', default='chrome')
+    parser.add_argument('--executable-path', default=None)
+    parser.add_argument('--run-headless', action='store_true')
+    parser.add_argument('--locators', type=int, default=20)
+    parser.add_argument('--waiting-time', type=float, default=2)
+    args = parser.parse_args()
+
+    locators = [(By.ID, 'search-results'), (By.CLASS_NAME, 'result'),
+                (By.LINK_TEXT, 'Next page')]
+    locators += [(By.ID, 'missing-{}'.format(i)) for i in range(args.locators - len(locators))]
+
+    bot = SeleniumDriver(browser=args.browser, executable_path=args.executable_path,
+                         run_headless=args.run_headless)
+    try:
+        with FixtureServer() as server:
+            bot.driver.get(server.url('page_variants.html'))
+            counter = count_round_trips(bot.driver)
+            loop = measure(counter, lambda: [bot.element_is_present(locator, args.waiting_time)
+                                             for locator in locators])
+            bulk = measure(counter, lambda: bot.elements_are_present(locators))
+            first = measure(counter, lambda: bot.wait_for_any_element(locators, args.waiting_time))
+        for name, (elapsed, round_trips) in (('loop', loop), ('bulk', bulk), ('any_of', first)):
+            print('{:<7} {:8.3f}s  {:5d} round-trips'.format(name, elapsed, round_trips))
+    finally:
+        bot.shut_down()
+
+
+if __name__ == '__main__':
+    main()
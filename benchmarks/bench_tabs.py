@@ -0,0 +1,116 @@
+'''Compares one browser per concurrent task with tabs of a single browser shared through ``TabPool``
+
+Both modes process the same pages with ``--workers`` concurrent bots: either every bot launches its own browser, or every bot drives a tab of one browser. Reports the launch time, the throughput and the memory of the browser processes. Real browsers open ``fixtures/delayed_element.html`` from a local HTTP server and wait for its delayed element; the fake browser, which has no processes to measure, loads every page for ``--page-load-time`` milliseconds.
+
+Usage:
+    python benchmarks/bench_tabs.py --browser chrome --workers 4 --pages 40 --run-headless
+    python benchmarks/bench_tabs.py --browser fake --workers 4 --pages 40 --page-load-time 300
+'''
+import argparse
+import threading
+import time
+from contextlib import ExitStack
+
+from selenium.webdriver.common.by import By
+
+from selenium_extensions.core import SeleniumDriver
+from selenium_extensions.tabs import TabPool
+
+from server import FixtureServer
+
+LOCATOR = (By.ID, 'delayed')
+
+
+class PageBot(SeleniumDriver):
+
+    def process_item(self, url):
+        self.driver.get(url)
+        self.wait_for_element_to_be_present(LOCATOR, waiting_time=10, in_page=True)
+        return self.driver.find_element(*LOCATOR).text
+
+
+def run_browsers(urls, workers, **bot_options):
+    '''Processes ``urls`` with ``workers`` bots with a browser each, returns launch time, processing time and RSS'''
+    start = time.time()
+    bots = [None] * workers
+
+    def launch(index):
+        bots[index] = PageBot(**bot_options)
+
+    threads = [threading.Thread(target=launch, args=(index,)) for index in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    launched = time.time() - start
+    items = iter(urls)
+    lock = threading.Lock()
+
+    def work(bot):
+        while True:
+            with lock:
+                url = next(items, None)
+            if url is None:
+                return
+            bot.process_item(url)
+
+    try:
+        start = time.time()
+        threads = [threading.Thread(target=work, args=(bot,)) for bot in bots]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        processed = time.time() - start
+        rss = sum(bot.resource_usage().rss for bot in bots)
+    finally:
+        for bot in bots:
+            bot.shut_down()
+    return launched, processed, rss
+
+
+def run_tabs(urls, workers, browser, **driver_options):
+    '''Processes ``urls`` with ``workers`` bots on tabs of one browser, returns launch time, processing time and RSS'''
+    start = time.time()
+    with TabPool(size=workers, browser=browser, **driver_options) as pool:
+        launched = time.time() - start
+        start = time.time()
+        for result in pool.run(PageBot, urls):
+            if result.error is not None:
+                raise RuntimeError(result.error)
+        processed = time.time() - start
+        rss = pool.resource_usage().rss
+    return launched, processed, rss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--browser', default='chrome')
+    parser.add_argument('--executable-path', default=None)
+    parser.add_argument('--run-headless', action='store_true')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--pages', type=int, default=40)
+    parser.add_argument('--delay', type=int, default=300, help='delay of the element in milliseconds')
+    parser.add_argument('--page-load-time', type=int, default=300, help='page load time of the fake browser in milliseconds')
+    args = parser.parse_args()
+
+    with ExitStack() as stack:
+        if args.browser == 'fake':
+            html = '<div id="container"><button id="delayed">Loaded</button></div>'
+            urls = ['https://fake.test/{}'.format(page) for page in range(args.pages)]
+            driver_options = {'pages': {url: html for url in urls}, 'page_load_time': args.page_load_time / 1000}
+        else:
+            server = stack.enter_context(FixtureServer())
+            urls = [server.url('delayed_element.html?delay={}&page={}'.format(args.delay, page))
+                    for page in range(args.pages)]
+            driver_options = {'executable_path': args.executable_path, 'run_headless': args.run_headless}
+        results = (('browsers', run_browsers(urls, args.workers, browser=args.browser, **driver_options)),
+                   ('tabs', run_tabs(urls, args.workers, args.browser, **driver_options)))
+
+    for name, (launched, processed, rss) in results:
+        print('{:<8} launch {:6.2f}s  {:6.2f} pages/s  rss {}'.format(
+            name, launched, args.pages / processed, '{:.0f}MB'.format(rss / 2 ** 20) if rss else 'n/a'))
+
+
+if __name__ == '__main__':
+    main()
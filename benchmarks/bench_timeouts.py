@@ -0,0 +1,65 @@
+'''Measures the time a page-classification loop spends waiting with fixed and with adaptive timeouts
+
+Runs against the fake in-process browser. Every page shows its content ``--delay`` milliseconds after it has been opened, and the bot checks it for a captcha that appears with the content on every ``--captcha-every``-th page - on the rest it's a negative check that waits for the whole timeout. With the fixed 2 seconds every negative check costs 2 seconds; adaptive timeouts learn how long the captcha takes to appear and stop waiting after that.
+
+Usage:
+    python benchmarks/bench_timeouts.py --pages 50 --delay 100
+'''
+import argparse
+import time
+
+from selenium.webdriver.common.by import By
+
+from selenium_extensions.core import SeleniumDriver
+from selenium_extensions.timeouts import AdaptiveTimeouts
+
+URL = 'https://fake.test/item'
+CONTENT = (By.ID, 'content')
+CAPTCHA = (By.ID, 'captcha')
+
+
+def show_content(browser):
+    browser.find(By.ID, 'root')[0].append('<p id="content">Item</p>')
+
+
+def show_captcha(browser):
+    browser.find(By.ID, 'root')[0].append('<p id="content">Item</p><div id="captcha"></div>')
+
+
+def crawl(bot, pages, delay, captcha_every):
+    '''Opens ``pages`` pages, waits for their content and checks them for a captcha, returns the elapsed time'''
+    fake_browser = bot.driver.fake_browser
+    start = time.time()
+    for page in range(pages):
+        bot.driver.get(URL)
+        fake_browser.schedule(delay, show_captcha if page % captcha_every == 0 else show_content)
+        bot.wait_for_element_to_be_present(CONTENT, in_page=True)
+        bot.element_is_present(CAPTCHA, in_page=True)
+    return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=50)
+    parser.add_argument('--delay', type=int, default=100, help='delay of the content in milliseconds')
+    parser.add_argument('--captcha-every', type=int, default=4, help='every how many pages the captcha appears')
+    args = parser.parse_args()
+
+    pages = {URL: '<div id="root"></div>'}
+    timeouts = AdaptiveTimeouts(min_samples=5)
+    for name, options in (('fixed', {}), ('adaptive', {'adaptive_timeouts': timeouts})):
+        bot = SeleniumDriver(browser='fake', pages=pages, **options)
+        try:
+            elapsed = crawl(bot, args.pages, args.delay / 1000, args.captcha_every)
+        finally:
+            bot.shut_down()
+        print('{:<8} {:7.2f}s for {} pages'.format(name, elapsed, args.pages))
+    report = timeouts.report()
+    print('adaptive waits: {adaptive_waits}, timeouts: {timeouts}, rescued: {rescued}, '
+          'saved: {saved_seconds:.2f}s'.format(**report))
+    for learned in report['learned']:
+        print('  {domain} {locator}: {timeout:.2f}s from {samples} waits'.format(**learned))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+'''Measures how late element waits return after the element actually appears
+
+Loads ``fixtures/delayed_element.html`` from a local HTTP server and compares ``WebDriverWait`` polling with the in-page ``MutationObserver`` mode.
+
+Usage:
+    python benchmarks/bench_waits.py --browser chrome --runs 10 --run-headless
+'''
+import argparse
+import time
+
+from selenium.webdriver.common.by import By
+
+from selenium_extensions.core import SeleniumDriver
+
+from server import FixtureServer
+
+LOCATOR = (By.ID, 'delayed')
+
+
+def measure(bot, url, delay, in_page):
+    bot.driver.get(url)
+    # The delay starts counting once the page script ran, which is before ``get`` returns
+    start = time.time()
+    bot.wait_for_element_to_be_clickable(LOCATOR, waiting_time=10, in_page=in_page)
+    return time.time() - start - delay
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--browser', default='chrome')
+    parser.add_argument('--executable-path', default=None)
+    parser.add_argument('--run-headless', action='store_true')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--delay', type=int, default=700, help='delay in milliseconds')
+    args = parser.parse_args()
+
+    bot = SeleniumDriver(browser=args.browser, executable_path=args.executable_path,
+                         run_headless=args.run_headless)
+    try:
+        with FixtureServer() as server:
+            url = server.url('delayed_element.html?delay={}'.format(args.delay))
+            for name, in_page in (('polling', False), ('in_page', True)):
+                latencies = [measure(bot, url, args.delay / 1000, in_page)
+                             for _ in range(args.runs)]
+                print('{:<8} extra latency: min {:.3f}s  avg {:.3f}s  max {:.3f}s'.format(
+                    name, min(latencies), sum(latencies) / len(latencies), max(latencies)))
+    finally:
+        bot.shut_down()
+
+
+if __name__ == '__main__':
+    main()
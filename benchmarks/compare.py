@@ -0,0 +1,40 @@
+'''Compares two result files written by ``suite.py`` and reports cases that got slower
+
+Exits with status 1 if any case regressed by more than ``--threshold``, so it can be used in CI.
+
+Usage:
+    python benchmarks/compare.py results-0.1.1.json results-0.1.2.json --threshold 0.2
+'''
+import argparse
+import json
+import sys
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--metric', default='median', choices=['min', 'median', 'mean', 'p95', 'max'])
+    parser.add_argument('--threshold', type=float, default=0.2, help='relative slowdown treated as a regression')
+    args = parser.parse_args()
+
+    with open(args.baseline) as baseline_file, open(args.current) as current_file:
+        baseline, current = json.load(baseline_file), json.load(current_file)
+    print('{:<55} {:>10} {:>10} {:>8} {:>14}'.format('case', 'baseline', 'current', 'change', 'round-trips'))
+    regressions = 0
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            print('{:<55} {:>10} {:>10.4f}'.format(name, 'new', result[args.metric]))
+            continue
+        change = result[args.metric] / before[args.metric] - 1 if before[args.metric] else 0
+        trips = '{:.0f} -> {:.0f}'.format(before['round_trips'], result['round_trips'])
+        regressed = change > args.threshold or result['round_trips'] > before['round_trips']
+        regressions += regressed
+        print('{:<55} {:>10.4f} {:>10.4f} {:>+7.0%} {:>14}{}'.format(
+            name, before[args.metric], result[args.metric], change, trips, '  REGRESSION' if regressed else ''))
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
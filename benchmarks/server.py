@@ -0,0 +1,41 @@
+'''Serves ``benchmarks/fixtures`` over HTTP on localhost from a background thread'''
+import os
+import threading
+from functools import partial
+from http.server import HTTPServer
+from http.server import SimpleHTTPRequestHandler
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'fixtures')
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer:
+    '''Context manager that serves fixtures on a free localhost port
+
+    Example:
+        ::
+
+            with FixtureServer() as server:
+                driver.get(server.url('delayed_element.html?delay=300'))
+    '''
+
+    def __init__(self, directory=FIXTURES_DIR):
+        handler = partial(_QuietHandler, directory=directory)
+        self._server = HTTPServer(('127.0.0.1', 0), handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def url(self, path):
+        return 'http://127.0.0.1:{}/{}'.format(self._server.server_port, path)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,229 @@
+'''Benchmarks every helper of ``core`` and ``helpers`` and the startup of the driver factories
+
+Serves ``fixtures`` from a local HTTP server and measures latency and WebDriver round-trips of every case. Results are written as JSON, so runs of different versions can be compared with ``compare.py``.
+
+Usage:
+    python benchmarks/suite.py --browser chrome --run-headless --output results-0.1.2.json
+    python benchmarks/suite.py --browser firefox --run-headless --only startup,wait_for
+    python benchmarks/compare.py results-0.1.1.json results-0.1.2.json
+'''
+import argparse
+import json
+import platform
+import sys
+import time
+from collections import OrderedDict
+
+import selenium
+from selenium.webdriver.common.by import By
+
+import selenium_extensions
+from selenium_extensions import core
+from selenium_extensions import helpers
+from selenium_extensions.drivers import create_driver
+from selenium_extensions.extraction import extract
+from selenium_extensions.extraction import iter_extract
+from selenium_extensions.hooks import add_command_hook
+from selenium_extensions.scrolling import harvest
+
+from server import FixtureServer
+
+PRESENT = (By.CLASS_NAME, 'result')
+ABSENT = (By.ID, 'missing')
+DELAYED = (By.ID, 'delayed')
+ROWS = (By.CSS_SELECTOR, 'tr.product')
+ROW_FIELDS = {'id': (None, 'data-id'), 'name': 'td.name', 'price': 'td.price'}
+
+
+def summarize(latencies, round_trips):
+    latencies = sorted(latencies)
+    return OrderedDict([
+        ('runs', len(latencies)),
+        ('min', latencies[0]),
+        ('median', latencies[len(latencies) // 2]),
+        ('mean', sum(latencies) / len(latencies)),
+        ('p95', latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)]),
+        ('max', latencies[-1]),
+        ('round_trips', sum(round_trips) / len(round_trips)),
+    ])
+
+
+def count_round_trips(driver):
+    '''Counts every WebDriver command ``driver`` executes with a command hook, returns the counter'''
+    counter = {'round_trips': 0}
+
+    def count(execute, command, params):
+        counter['round_trips'] += 1
+        return execute(command, params)
+
+    add_command_hook(driver, count)
+    return counter
+
+
+class Suite:
+    '''Runs the cases matching ``only`` and collects their results'''
+
+    def __init__(self, runs, only=None):
+        self.runs = runs
+        self.only = only
+        self.results = OrderedDict()
+        self._counters = {}
+
+    def counter(self, driver):
+        '''Returns the round-trip counter of ``driver``, hooking into it on first use'''
+        if driver not in self._counters:
+            self._counters[driver] = count_round_trips(driver)
+        return self._counters[driver]
+
+    def selected(self, name):
+        return not self.only or any(pattern in name for pattern in self.only)
+
+    def measure(self, name, action, driver=None, setup=None, runs=None):
+        '''Times ``action`` ``runs`` times, ``setup`` runs before every call and isn't timed'''
+        if not self.selected(name):
+            return
+        counter = self.counter(driver) if driver is not None else {'round_trips': 0}
+        latencies, round_trips = [], []
+        for _ in range(runs or self.runs):
+            if setup is not None:
+                setup()
+            counter['round_trips'] = 0
+            start = time.perf_counter()
+            action()
+            latencies.append(time.perf_counter() - start)
+            round_trips.append(counter['round_trips'])
+        self.results[name] = summarize(latencies, round_trips)
+        print('{:<55} median {:8.4f}s  round-trips {:7.1f}'.format(
+            name, self.results[name]['median'], self.results[name]['round_trips']), file=sys.stderr)
+
+
+def bench_startup(suite, options):
+    '''Cold startup is the first launch in the process, warm ones reuse the OS caches it filled'''
+    drivers = []
+    suite.measure('startup.{}.cold'.format(options['browser']),
+                  lambda: drivers.append(create_driver(**options)), runs=1)
+    suite.measure('startup.{}.warm'.format(options['browser']),
+                  lambda: drivers.append(create_driver(**options)))
+    if drivers:
+        suite.measure('core.shut_down', lambda: core.shut_down(drivers.pop()), runs=len(drivers))
+
+
+def bench_core(suite, driver, server):
+    def load(path):
+        return lambda: driver.get(server.url(path))
+
+    suite.measure('driver.get[large_table]', load('large_table.html?rows=2000'), driver)
+    suite.measure('core.navigate[interactive]', lambda: core.navigate(
+        driver, server.url('large_table.html?rows=2000'), ready_state='interactive'), driver)
+    suite.measure('core.navigate[wait_for]', lambda: core.navigate(
+        driver, server.url('delayed_element.html?delay=100'), wait_for=DELAYED), driver)
+    suite.measure('core.reset_state', lambda: core.reset_state(driver), driver,
+                  setup=load('page_variants.html'))
+
+    load('page_variants.html')()
+    suite.measure('core.element_is_present[present]', lambda: core.element_is_present(driver, PRESENT), driver)
+    suite.measure('core.element_is_present[absent]', lambda: core.element_is_present(
+        driver, ABSENT, waiting_time=0.5), driver)
+    suite.measure('core.element_is_present[absent,in_page]', lambda: core.element_is_present(
+        driver, ABSENT, waiting_time=0.5, in_page=True), driver)
+    locators = [PRESENT, ABSENT] * 10
+    suite.measure('core.count_elements[20]', lambda: core.count_elements(driver, locators), driver)
+    suite.measure('core.elements_are_present[20]', lambda: core.elements_are_present(driver, locators), driver)
+    suite.measure('core.wait_for_any_element[20]', lambda: core.wait_for_any_element(driver, locators), driver)
+    suite.measure('core.click_on_element', lambda: core.click_on_element(
+        driver, (By.CLASS_NAME, 'pagination-next')), driver)
+
+    delayed = load('delayed_element.html?delay=300')
+    for in_page in (False, True):
+        suffix = '[delay=300ms,in_page]' if in_page else '[delay=300ms]'
+        suite.measure('core.wait_for_element_to_be_present' + suffix, lambda: core.wait_for_element_to_be_present(
+            driver, DELAYED, waiting_time=5, in_page=in_page), driver, setup=delayed)
+        suite.measure('core.wait_for_element_to_be_clickable' + suffix, lambda: core.wait_for_element_to_be_clickable(
+            driver, DELAYED, waiting_time=5, in_page=in_page), driver, setup=delayed)
+
+    form = load('heavy_form.html?fields=90')
+    form()
+    text_fields = [(By.ID, 'field-{}'.format(i)) for i in range(0, 90, 3)]
+    suite.measure('core.populate_text_field[30]', lambda: [core.populate_text_field(
+        driver, locator, 'value') for locator in text_fields], driver, setup=form)
+    operations = [(locator, 'fill', 'value') for locator in text_fields]
+    operations += [((By.ID, 'field-{}'.format(i)), 'check', True) for i in range(1, 90, 3)]
+    operations += [((By.ID, 'field-{}'.format(i)), 'select', 'b') for i in range(2, 90, 3)]
+    operations.append(((By.ID, 'submit'), 'click'))
+    suite.measure('core.run_batch[91]', lambda: core.run_batch(driver, operations), driver, setup=form)
+
+    load('large_table.html?rows=2000')()
+    suite.measure('core.scroll', lambda: core.scroll(driver), driver)
+    suite.measure('extraction.extract[2000]', lambda: extract(driver, ROWS, ROW_FIELDS), driver)
+    suite.measure('extraction.iter_extract[2000,500]', lambda: list(iter_extract(
+        driver, ROWS, ROW_FIELDS, chunk_size=500)), driver)
+    suite.measure('scrolling.harvest[200]', lambda: list(harvest(
+        driver, (By.CSS_SELECTOR, 'article.post'), fields={'id': (None, 'data-id')}, key='id', idle_timeout=1)),
+        driver, setup=load('infinite_feed.html?total=200&delay=50'), runs=max(suite.runs // 5, 1))
+
+
+def bench_helpers(suite, driver, server, browser):
+    driver.get(server.url('large_table.html?rows=2000'))
+    elements = driver.find_elements(*ROWS)[:100]
+    suite.measure('helpers.element_has_gone_stale[100]', lambda: [helpers.element_has_gone_stale(
+        element) for element in elements], driver)
+    suite.measure('helpers.elements_have_gone_stale[100]', lambda: helpers.elements_have_gone_stale(
+        driver, elements), driver)
+
+    ready_at = {}
+
+    def becomes_true_in(delay):
+        return lambda: ready_at.update(time=time.time() + delay)
+
+    for name, options in (('step=0.1', {}), ('backoff', {'time_step': 0.01, 'backoff': 1.5, 'max_time_step': 0.5})):
+        suite.measure('helpers.wait_for_function_truth[{},300ms]'.format(name), lambda: helpers.wait_for_function_truth(
+            lambda: time.time() >= ready_at['time'], **options), setup=becomes_true_in(0.3))
+    suite.measure('helpers.join_css_classes', lambda: helpers.join_css_classes('a', 'b', 'c'))
+    if browser == 'chrome':
+        suite.measure('helpers.execute_cdp_command', lambda: helpers.execute_cdp_command(
+            driver, 'Runtime.evaluate', {'expression': '1'}), driver)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--browser', default='chrome')
+    parser.add_argument('--executable-path', default=None)
+    parser.add_argument('--run-headless', action='store_true')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--only', default=None, help='comma separated substrings of the cases to run')
+    parser.add_argument('--output', default=None, help='file to write the JSON results to instead of stdout')
+    args = parser.parse_args()
+
+    options = {'browser': args.browser, 'executable_path': args.executable_path,
+               'run_headless': args.run_headless}
+    suite = Suite(args.runs, args.only.split(',') if args.only else None)
+    started_at = time.time()
+    bench_startup(suite, options)
+    driver = create_driver(**options)
+    try:
+        with FixtureServer() as server:
+            bench_core(suite, driver, server)
+            bench_helpers(suite, driver, server, args.browser)
+    finally:
+        core.shut_down(driver)
+
+    report = OrderedDict([
+        ('selenium_extensions', selenium_extensions.__version__),
+        ('selenium', selenium.__version__),
+        ('python', platform.python_version()),
+        ('platform', platform.platform()),
+        ('browser', args.browser),
+        ('browser_version', driver.capabilities.get('browserVersion') or driver.capabilities.get('version')),
+        ('headless', args.run_headless),
+        ('started_at', started_at),
+        ('results', suite.results),
+    ])
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+
+if __name__ == '__main__':
+    main()
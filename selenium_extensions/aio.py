@@ -0,0 +1,185 @@
+'''Asyncio variants of the ``selenium_extensions.core`` helpers
+
+WebDriver commands are still blocking HTTP round-trips, so every command is run in the event loop's default executor. Waits don't hold a thread though: between checks they ``await asyncio.sleep()``, so a single event loop can drive many browsers concurrently. Use ``loop.set_default_executor()`` to control how many commands can be in flight at once.
+'''
+import asyncio
+from functools import partial
+
+from selenium.common.exceptions import NoSuchElementException
+from selenium.common.exceptions import StaleElementReferenceException
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support import expected_conditions as EC
+
+from selenium_extensions import core
+from selenium_extensions.drivers import create_driver
+
+
+async def _run(function, *args, **kwargs):
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, partial(function, *args, **kwargs))
+
+
+async def _wait_for(driver, condition, waiting_time, poll_frequency):
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + waiting_time
+    while True:
+        try:
+            result = await _run(condition, driver)
+            if result:
+                return result
+        except (NoSuchElementException, StaleElementReferenceException):
+            pass
+        if loop.time() >= deadline:
+            raise TimeoutException()
+        await asyncio.sleep(min(poll_frequency, max(deadline - loop.time(), 0)))
+
+
+async def shut_down(driver):
+    '''Async variant of :func:`selenium_extensions.core.shut_down`'''
+    await _run(core.shut_down, driver)
+
+
+async def scroll(driver, scroll_element=None):
+    '''Async variant of :func:`selenium_extensions.core.scroll`'''
+    await _run(core.scroll, driver, scroll_element)
+
+
+async def click_on_element(driver, element_locator):
+    '''Async variant of :func:`selenium_extensions.core.click_on_element`'''
+    await _run(core.click_on_element, driver, element_locator)
+
+
+async def populate_text_field(driver, element_locator, text):
+    '''Async variant of :func:`selenium_extensions.core.populate_text_field`'''
+    await _run(core.populate_text_field, driver, element_locator, text)
+
+
+async def element_is_present(driver, element_locator, waiting_time=2, poll_frequency=0.1):
+    '''Async variant of :func:`selenium_extensions.core.element_is_present`
+
+    Args:
+        driver (selenium.webdriver.): Selenium webdriver to use.
+        element_locator ((selenium.webdriver.common.by.By., str)): element locator described using `By`.
+        waiting_time (int): time in seconds - describes how much to wait.
+        poll_frequency (float): time in seconds the coroutine yields to the event loop between checks.
+
+    Returns:
+        bool: True if the element is present on the current page, False otherwise.
+
+    Example:
+        ::
+
+            from selenium.webdriver.common.by import By
+            from selenium_extensions import aio
+
+
+            async def has_results(driver):
+                return await aio.element_is_present(driver, (By.CLASS_NAME, 'search_photos_block'))
+    '''
+    try:
+        await _wait_for(driver, EC.presence_of_element_located(element_locator),
+                        waiting_time, poll_frequency)
+        return True
+    except TimeoutException:
+        return False
+
+
+async def wait_for_element_to_be_present(driver, element_locator, waiting_time=2, poll_frequency=0.1):
+    '''Async variant of :func:`selenium_extensions.core.wait_for_element_to_be_present`
+
+    Raises:
+        selenium.common.exceptions.TimeoutException: timeout waiting for element described by ``element_locator``.
+    '''
+    try:
+        await _wait_for(driver, EC.presence_of_element_located(element_locator),
+                        waiting_time, poll_frequency)
+    except TimeoutException:
+        raise TimeoutException(
+            'Timeout waiting for {} presense'.format(element_locator[1]))
+
+
+async def wait_for_element_to_be_clickable(driver, element_locator, waiting_time=2, poll_frequency=0.1):
+    '''Async variant of :func:`selenium_extensions.core.wait_for_element_to_be_clickable`
+
+    Raises:
+        selenium.common.exceptions.TimeoutException: timeout waiting for element described by ``element_locator``.
+    '''
+    try:
+        await _wait_for(driver, EC.element_to_be_clickable(element_locator),
+                        waiting_time, poll_frequency)
+    except TimeoutException:
+        raise TimeoutException(
+            'Timeout waiting for {} element to be clickable'.format(element_locator[1]))
+
+
+class AsyncSeleniumDriver:
+    '''Asyncio counterpart of :class:`selenium_extensions.core.SeleniumDriver`
+
+    The driver is launched by ``await bot.start()`` (or by entering ``async with``) so that browser startup doesn't block the event loop. After that the class has ``driver`` attribute and all of the :mod:`selenium_extensions.aio` coroutines available as methods.
+
+    Args:
+        browser ('chrome', 'firefox' or 'fake'): webdriver to use.
+        executable_path (str): path to the browser's webdriver binary. If set to ``None`` selenium will search for browser's webdriver in ``$PATH``.
+        run_headless (bool): boolean flag that indicates if webdriver has to be headless (without GUI).
+        load_images (bool): boolean flag that indicates if webdriver has to render images.
+        use_proxy (str, selenium_extensions.proxies.Proxy or selenium_extensions.proxies.ProxyPool): proxy or pool to take it from, see :class:`selenium_extensions.core.SeleniumDriver`.
+        pool (selenium_extensions.pool.DriverPool): pool to lease the driver from instead of launching a new one.
+
+    Example:
+        ::
+
+            import asyncio
+
+            from selenium.webdriver.common.by import By
+            from selenium_extensions.aio import AsyncSeleniumDriver
+
+
+            async def search(query):
+                async with AsyncSeleniumDriver(browser='chrome', run_headless=True) as bot:
+                    await bot.get('https://google.com')
+                    await bot.wait_for_element_to_be_present((By.NAME, 'q'))
+                    await bot.populate_text_field((By.NAME, 'q'), query)
+
+
+            loop = asyncio.get_event_loop()
+            loop.run_until_complete(asyncio.gather(*[search(q) for q in queries]))
+    '''
+
+    def __init__(self, browser=None, executable_path=None, run_headless=False, load_images=True, use_proxy=None, pool=None):
+        self._pool = pool
+        self._driver_options = {'executable_path': executable_path,
+                                'run_headless': run_headless,
+                                'load_images': load_images,
+                                'use_proxy': use_proxy}
+        self._browser = browser
+        self.driver = None
+
+    async def start(self):
+        '''Launches (or leases from the pool) the driver without blocking the event loop'''
+        if self._pool is not None:
+            self.driver = await _run(self._pool.checkout)
+        else:
+            self.driver = await _run(create_driver, self._browser, **self._driver_options)
+        self._initialize_methods()
+        return self
+
+    def _initialize_methods(self):
+        if self._pool is not None:
+            self.shut_down = partial(_run, self._pool.checkin, self.driver)
+        else:
+            self.shut_down = partial(shut_down, self.driver)
+        self.get = partial(_run, self.driver.get)
+        self.scroll = partial(scroll, self.driver)
+        self.click_on_element = partial(click_on_element, self.driver)
+        self.element_is_present = partial(element_is_present, self.driver)
+        self.wait_for_element_to_be_present = partial(
+            wait_for_element_to_be_present, self.driver)
+        self.wait_for_element_to_be_clickable = partial(
+            wait_for_element_to_be_clickable, self.driver)
+        self.populate_text_field = partial(populate_text_field, self.driver)
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.shut_down()
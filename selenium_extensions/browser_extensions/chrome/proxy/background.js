@@ -0,0 +1,23 @@
+// Proxy configuration is sent by selenium_extensions.proxies through navigations to CONTROL_URL
+var CONTROL_URL = 'http://selenium-extensions.invalid/proxy';
+var config = null;
+
+chrome.webRequest.onBeforeRequest.addListener(function (details) {
+    return {redirectUrl: chrome.runtime.getURL('control.html') + details.url.slice(CONTROL_URL.length)};
+}, {urls: [CONTROL_URL + '*'], types: ['main_frame']}, ['blocking']);
+
+chrome.runtime.onMessage.addListener(function (message, sender, sendResponse) {
+    config = message.config;
+    chrome.proxy.settings.set({value: {mode: 'fixed_servers', rules: {singleProxy: {
+        scheme: config.scheme, host: config.host, port: config.port}}}, scope: 'regular'}, function () {
+        sendResponse(true);
+    });
+    return true;
+});
+
+chrome.webRequest.onAuthRequired.addListener(function (details) {
+    if (details.isProxy && config !== null && config.username !== null) {
+        return {authCredentials: {username: config.username, password: config.password}};
+    }
+    return {};
+}, {urls: ['<all_urls>']}, ['blocking']);
@@ -0,0 +1,4 @@
+var query = new URLSearchParams(window.location.search);
+chrome.runtime.sendMessage({config: JSON.parse(query.get('config'))}, function () {
+    document.title = 'Proxy ' + query.get('id');
+});
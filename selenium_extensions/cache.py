@@ -0,0 +1,126 @@
+import threading
+import time
+from functools import partial
+
+from selenium.common.exceptions import StaleElementReferenceException
+
+from selenium_extensions.hooks import add_command_hook
+from selenium_extensions.scripts import SYNC_ELEMENT_CACHE
+
+
+# WebDriver commands after which every cached element belongs to another document
+NAVIGATION_COMMANDS = frozenset([
+    'get', 'goBack', 'goForward', 'refresh', 'close',
+    'switchToWindow', 'switchToFrame', 'switchToParentFrame',
+])
+
+
+def _invalidate_on_navigation(driver, execute, command, params):
+    '''Command hook that invalidates the element cache attached to the driver when it leaves the page'''
+    if command in NAVIGATION_COMMANDS:
+        cache = getattr(driver, '_se_element_cache', None)
+        if cache is not None:
+            cache.invalidate()
+    return execute(command, params)
+
+
+class ElementCache:
+    '''Per-driver cache of located elements
+
+    Once created, :func:`selenium_extensions.core.click_on_element`, :func:`selenium_extensions.core.populate_text_field` and :func:`selenium_extensions.core.run_batch` look elements up in the cache instead of asking WebDriver every time. The cache is cleared on navigation, and a cached element that turns out to be stale is looked up again transparently.
+
+    A single-page app can change what a locator matches without navigating. :meth:`sync` validates all of the cached elements in one script round-trip: it skips the check entirely if the DOM hasn't changed since the last sync, otherwise it drops elements their locators don't resolve to anymore. Use ``sync_interval`` to sync automatically.
+
+    Args:
+        driver (selenium.webdriver.): Selenium webdriver to cache elements for.
+        sync_interval (float): time in seconds after which a lookup syncs the cache first. If set to ``None`` the cache is synced only by calling :meth:`sync`.
+
+    Example:
+        ::
+
+            from selenium.webdriver.common.by import By
+            from selenium_extensions.cache import ElementCache
+            from selenium_extensions.core import click_on_element
+
+
+            cache = ElementCache(driver)
+            for _ in range(100):
+                click_on_element(driver, (By.ID, 'next'))  # located only once
+            print(cache.stats)
+    '''
+
+    def __init__(self, driver, sync_interval=None):
+        self.driver = driver
+        self.sync_interval = sync_interval
+        self.stats = {'hits': 0, 'misses': 0, 'stale': 0, 'invalidations': 0, 'syncs': 0}
+        self._elements = {}
+        self._token = None
+        self._mutations = None
+        self._last_sync = time.time()
+        self._lock = threading.Lock()
+        if not hasattr(driver, '_se_element_cache'):
+            add_command_hook(driver, partial(_invalidate_on_navigation, driver))
+        driver._se_element_cache = self
+
+    def find_element(self, element_locator):
+        '''Returns the element matched by ``element_locator``, from the cache if possible
+
+        Args:
+            element_locator ((selenium.webdriver.common.by.By., str)): element locator described using `By`.
+
+        Returns:
+            selenium.webdriver.remote.webelement.WebElement: matched element.
+
+        Raises:
+            selenium.common.exceptions.NoSuchElementException: no element is matched by ``element_locator``.
+        '''
+        element_locator = tuple(element_locator)
+        if self.sync_interval is not None and time.time() - self._last_sync >= self.sync_interval:
+            self.sync()
+        element = self._elements.get(element_locator)
+        if element is not None:
+            self.stats['hits'] += 1
+            return element
+        self.stats['misses'] += 1
+        element = self.driver.find_element(*element_locator)
+        with self._lock:
+            self._elements[element_locator] = element
+        return element
+
+    def discard_stale(self, element_locator):
+        '''Drops an element that has gone stale, so the next lookup asks WebDriver'''
+        self.stats['stale'] += 1
+        with self._lock:
+            self._elements.pop(tuple(element_locator), None)
+
+    def invalidate(self, element_locator=None):
+        '''Drops the element matched by ``element_locator`` or all of the elements if it isn't provided'''
+        self.stats['invalidations'] += 1
+        with self._lock:
+            if element_locator is None:
+                self._elements.clear()
+            else:
+                self._elements.pop(tuple(element_locator), None)
+
+    def sync(self):
+        '''Drops cached elements their locators don't resolve to anymore, in a single script round-trip'''
+        self.stats['syncs'] += 1
+        self._last_sync = time.time()
+        with self._lock:
+            entries = list(self._elements.items())
+        try:
+            token, mutations, valid = self.driver.execute_script(
+                SYNC_ELEMENT_CACHE, [[locator[0], locator[1], element] for locator, element in entries],
+                self._token, self._mutations)
+        except StaleElementReferenceException:
+            # Some of the elements are gone and the browser refused to pass them to the script
+            self.invalidate()
+            return
+        self._token, self._mutations = token, mutations
+        if valid is None:
+            return
+        with self._lock:
+            for (locator, element), is_valid in zip(entries, valid):
+                if not is_valid and self._elements.get(locator) is element:
+                    self.stats['stale'] += 1
+                    del self._elements[locator]
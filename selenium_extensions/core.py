@@ -1,19 +1,154 @@
+import time
+from collections import namedtuple
 from functools import partial
 
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import JavascriptException
+from selenium.common.exceptions import NoSuchElementException
+from selenium.common.exceptions import StaleElementReferenceException
 from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import WebDriverException
 
-from selenium_extensions.drivers import chrome_driver
-from selenium_extensions.drivers import firefox_driver
+from selenium_extensions.cache import ElementCache
+from selenium_extensions.drivers import _release_resources
+from selenium_extensions.drivers import create_driver
 
-from selenium_extensions.helpers import kill_virtual_display
+from selenium_extensions.helpers import ensure_script_timeout
+from selenium_extensions.helpers import kill_driver_processes
+from selenium_extensions.helpers import wait_for_function_truth
 
 from selenium_extensions.exceptions import SeleniumExtensionsException
+from selenium_extensions.extraction import extract
+from selenium_extensions.extraction import iter_extract
+from selenium_extensions.filtering import resource_stats
+from selenium_extensions.hooks import detach_hook_targets
+from selenium_extensions.instrumentation import instrumented
+from selenium_extensions.monitoring import monitor_resources
+from selenium_extensions.monitoring import resource_usage
+from selenium_extensions.proxies import ProxyPool
+from selenium_extensions.proxies import can_switch_proxy
+from selenium_extensions.proxies import switch_proxy
+from selenium_extensions.scrolling import harvest
+from selenium_extensions.scripts import CLEAR_STORAGE
+from selenium_extensions.scripts import COUNT_ELEMENTS
+from selenium_extensions.scripts import MARK_NAVIGATION
+from selenium_extensions.scripts import NAVIGATE
+from selenium_extensions.scripts import RUN_OPERATIONS
+from selenium_extensions.scripts import SCROLL_ELEMENT
+from selenium_extensions.scripts import SCROLL_PAGE
+from selenium_extensions.scripts import WAIT_FOR_ANY_ELEMENT
+from selenium_extensions.scripts import WAIT_FOR_ELEMENT
+from selenium_extensions.timeouts import DEFAULT_WAITING_TIME
+from selenium_extensions.timeouts import locator_key
+
+
+BatchResult = namedtuple('BatchResult', ['locator', 'action', 'ok', 'error'])
+BatchResult.__doc__ = '''Result of a single :func:`run_batch` operation
+
+Attributes:
+    locator ((selenium.webdriver.common.by.By., str)): locator of the operation.
+    action (str): performed action.
+    ok (bool): True if the action succeeded.
+    error (str): error message if the action failed or was skipped, ``None`` otherwise.
+'''
+
+Navigation = namedtuple('Navigation', ['url', 'element', 'ttfb', 'dom_content_loaded', 'load', 'elapsed'])
+Navigation.__doc__ = '''Result of :func:`navigate`
+
+Timings are reported by the browser's Navigation Timing API in seconds since the navigation has started. Events that hadn't happened when the navigation returned, or never happened because loading was stopped, are ``None``.
+
+Attributes:
+    url (str): URL of the loaded page, after redirects.
+    element (selenium.webdriver.remote.webelement.WebElement): element found by ``wait_for`` or ``None``.
+    ttfb (float): time to the first byte of the response.
+    dom_content_loaded (float): time until ``DOMContentLoaded`` handlers have finished.
+    load (float): time until ``load`` handlers have finished.
+    elapsed (float): time in seconds :func:`navigate` took, including WebDriver round-trips.
+'''
+
+# Actions that need real key/mouse events and are performed through WebDriver
+NATIVE_ACTIONS = {
+    'type': lambda element, value: element.send_keys(value),
+    'native_click': lambda element, value: element.click(),
+}
+
+
+def _find_element(driver, element_locator):
+    cache = getattr(driver, '_se_element_cache', None)
+    if cache is None:
+        return driver.find_element(*element_locator)
+    return cache.find_element(element_locator)
+
+
+def _with_element(driver, element_locator, action):
+    '''Calls ``action`` with the element matched by ``element_locator``, looking it up again if the cached one has gone stale'''
+    element = _find_element(driver, element_locator)
+    try:
+        return action(element)
+    except StaleElementReferenceException:
+        cache = getattr(driver, '_se_element_cache', None)
+        if cache is None:
+            raise
+        cache.discard_stale(element_locator)
+        return action(_find_element(driver, element_locator))
+
+
+def _wait_until(driver, waiting_time, condition, element_locator):
+    '''Waits with ``WebDriverWait`` for the expected condition named ``condition`` of ``element_locator``'''
+    # selenium.webdriver loads every browser backend, so it's imported once a driver exists rather than with core
+    from selenium.webdriver.support import expected_conditions
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    WebDriverWait(driver, waiting_time).until(getattr(expected_conditions, condition)(element_locator))
+
+
+def _adaptive_wait(driver, element_locators, waiting_time, wait):
+    '''Calls ``wait(waiting_time)``, with the waiting time learned by the driver's adaptive timeouts if it isn't provided'''
+    timeouts = getattr(driver, '_se_timeouts', None)
+    if timeouts is None:
+        return wait(DEFAULT_WAITING_TIME if waiting_time is None else waiting_time)
+    return timeouts.wait(driver, locator_key(element_locators), waiting_time, wait)
+
+
+def _wait_in_page(driver, element_locator, waiting_time, clickable=False):
+    '''Waits for the element inside the page using a ``MutationObserver``
+
+    Returns as soon as the element matched by ``element_locator`` appears (and is clickable if ``clickable`` is set) using a single async script call. If the script can't be run - e.g. the page navigated away while waiting - it falls back to polling with exponential backoff for the rest of ``waiting_time``. Tabs of a :class:`selenium_extensions.tabs.TabPool` always poll, so that other tabs can use the browser meanwhile.
+
+    Returns:
+        bool: True if the element appeared before ``waiting_time`` ran out, False otherwise.
+    '''
+    deadline = time.time() + waiting_time
+    # An async script would hold the browser the other tabs share for the whole wait
+    if getattr(driver, 'tab_pool', None) is None:
+        try:
+            ensure_script_timeout(driver, waiting_time + 5)
+            return driver.execute_async_script(
+                WAIT_FOR_ELEMENT, element_locator[0], element_locator[1],
+                clickable, int(waiting_time * 1000)) is not None
+        except WebDriverException:
+            pass
+    from selenium.webdriver.support import expected_conditions
+
+    if clickable:
+        condition = expected_conditions.element_to_be_clickable(element_locator)
+    else:
+        condition = expected_conditions.presence_of_element_located(element_locator)
+
+    def element_matches():
+        try:
+            return condition(driver)
+        except (NoSuchElementException, StaleElementReferenceException):
+            return False
+
+    try:
+        return wait_for_function_truth(element_matches, time_to_wait=max(deadline - time.time(), 0),
+                                       time_step=0.05, backoff=1.5, max_time_step=0.5)
+    except TimeoutException:
+        return False
 
 
 def shut_down(driver):
-    '''Shuts down the driver and its virtual display
+    '''Shuts down the driver, its virtual display and removes its cloned profile
 
     Args:
         driver (selenium.webdriver.): Selenium webdriver to stop.
@@ -30,13 +165,127 @@ def shut_down(driver):
             shut_down(driver)
     '''
     driver.quit()
-    try:
-        kill_virtual_display(driver.display)
-    except (AttributeError, TypeError):
-        # Display is either None or there is no display at all
-        pass
+    _release_resources(driver)
+
 
+def kill_driver(driver):
+    '''Kills the driver's process tree without talking to it, releases its virtual display and removes its cloned profile
+
+    Use it instead of :func:`shut_down` when the driver hangs or has crashed.
+
+    Args:
+        driver (selenium.webdriver.): Selenium webdriver to kill.
+
+    Example:
+        ::
+
+            from selenium_extensions.core import kill_driver
+
+
+            kill_driver(driver)
+    '''
+    kill_driver_processes(driver)
+    _release_resources(driver)
+
+
+@instrumented()
+def reset_state(driver):
+    '''Resets the browser state so the driver can be safely reused
+
+    Deletes cookies, clears ``localStorage`` and ``sessionStorage`` of the current page and navigates to ``about:blank``.
+
+    Args:
+        driver (selenium.webdriver.): Selenium webdriver to reset.
+
+    Note:
+        WebDriver only exposes cookies of the current domain, so cookies set by previously visited domains may survive the reset.
+
+    Example:
+        ::
 
+            from selenium import webdriver
+            from selenium_extensions.core import reset_state
+
+
+            driver = webdriver.Chrome()
+            driver.get('https://google.com')
+            ...
+            reset_state(driver)
+    '''
+    driver.delete_all_cookies()
+    driver.execute_script(CLEAR_STORAGE)
+    driver.get('about:blank')
+
+
+@instrumented(waits=True)
+def navigate(driver, url, wait_for=None, ready_state=None, timeout=30, stop_loading=True):
+    '''Opens ``url`` and returns as soon as the page is usable instead of waiting for everything to load
+
+    Works best with drivers created with ``page_load_strategy='eager'`` or ``'none'``, for which ``get`` returns early. The rest of the waiting is done inside the page in a single script call: until ``wait_for`` is present or the document reaches ``ready_state``, whichever happens first. Loading of the remaining resources is stopped then. With the default ``'normal'`` strategy ``get`` itself waits for the ``load`` event, so only the timings are gained.
+
+    Args:
+        driver (selenium.webdriver.): Selenium webdriver to use.
+        url (str): URL to open.
+        wait_for ((selenium.webdriver.common.by.By., str)): locator of the element to wait for described using `By`.
+        ready_state ('loading', 'interactive' or 'complete'): ``document.readyState`` to wait for. Defaults to ``'interactive'`` if ``wait_for`` isn't provided.
+        timeout (float): time in seconds to wait for the page.
+        stop_loading (bool): boolean flag that indicates if loading has to be stopped with ``window.stop()`` once the page is usable.
+
+    Returns:
+        Navigation: loaded URL, found element and Navigation Timing metrics.
+
+    Raises:
+        selenium.common.exceptions.TimeoutException: neither ``wait_for`` nor ``ready_state`` has been reached in ``timeout`` seconds.
+
+    Example:
+        ::
+
+            from selenium.webdriver.common.by import By
+            from selenium_extensions.core import navigate
+            from selenium_extensions.drivers import chrome_driver
+
+
+            driver = chrome_driver(page_load_strategy='none')
+            navigation = navigate(driver, 'https://example.com/products', wait_for=(By.CSS_SELECTOR, 'tr.product'))
+            print(navigation.ttfb, navigation.dom_content_loaded, navigation.elapsed)
+    '''
+    if wait_for is None and ready_state is None:
+        ready_state = 'interactive'
+    by, value = wait_for if wait_for is not None else (None, None)
+    start = time.time()
+    if driver.capabilities.get('pageLoadStrategy', 'normal') != 'normal':
+        # get returns before the new document exists, the mark tells the old one apart
+        driver.execute_script(MARK_NAVIGATION)
+    driver.get(url)
+    ensure_script_timeout(driver, timeout + 5)
+    deadline = start + timeout
+    while True:
+        remaining = max(deadline - time.time(), 0)
+        try:
+            result = driver.execute_async_script(
+                NAVIGATE, by, value, ready_state, int(remaining * 1000), stop_loading)
+        except JavascriptException as error:
+            # The script was started in a document that has been replaced meanwhile
+            if 'unload' not in str(error).lower() or remaining <= 0:
+                raise
+            result = None
+        if result is not None:
+            break
+        if remaining <= 0:
+            raise TimeoutException('Timeout waiting for {} to start loading'.format(url))
+        time.sleep(0.05)
+    reached, element, loaded_url, timing = result
+    if not reached:
+        raise TimeoutException('Timeout waiting for {} to load'.format(url))
+
+    def seconds(milliseconds):
+        return milliseconds / 1000 if milliseconds else None
+
+    return Navigation(loaded_url, element, seconds(timing['ttfb']), seconds(timing['dom_content_loaded']),
+                      seconds(timing['load']), time.time() - start)
+
+
+@instrumented()
 def scroll(driver, scroll_element=None):
     '''Scrolls the current page or the Selenium WebElement if one is provided
 
@@ -66,13 +315,12 @@ def scroll(driver, scroll_element=None):
             scroll(driver, pop_up)
     '''
     if scroll_element:
-        driver.execute_script(
-            'arguments[0].scrollTop = arguments[0].scrollHeight;', scroll_element)
+        driver.execute_script(SCROLL_ELEMENT, scroll_element)
     else:
-        driver.execute_script(
-            'document.body.scrollTop = document.body.scrollHeight;')
+        driver.execute_script(SCROLL_PAGE)
 
 
+@instrumented()
 def click_on_element(driver, element_locator):
     '''Clicks on a Selenium element represented by ``element_locator``
 
@@ -91,17 +339,18 @@ def click_on_element(driver, element_locator):
             ...
             click_on_element(driver, (By.ID, 'form-submit-button'))
     '''
-    element = driver.find_element(*element_locator)
-    element.click()
+    _with_element(driver, element_locator, lambda element: element.click())
 
 
-def element_is_present(driver, element_locator, waiting_time=2):
+@instrumented(waits=True)
+def element_is_present(driver, element_locator, waiting_time=None, in_page=False):
     '''Shortcut to check if the element is present on the current page
 
     Args:
         driver (selenium.webdriver.): Selenium webdriver to use.
         element_locator ((selenium.webdriver.common.by.By., str)): element locator described using `By`. Take a look at `Locate elements By <http://selenium-python.readthedocs.io/api.html#locate-elements-by>`_ for more info.
-        waiting_time (int): time in seconds - describes how much to wait.
+        waiting_time (int): time in seconds - describes how much to wait. Defaults to 2 seconds, or to the timeout learned by the driver's :class:`selenium_extensions.timeouts.AdaptiveTimeouts`.
+        in_page (bool): boolean flag that indicates if the waiting has to be done inside the page by a ``MutationObserver`` in a single script call. Returns as soon as the element appears instead of polling WebDriver every 0.5 seconds.
 
     Returns:
         bool: True if the element is present on the current page, False otherwise.
@@ -119,21 +368,155 @@ def element_is_present(driver, element_locator, waiting_time=2):
             if not element_is_present(driver, (By.CLASS_NAME, 'search_photos_block')):
                 pass # Do your things here
     '''
+    def wait(waiting_time):
+        if in_page:
+            return _wait_in_page(driver, element_locator, waiting_time)
+        try:
+            _wait_until(driver, waiting_time, 'presence_of_element_located', element_locator)
+            return True
+        except TimeoutException:
+            return False
+
+    return _adaptive_wait(driver, element_locator, waiting_time, wait)
+
+
+@instrumented()
+def count_elements(driver, element_locators):
+    '''Counts elements matched by each of ``element_locators`` in a single script round-trip
+
+    Args:
+        driver (selenium.webdriver.): Selenium webdriver to use.
+        element_locators (list): element locators described using `By`. Take a look at `Locate elements By <http://selenium-python.readthedocs.io/api.html#locate-elements-by>`_ for more info.
+
+    Returns:
+        dict: number of matched elements for every locator.
+
+    Example:
+        ::
+
+            from selenium import webdriver
+            from selenium.webdriver.common.by import By
+            from selenium_extensions.core import count_elements
+
+
+            driver = webdriver.Chrome()
+            ...
+            counts = count_elements(driver, [(By.CLASS_NAME, 'product'), (By.ID, 'captcha')])
+            print(counts[(By.CLASS_NAME, 'product')])
+    '''
+    element_locators = [tuple(locator) for locator in element_locators]
+    counts = driver.execute_script(
+        COUNT_ELEMENTS, [list(locator) for locator in element_locators])
+    return dict(zip(element_locators, counts))
+
+
+@instrumented()
+def elements_are_present(driver, element_locators):
+    '''Checks which of ``element_locators`` are present on the current page in a single script round-trip
+
+    Unlike :func:`element_is_present` it doesn't wait, so use it to classify a page that has already loaded.
+
+    Args:
+        driver (selenium.webdriver.): Selenium webdriver to use.
+        element_locators (list): element locators described using `By`. Take a look at `Locate elements By <http://selenium-python.readthedocs.io/api.html#locate-elements-by>`_ for more info.
+
+    Returns:
+        dict: True for every locator present on the current page, False otherwise.
+
+    Example:
+        ::
+
+            from selenium import webdriver
+            from selenium.webdriver.common.by import By
+            from selenium_extensions.core import elements_are_present
+
+
+            driver = webdriver.Chrome()
+            ...
+            present = elements_are_present(driver, [(By.ID, 'login-form'), (By.ID, 'captcha')])
+            if present[(By.ID, 'captcha')]:
+                pass # Do your things here
+    '''
+    return {locator: count > 0 for locator, count in count_elements(driver, element_locators).items()}
+
+
+def _wait_for_any_element(driver, element_locators, waiting_time):
+    '''Waits ``waiting_time`` seconds for any of ``element_locators``, see :func:`wait_for_any_element`'''
+    timeout_message = 'Timeout waiting for any of {}'.format(
+        ', '.join(locator[1] for locator in element_locators))
+    deadline = time.time() + waiting_time
+    # An async script would hold the browser the other tabs share for the whole wait
+    if getattr(driver, 'tab_pool', None) is None:
+        try:
+            ensure_script_timeout(driver, waiting_time + 5)
+            index = driver.execute_async_script(
+                WAIT_FOR_ANY_ELEMENT, [list(locator) for locator in element_locators],
+                int(waiting_time * 1000))
+            if index is None:
+                raise TimeoutException(timeout_message)
+            return element_locators[index]
+        except TimeoutException:
+            raise
+        except WebDriverException:
+            pass
+    found = []
+
+    def any_element_is_present():
+        counts = count_elements(driver, element_locators)
+        found[:] = [locator for locator in element_locators if counts[locator]]
+        return found
+
     try:
-        WebDriverWait(driver, waiting_time).until(
-            EC.presence_of_element_located(element_locator))
-        return True
+        wait_for_function_truth(any_element_is_present, time_to_wait=max(deadline - time.time(), 0),
+                                time_step=0.05, backoff=1.5, max_time_step=0.5)
     except TimeoutException:
-        return False
+        raise TimeoutException(timeout_message)
+    return found[0]
+
+
+@instrumented(waits=True)
+def wait_for_any_element(driver, element_locators, waiting_time=None):
+    '''Waits until any of ``element_locators`` is present on the current page
+
+    Waits inside the page using a ``MutationObserver`` and returns as soon as one of the locators matches. If the script can't be run it falls back to polling with exponential backoff, as do tabs of a :class:`selenium_extensions.tabs.TabPool`.
+
+    Args:
+        driver (selenium.webdriver.): Selenium webdriver to use.
+        element_locators (list): element locators described using `By`. Take a look at `Locate elements By <http://selenium-python.readthedocs.io/api.html#locate-elements-by>`_ for more info.
+        waiting_time (int): time in seconds - describes how much to wait. Defaults to 2 seconds, or to the timeout learned by the driver's :class:`selenium_extensions.timeouts.AdaptiveTimeouts`.
+
+    Returns:
+        (selenium.webdriver.common.by.By., str): the first of ``element_locators`` that is present on the page.
+
+    Raises:
+        selenium.common.exceptions.TimeoutException: none of ``element_locators`` appeared in ``waiting_time``.
 
+    Example:
+        ::
 
-def wait_for_element_to_be_present(driver, element_locator, waiting_time=2):
+            from selenium import webdriver
+            from selenium.webdriver.common.by import By
+            from selenium_extensions.core import wait_for_any_element
+
+
+            driver = webdriver.Chrome()
+            ...
+            landed_on = wait_for_any_element(driver, [(By.ID, 'dashboard'), (By.ID, 'login-error')], waiting_time=10)
+    '''
+    element_locators = [tuple(locator) for locator in element_locators]
+    return _adaptive_wait(driver, element_locators, waiting_time,
+                          partial(_wait_for_any_element, driver, element_locators))
+
+
+@instrumented(waits=True)
+def wait_for_element_to_be_present(driver, element_locator, waiting_time=None, in_page=False):
     '''Shortcut to wait until the element is present on the current page
 
     Args:
         driver (selenium.webdriver.): Selenium webdriver to use.
         element_locator ((selenium.webdriver.common.by.By., str)): element locator described using `By`. Take a look at `Locate elements By <http://selenium-python.readthedocs.io/api.html#locate-elements-by>`_ for more info.
-        waiting_time (int): time in seconds - describes how much to wait.
+        waiting_time (int): time in seconds - describes how much to wait. Defaults to 2 seconds, or to the timeout learned by the driver's :class:`selenium_extensions.timeouts.AdaptiveTimeouts`.
+        in_page (bool): boolean flag that indicates if the waiting has to be done inside the page by a ``MutationObserver`` in a single script call. Returns as soon as the element appears instead of polling WebDriver every 0.5 seconds.
 
     Raises:
         selenium.common.exceptions.TimeoutException: timeout waiting for element described by ``element_locator``.
@@ -150,20 +533,29 @@ def wait_for_element_to_be_present(driver, element_locator, waiting_time=2):
             ...
             wait_for_element_to_be_present(driver, (By.CLASS_NAME, 'search_load_btn'))
     '''
-    try:
-        WebDriverWait(driver, waiting_time).until(
-            EC.presence_of_element_located(element_locator))
-    except TimeoutException:
-        raise TimeoutException(
-            'Timeout waiting for {} presense'.format(element_locator[1]))
-
-
-def wait_for_element_to_be_clickable(driver, element_locator, waiting_time=2):
+    def wait(waiting_time):
+        if in_page:
+            if not _wait_in_page(driver, element_locator, waiting_time):
+                raise TimeoutException(
+                    'Timeout waiting for {} presense'.format(element_locator[1]))
+            return
+        try:
+            _wait_until(driver, waiting_time, 'presence_of_element_located', element_locator)
+        except TimeoutException:
+            raise TimeoutException(
+                'Timeout waiting for {} presense'.format(element_locator[1]))
+
+    _adaptive_wait(driver, element_locator, waiting_time, wait)
+
+
+@instrumented(waits=True)
+def wait_for_element_to_be_clickable(driver, element_locator, waiting_time=None, in_page=False):
     '''Waits for element described by `element_locator` to be clickable
 
     Args:
         element_locator ((selenium.webdriver.common.by.By., str)): element locator described using `By`. Take a look at `Locate elements By <http://selenium-python.readthedocs.io/api.html#locate-elements-by>`_ for more info.
-        waiting_time (int): time in seconds - describes how much to wait.
+        waiting_time (int): time in seconds - describes how much to wait. Defaults to 2 seconds, or to the timeout learned by the driver's :class:`selenium_extensions.timeouts.AdaptiveTimeouts`.
+        in_page (bool): boolean flag that indicates if the waiting has to be done inside the page by a ``MutationObserver`` in a single script call. Returns as soon as the element appears instead of polling WebDriver every 0.5 seconds.
 
     Raises:
         selenium.common.exceptions.TimeoutException: timeout waiting for element described by ``element_locator``.
@@ -180,14 +572,22 @@ def wait_for_element_to_be_clickable(driver, element_locator, waiting_time=2):
             ...
             wait_for_element_to_be_clickable(driver, (By.CLASS_NAME, 'form-submit-button'))
     '''
-    try:
-        WebDriverWait(driver, waiting_time).until(
-            EC.element_to_be_clickable(element_locator))
-    except TimeoutException:
-        raise TimeoutException(
-            'Timeout waiting for {} element to be clickable'.format(element_locator[1]))
-
-
+    def wait(waiting_time):
+        if in_page:
+            if not _wait_in_page(driver, element_locator, waiting_time, clickable=True):
+                raise TimeoutException(
+                    'Timeout waiting for {} element to be clickable'.format(element_locator[1]))
+            return
+        try:
+            _wait_until(driver, waiting_time, 'element_to_be_clickable', element_locator)
+        except TimeoutException:
+            raise TimeoutException(
+                'Timeout waiting for {} element to be clickable'.format(element_locator[1]))
+
+    _adaptive_wait(driver, element_locator, waiting_time, wait)
+
+
+@instrumented()
 def populate_text_field(driver, element_locator, text):
     '''Populates text field with provided text
 
@@ -207,8 +607,83 @@ def populate_text_field(driver, element_locator, text):
             ...
             populate_text_field(driver, (By.CLASS_NAME, 'textbox'), 'some text')
     '''
-    input_element = driver.find_element(*element_locator)
-    input_element.send_keys(text)
+    _with_element(driver, element_locator, lambda element: element.send_keys(text))
+
+
+@instrumented()
+def run_batch(driver, operations, stop_on_error=False):
+    '''Performs many locator actions in a single script round-trip
+
+    Consecutive in-page operations are compiled into one ``execute_script`` call that locates the elements and performs the actions in order. Operations with native actions (``type``, ``native_click``) are performed through WebDriver between the script calls, so order is preserved.
+
+    In-page actions:
+
+    - ``click`` - clicks on the element.
+    - ``fill`` - sets the value of the field and fires ``input`` and ``change`` events.
+    - ``clear`` - clears the value of the field.
+    - ``select`` - sets the value of a ``<select>``.
+    - ``check`` - checks (value is truthy) or unchecks the checkbox.
+
+    Native actions, for fields that need real key events:
+
+    - ``type`` - sends keys to the element using ``send_keys``.
+    - ``native_click`` - clicks on the element using WebDriver.
+
+    Args:
+        driver (selenium.webdriver.): Selenium webdriver to use.
+        operations (list): list of ``(element_locator, action)`` or ``(element_locator, action, value)`` tuples.
+        stop_on_error (bool): boolean flag that indicates if the remaining operations have to be skipped after the first failure.
+
+    Returns:
+        list: :class:`BatchResult` for every operation.
+
+    Example:
+        ::
+
+            from selenium import webdriver
+            from selenium.webdriver.common.by import By
+            from selenium_extensions.core import run_batch
+
+
+            driver = webdriver.Chrome()
+            ...
+            results = run_batch(driver, [
+                ((By.NAME, 'first_name'), 'fill', 'John'),
+                ((By.NAME, 'last_name'), 'fill', 'Doe'),
+                ((By.NAME, 'search'), 'type', 'autocomplete me'),
+                ((By.ID, 'agree'), 'check', True),
+                ((By.ID, 'submit'), 'click'),
+            ], stop_on_error=True)
+            failed = [result for result in results if not result.ok]
+    '''
+    operations = [tuple(operation) + (None,) * (3 - len(operation)) for operation in operations]
+    results = []
+    index = 0
+    while index < len(operations):
+        locator, action, value = operations[index]
+        if action in NATIVE_ACTIONS:
+            try:
+                _with_element(driver, locator, partial(NATIVE_ACTIONS[action], value=value))
+                results.append(BatchResult(locator, action, True, None))
+            except WebDriverException as e:
+                results.append(BatchResult(locator, action, False, e.msg))
+            index += 1
+        else:
+            segment = []
+            while index < len(operations) and operations[index][1] not in NATIVE_ACTIONS:
+                segment.append(operations[index])
+                index += 1
+            outcomes = driver.execute_script(
+                RUN_OPERATIONS,
+                [[locator[0], locator[1], action, value] for locator, action, value in segment],
+                stop_on_error)
+            for (locator, action, value), (ok, error) in zip(segment, outcomes):
+                results.append(BatchResult(locator, action, ok, error))
+        if stop_on_error and not results[-1].ok:
+            break
+    for locator, action, value in operations[len(results):]:
+        results.append(BatchResult(locator, action, False, 'Skipped after a previous error'))
+    return results
 
 
 class SeleniumDriver:
@@ -217,14 +692,23 @@ class SeleniumDriver:
     User's classes should inherit from this class and initialize it using ``super()``. After this their class will have ``driver`` attribute and all the methods ready to go.
 
     Args:
-        browser ('chrome' or 'firefox'): webdriver to use.
+        browser ('chrome', 'firefox' or 'fake'): webdriver to use.
         executable_path (str): path to the browser's webdriver binary. If set to ``None`` selenium will search for browser's webdriver in ``$PATH``.
         run_headless (bool): boolean flag that indicates if webdriver has to be headless (without GUI).
         load_images (bool): boolean flag that indicates if webdriver has to render images.
-        use_proxy (str): use http proxy in <host:port> format.
+        use_proxy (str, selenium_extensions.proxies.Proxy or selenium_extensions.proxies.ProxyPool): proxy in ``[scheme://][user:password@]host[:port]`` format (``host:port`` is an HTTP proxy) or pool to take it from on every launch, see :meth:`rotate_proxy`.
+        pool (selenium_extensions.pool.DriverPool or selenium_extensions.tabs.TabPool): pool to lease the driver, or a tab of a shared browser, from instead of launching a new one. All of the other arguments are ignored in this case, ``shut_down`` returns the driver to the pool.
+        instrumentation (selenium_extensions.instrumentation.Instrumentation): instrumentation recording timings of the driver's commands and helper calls.
+        element_cache (bool): boolean flag that indicates if located elements have to be cached, see :class:`selenium_extensions.cache.ElementCache`. The cache is available as ``element_cache`` attribute.
+        recycle_policy (selenium_extensions.monitoring.RecyclePolicy): thresholds after which :meth:`recycle_if_needed` replaces the browser with a new one. Resource usage of the browser is available as ``resource_usage()`` either way.
+        supervisor (selenium_extensions.supervisor.Supervisor): watchdog that kills the driver when it hangs or crashes and respawns it with the same options. Can't be used with ``pool``.
+        session_store (selenium_extensions.sessions.SessionStore): store to restore the ``session_key`` session from every time a driver is launched, leased, recycled or respawned. Whether it has been restored is available as ``session_restored`` attribute, :meth:`save_session` saves it.
+        session_key (str): name of the session in ``session_store``, e.g. the account the bot logs in to.
+        adaptive_timeouts (selenium_extensions.timeouts.AdaptiveTimeouts): timeouts the wait helpers called without ``waiting_time`` learn and use instead of the fixed 2 seconds.
+        **driver_options: additional keyword arguments passed to the driver factory, e.g. ``resource_policy`` or the ``pages`` of the fake browser.
 
     Raises:
-        selenium_extensions.exceptions.SeleniumExtensionsException: ``browser`` is not supported by ``selenium_extensions``.
+        selenium_extensions.exceptions.SeleniumExtensionsException: ``browser`` is not supported by ``selenium_extensions`` or both ``pool`` and ``supervisor`` are provided.
 
     Example:
         ::
@@ -252,38 +736,151 @@ class SeleniumDriver:
         In order to create Firefox driver Selenium requires `Firefox <https://www.mozilla.org/en-US/firefox/new/>`_ to be installed and `geckodriver <https://github.com/mozilla/geckodriver/releases>`_ to be downloaded.
 
     Note:
-        Firefox doesn't support native headless mode. We use ``pyvirtualdisplay`` to simulate it. In order ``pyvirtualdisplay`` to work you need to install ``Xvfb`` package: ``sudo apt install xvfb``.
+        Headless Firefox uses the native headless mode, which requires Firefox 56 or newer. Pass ``virtual_display=True`` to run it in a shared ``pyvirtualdisplay`` display instead. In order ``pyvirtualdisplay`` to work you need to install ``Xvfb`` package: ``sudo apt install xvfb``.
     '''
 
-    def __init__(self, browser=None, executable_path=None, run_headless=False, load_images=True, use_proxy=None):
-        self._initialize_driver(browser, executable_path,
-                                run_headless, load_images,
-                                use_proxy)
+    def __init__(self, browser=None, executable_path=None, run_headless=False, load_images=True, use_proxy=None, pool=None, instrumentation=None, element_cache=False, recycle_policy=None, supervisor=None, session_store=None, session_key='default', adaptive_timeouts=None, **driver_options):
+        if pool is not None and supervisor is not None:
+            raise SeleniumExtensionsException('Pooled drivers are health-checked by the pool and can\'t be supervised')
+        self._pool = pool
+        self._instrumentation = instrumentation
+        self._use_element_cache = element_cache
+        self._recycle_policy = recycle_policy
+        self.supervisor = supervisor
+        self.session_store = session_store
+        self.session_key = session_key
+        self.session_restored = False
+        self.adaptive_timeouts = adaptive_timeouts
+        self._driver_arguments = (browser, executable_path, run_headless, load_images, use_proxy)
+        self._driver_options = driver_options
+        if pool is not None:
+            self.driver = pool.checkout()
+        else:
+            self._initialize_driver(browser, executable_path,
+                                    run_headless, load_images,
+                                    use_proxy, **driver_options)
+        self._attach_driver()
+
+    def _attach_driver(self):
+        detach_hook_targets(self.driver)
+        monitor_resources(self.driver)
+        if self._instrumentation is not None:
+            self._instrumentation.instrument(self.driver)
+        self.element_cache = ElementCache(self.driver) if self._use_element_cache else None
+        if self.adaptive_timeouts is not None:
+            self.adaptive_timeouts.attach(self.driver)
         self._initialize_methods()
-
-    def _initialize_driver(self, browser, executable_path, run_headless, load_images, use_proxy):
-        if browser is None:
-            self.driver = chrome_driver()
-            browser = browser.lower()
-        available_browsers = ['chrome', 'firefox']
-        if browser not in available_browsers:
-            raise SeleniumExtensionsException('Provided browser ({}) isn\'t \
-                supported by selenium_extensions package. Available browsers \
-                are {}'.format(browser, ', '.join(available_browsers)))
-
-        if browser == 'chrome':
-            self.driver = chrome_driver(executable_path=executable_path,
-                                        run_headless=run_headless,
-                                        load_images=load_images,
-                                        use_proxy=use_proxy)
-        if browser == 'firefox':
-            self.driver = firefox_driver(executable_path=executable_path,
-                                         run_headless=run_headless,
-                                         load_images=load_images,
-                                         use_proxy=use_proxy)
+        if self.supervisor is not None:
+            self.supervisor.supervise(self.driver, self._respawn)
+        if self.session_store is not None:
+            self.restore_session()
+
+    def _respawn(self):
+        '''Replaces a killed driver with a new one launched with the same options'''
+        self._initialize_driver(*self._driver_arguments, **self._driver_options)
+        self._attach_driver()
+        return self
+
+    def recycle(self):
+        '''Shuts the driver down and replaces it with a new one launched with the same options
+
+        Raises:
+            selenium_extensions.exceptions.SeleniumExtensionsException: the driver is leased from a pool, which recycles drivers itself.
+        '''
+        if self._pool is not None:
+            raise SeleniumExtensionsException('Pooled drivers are recycled by the pool')
+        self.shut_down()
+        self._respawn()
+
+    def recycle_if_needed(self):
+        '''Recycles the driver if it has crossed a threshold of ``recycle_policy``
+
+        Call it between tasks, when nothing depends on the browser state.
+
+        Returns:
+            str: description of the crossed threshold or ``None`` if the driver hasn't been recycled.
+        '''
+        if self._recycle_policy is None:
+            return None
+        reason = self._recycle_policy.exceeded(resource_usage(self.driver))
+        if reason is not None:
+            self.recycle()
+        return reason
+
+    def rotate_proxy(self, domain=None):
+        '''Switches the driver to the proxy its ``ProxyPool`` hands out next
+
+        The proxy of the running browser is switched where the browser supports it (see :func:`selenium_extensions.proxies.switch_proxy`), otherwise the browser is relaunched with the new proxy. Either way the current page is left.
+
+        Args:
+            domain (str): domain the next pages belong to, keeps the proxy of the domain with the ``sticky`` policy.
+
+        Returns:
+            selenium_extensions.proxies.Proxy: proxy the driver uses now.
+
+        Raises:
+            selenium_extensions.exceptions.SeleniumExtensionsException: the driver hasn't been launched with a ``ProxyPool``, all of its proxies are evicted or the driver is leased from a pool and would have to be relaunched.
+        '''
+        proxies = self._driver_arguments[4]
+        if not isinstance(proxies, ProxyPool):
+            raise SeleniumExtensionsException('Proxies can only be rotated when use_proxy is a ProxyPool')
+        proxy = proxies.acquire(domain)
+        if proxy is self.driver.proxy:
+            return proxy
+        if can_switch_proxy(self.driver):
+            switch_proxy(self.driver, proxy)
+        elif self._pool is not None:
+            raise SeleniumExtensionsException('The browser has to be relaunched to switch the proxy, '
+                                              'which the pool does itself')
+        else:
+            self.shut_down()
+            self._initialize_driver(*self._driver_arguments[:4], use_proxy=proxy, **self._driver_options)
+            self._attach_driver()
+        return proxy
+
+    def save_session(self):
+        '''Saves the session of the current page's origin in ``session_store``, see :meth:`selenium_extensions.sessions.SessionStore.save`
+
+        Raises:
+            selenium_extensions.exceptions.SeleniumExtensionsException: the driver has no ``session_store`` or the current page has no origin.
+        '''
+        if self.session_store is None:
+            raise SeleniumExtensionsException('Sessions can only be saved when session_store is provided')
+        self.session_store.save(self.driver, self.session_key)
+
+    def restore_session(self, navigate=True):
+        '''Restores the session from ``session_store``, which is done automatically whenever a driver is attached
+
+        Args:
+            navigate (bool): boolean flag that indicates if the driver has to open the URL the session was saved on.
+
+        Returns:
+            bool: True if the session has been restored and is valid, False if the bot has to log in.
+
+        Raises:
+            selenium_extensions.exceptions.SeleniumExtensionsException: the driver has no ``session_store``.
+        '''
+        if self.session_store is None:
+            raise SeleniumExtensionsException('Sessions can only be restored when session_store is provided')
+        self.session_restored = self.session_store.restore(self.driver, self.session_key, navigate)
+        return self.session_restored
+
+    def _initialize_driver(self, browser, executable_path, run_headless, load_images, use_proxy, **driver_options):
+        self.driver = create_driver(browser,
+                                    executable_path=executable_path,
+                                    run_headless=run_headless,
+                                    load_images=load_images,
+                                    use_proxy=use_proxy,
+                                    **driver_options)
 
     def _initialize_methods(self):
-        self.shut_down = partial(shut_down, self.driver)
+        if self._pool is not None:
+            self.shut_down = partial(self._pool.checkin, self.driver)
+        elif self.supervisor is not None:
+            self.shut_down = partial(self.supervisor.shut_down, self.driver)
+        else:
+            self.shut_down = partial(shut_down, self.driver)
+        self.navigate = partial(navigate, self.driver)
         self.scroll = partial(scroll, self.driver)
         self.click_on_element = partial(click_on_element, self.driver)
         self.element_is_present = partial(element_is_present, self.driver)
@@ -292,3 +889,12 @@ class SeleniumDriver:
         self.wait_for_element_to_be_clickable = partial(
             wait_for_element_to_be_clickable, self.driver)
         self.populate_text_field = partial(populate_text_field, self.driver)
+        self.run_batch = partial(run_batch, self.driver)
+        self.count_elements = partial(count_elements, self.driver)
+        self.elements_are_present = partial(elements_are_present, self.driver)
+        self.wait_for_any_element = partial(wait_for_any_element, self.driver)
+        self.resource_stats = partial(resource_stats, self.driver)
+        self.resource_usage = partial(resource_usage, self.driver)
+        self.harvest = partial(harvest, self.driver)
+        self.extract = partial(extract, self.driver)
+        self.iter_extract = partial(iter_extract, self.driver)
@@ -0,0 +1,59 @@
+import threading
+
+
+_lock = threading.Lock()
+_display = None
+_references = 0
+
+
+def acquire_virtual_display(size=(1024, 768)):
+    '''Returns the virtual display shared by all of the drivers, starting it on first use
+
+    The display is reference counted: every call has to be paired with :func:`release_virtual_display`, and the ``Xvfb`` process is stopped when the last reference is released. ``pyvirtualdisplay`` is imported only when a display is actually needed.
+
+    Args:
+        size ((int, int)): size of the display. Only used when the display is started.
+
+    Returns:
+        pyvirtualdisplay.Display: shared virtual display.
+
+    Example:
+        ::
+
+            from selenium_extensions.display import acquire_virtual_display
+            from selenium_extensions.display import release_virtual_display
+
+
+            display = acquire_virtual_display()
+            ...
+            release_virtual_display(display)
+    '''
+    global _display, _references
+    with _lock:
+        if _display is None:
+            from pyvirtualdisplay import Display
+
+            _display = Display(visible=0, size=size)
+            _display.start()
+        _references += 1
+        return _display
+
+
+def release_virtual_display(display):
+    '''Releases a reference to the display returned by :func:`acquire_virtual_display`
+
+    Stops the shared display when nobody uses it anymore. Any other display is stopped right away.
+
+    Args:
+        display (pyvirtualdisplay.Display): display to release.
+    '''
+    global _display, _references
+    with _lock:
+        if display is not _display:
+            display.stop()
+            return
+        _references -= 1
+        if _references > 0:
+            return
+        _display, _references = None, 0
+    display.stop()
@@ -0,0 +1,572 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from collections import namedtuple
+
+from selenium_extensions.runner import IDLE
+from selenium_extensions.runner import ParallelRunner
+
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+DEAD = 'dead'
+
+Lease = namedtuple('Lease', ['token', 'item', 'attempts'])
+Lease.__doc__ = '''Work item leased to a node
+
+Attributes:
+    token (str): identifier of the lease, required to complete, fail or extend it. A lease that has expired and has been handed out again gets a new token, so a late answer to the old one is ignored.
+    item: leased work item.
+    attempts (int): number of times the item has been leased, including this lease.
+'''
+
+DeadLetter = namedtuple('DeadLetter', ['id', 'item', 'error', 'attempts'])
+DeadLetter.__doc__ = '''Work item that has failed ``max_attempts`` times
+
+Attributes:
+    id (int): identifier of the item in the queue, accepted by :meth:`QueueBackend.requeue`.
+    item: work item.
+    error (str): error of the last attempt.
+    attempts (int): number of attempts.
+'''
+
+
+class QueueBackend:
+    '''Interface of the work queues shared by :class:`Coordinator` and :class:`Node`
+
+    A queue keeps every item in one of the states ``pending``, ``leased``, ``done`` or ``dead``. Leased items are invisible to other nodes until their visibility timeout expires - an item of a node that died is handed out again and the expired lease counts as a failed attempt. An item failing ``max_attempts`` times becomes a dead letter. Items and results are JSON values.
+
+    Implement the methods below to back the queue with another store. With Redis, for example, pending and leased items map to a sorted set scored by the time they become visible, leases to a hash of tokens and leasing to a Lua script, so it's atomic across nodes. All of the methods may be called from several threads.
+
+    Args:
+        max_attempts (int): number of times an item is leased before it becomes a dead letter.
+        retry_delay (float): time in seconds a failed item is invisible for after its first failure, doubled after every further one.
+    '''
+
+    def __init__(self, max_attempts=3, retry_delay=0):
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    def put(self, items):
+        '''Adds work items to the queue
+
+        Args:
+            items (iterable): JSON serializable work items.
+
+        Returns:
+            int: number of added items.
+        '''
+        raise NotImplementedError
+
+    def lease(self, node, count=1, visibility_timeout=300):
+        '''Leases up to ``count`` visible items to ``node`` atomically
+
+        Args:
+            node (str): identifier of the node leasing the items.
+            count (int): maximum number of items to lease.
+            visibility_timeout (float): time in seconds the items are invisible to other nodes for.
+
+        Returns:
+            list: :class:`Lease` of every leased item, empty if no item is visible.
+        '''
+        raise NotImplementedError
+
+    def extend(self, token, visibility_timeout):
+        '''Keeps a leased item invisible for ``visibility_timeout`` seconds from now
+
+        Returns:
+            bool: False if the lease has expired and the item has been handed out again or finished.
+        '''
+        raise NotImplementedError
+
+    def complete(self, token, result=None):
+        '''Marks a leased item as done and stores its result
+
+        Returns:
+            bool: False if the lease has been lost, the result is dropped then.
+        '''
+        raise NotImplementedError
+
+    def fail(self, token, error):
+        '''Makes a leased item visible again after ``retry_delay`` or turns it into a dead letter
+
+        Returns:
+            str: new state of the item, ``pending`` or ``dead``. ``None`` if the lease has been lost.
+        '''
+        raise NotImplementedError
+
+    def counts(self):
+        '''Returns the number of items in every state
+
+        Returns:
+            dict: ``{state: count}`` with all of the four states.
+        '''
+        raise NotImplementedError
+
+    def results(self):
+        '''Returns ``(item, result)`` of the items done so far in the order they were added'''
+        raise NotImplementedError
+
+    def dead_letters(self):
+        '''Returns :class:`DeadLetter` of every dead item'''
+        raise NotImplementedError
+
+    def requeue(self, ids=None):
+        '''Makes dead items pending again with no attempts
+
+        Args:
+            ids (list): :attr:`DeadLetter.id` of the items to requeue, all of the dead items if ``None``.
+
+        Returns:
+            int: number of requeued items.
+        '''
+        raise NotImplementedError
+
+    def publish_stats(self, node, stats):
+        '''Stores the latest statistics of ``node``
+
+        Args:
+            node (str): identifier of the node.
+            stats (dict): JSON serializable statistics.
+        '''
+        raise NotImplementedError
+
+    def node_stats(self):
+        '''Returns the latest statistics published by every node
+
+        Returns:
+            dict: ``{node: stats}``, ``stats['published_at']`` is the time they were published.
+        '''
+        raise NotImplementedError
+
+    def close(self):
+        '''Releases the resources of the queue'''
+
+    def _retry_delay(self, attempts):
+        return self.retry_delay * 2 ** (attempts - 1) if self.retry_delay else 0
+
+
+class SQLiteQueue(QueueBackend):
+    '''Work queue stored in a SQLite database file
+
+    Coordinators and nodes running on one machine (or sharing a local file system, network file systems break SQLite locking) open the same file. Every call uses a short transaction of its own, leasing takes the write lock, so an item is never handed out twice while its lease is valid.
+
+    Args:
+        path (str): database file, created if it doesn't exist.
+        max_attempts (int): number of times an item is leased before it becomes a dead letter.
+        retry_delay (float): time in seconds a failed item is invisible for after its first failure, doubled after every further one.
+        timeout (float): time in seconds to wait for the lock of the database.
+
+    Example:
+        ::
+
+            from selenium_extensions.distributed import Coordinator
+            from selenium_extensions.distributed import SQLiteQueue
+
+
+            coordinator = Coordinator(SQLiteQueue('/var/lib/bots/queue.db', max_attempts=5))
+            coordinator.submit(urls)
+    '''
+
+    def __init__(self, path, max_attempts=3, retry_delay=0, timeout=30):
+        super().__init__(max_attempts, retry_delay)
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connection().executescript('''
+            CREATE TABLE IF NOT EXISTS items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                item TEXT NOT NULL,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                visible_at REAL NOT NULL DEFAULT 0,
+                token TEXT,
+                node TEXT,
+                result TEXT,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS items_visibility ON items (state, visible_at);
+            CREATE UNIQUE INDEX IF NOT EXISTS items_token ON items (token);
+            CREATE TABLE IF NOT EXISTS nodes (
+                node TEXT PRIMARY KEY,
+                stats TEXT NOT NULL
+            );
+        ''')
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            # Transactions are managed explicitly, leasing needs BEGIN IMMEDIATE
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+    def put(self, items):
+        rows = [(json.dumps(item), PENDING) for item in items]
+        with self._transaction() as connection:
+            connection.executemany('INSERT INTO items (item, state) VALUES (?, ?)', rows)
+        return len(rows)
+
+    def lease(self, node, count=1, visibility_timeout=300):
+        now = time.time()
+        leases = []
+        with self._transaction() as connection:
+            rows = connection.execute(
+                'SELECT id, item, state, attempts, node FROM items WHERE state IN (?, ?) AND visible_at <= ? '
+                'ORDER BY visible_at, id LIMIT ?', (PENDING, LEASED, now, count)).fetchall()
+            for item_id, item, state, attempts, previous_node in rows:
+                if state == LEASED and attempts >= self.max_attempts:
+                    connection.execute('UPDATE items SET state = ?, token = NULL, error = ? WHERE id = ?', (
+                        DEAD, 'Lease of node {} expired on the last attempt'.format(previous_node), item_id))
+                    continue
+                token = uuid.uuid4().hex
+                connection.execute(
+                    'UPDATE items SET state = ?, attempts = ?, visible_at = ?, token = ?, node = ? WHERE id = ?',
+                    (LEASED, attempts + 1, now + visibility_timeout, token, node, item_id))
+                leases.append(Lease(token, json.loads(item), attempts + 1))
+        return leases
+
+    def extend(self, token, visibility_timeout):
+        with self._transaction() as connection:
+            cursor = connection.execute('UPDATE items SET visible_at = ? WHERE token = ? AND state = ?',
+                                        (time.time() + visibility_timeout, token, LEASED))
+        return cursor.rowcount == 1
+
+    def complete(self, token, result=None):
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                'UPDATE items SET state = ?, token = NULL, result = ?, error = NULL WHERE token = ? AND state = ?',
+                (DONE, json.dumps(result, default=str), token, LEASED))
+        return cursor.rowcount == 1
+
+    def fail(self, token, error):
+        with self._transaction() as connection:
+            row = connection.execute('SELECT id, attempts FROM items WHERE token = ? AND state = ?',
+                                     (token, LEASED)).fetchone()
+            if row is None:
+                return None
+            item_id, attempts = row
+            state = DEAD if attempts >= self.max_attempts else PENDING
+            connection.execute('UPDATE items SET state = ?, token = NULL, error = ?, visible_at = ? WHERE id = ?',
+                               (state, error, time.time() + self._retry_delay(attempts), item_id))
+        return state
+
+    def counts(self):
+        counts = dict.fromkeys((PENDING, LEASED, DONE, DEAD), 0)
+        rows = self._connection().execute('SELECT state, COUNT(*) FROM items GROUP BY state').fetchall()
+        counts.update(rows)
+        return counts
+
+    def results(self):
+        rows = self._connection().execute('SELECT item, result FROM items WHERE state = ? ORDER BY id', (DONE,))
+        return [(json.loads(item), json.loads(result)) for item, result in rows]
+
+    def dead_letters(self):
+        rows = self._connection().execute(
+            'SELECT id, item, error, attempts FROM items WHERE state = ? ORDER BY id', (DEAD,))
+        return [DeadLetter(item_id, json.loads(item), error, attempts) for item_id, item, error, attempts in rows]
+
+    def requeue(self, ids=None):
+        with self._transaction() as connection:
+            if ids is None:
+                cursor = connection.execute(
+                    'UPDATE items SET state = ?, attempts = 0, visible_at = 0 WHERE state = ?', (PENDING, DEAD))
+                return cursor.rowcount
+            return sum(connection.execute(
+                'UPDATE items SET state = ?, attempts = 0, visible_at = 0 WHERE id = ? AND state = ?',
+                (PENDING, item_id, DEAD)).rowcount for item_id in ids)
+
+    def publish_stats(self, node, stats):
+        stats = dict(stats, published_at=time.time())
+        with self._transaction() as connection:
+            connection.execute('INSERT OR REPLACE INTO nodes (node, stats) VALUES (?, ?)', (node, json.dumps(stats)))
+
+    def node_stats(self):
+        rows = self._connection().execute('SELECT node, stats FROM nodes ORDER BY node')
+        return {node: json.loads(stats) for node, stats in rows}
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            self._local.connection = None
+            connection.close()
+
+
+class _Transaction:
+    '''Wraps a block in ``BEGIN IMMEDIATE`` / ``COMMIT``, rolls back on exceptions'''
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.connection.execute('COMMIT' if exc_type is None else 'ROLLBACK')
+        return False
+
+
+class Coordinator:
+    '''Submits work items to a queue and follows their progress across nodes
+
+    The coordinator never talks to the nodes directly - nodes lease items from the queue as they have free browsers and publish their statistics there.
+
+    Args:
+        queue (QueueBackend): queue shared with the nodes.
+
+    Example:
+        ::
+
+            from selenium_extensions.distributed import Coordinator
+            from selenium_extensions.distributed import SQLiteQueue
+
+
+            coordinator = Coordinator(SQLiteQueue('queue.db'))
+            coordinator.submit(urls)
+            coordinator.wait()
+            for item, result in coordinator.results():
+                print(item, result)
+            print(coordinator.dead_letters())
+            print(coordinator.stats()['total'])
+    '''
+
+    def __init__(self, queue):
+        self.queue = queue
+
+    def submit(self, items):
+        '''Adds work items to the queue
+
+        Args:
+            items (iterable): JSON serializable work items.
+
+        Returns:
+            int: number of added items.
+        '''
+        return self.queue.put(items)
+
+    def progress(self):
+        '''Returns the number of ``pending``, ``leased``, ``done`` and ``dead`` items'''
+        return self.queue.counts()
+
+    def wait(self, timeout=None, poll_interval=1):
+        '''Waits until no item is pending or leased
+
+        Args:
+            timeout (float): time in seconds to wait, ``None`` to wait forever.
+            poll_interval (float): time in seconds between checks.
+
+        Returns:
+            bool: True if the queue has drained, False on timeout.
+        '''
+        deadline = time.time() + timeout if timeout is not None else None
+        while True:
+            counts = self.queue.counts()
+            if not counts[PENDING] and not counts[LEASED]:
+                return True
+            if deadline is not None and time.time() >= deadline:
+                return False
+            time.sleep(poll_interval)
+
+    def results(self):
+        '''Returns ``(item, result)`` of the items done so far'''
+        return self.queue.results()
+
+    def dead_letters(self):
+        '''Returns :class:`DeadLetter` of the items that have failed ``max_attempts`` times'''
+        return self.queue.dead_letters()
+
+    def retry_dead_letters(self, ids=None):
+        '''Makes dead items pending again, see :meth:`QueueBackend.requeue`'''
+        return self.queue.requeue(ids)
+
+    def stats(self, stale_after=60):
+        '''Returns the statistics of every node and their totals
+
+        Args:
+            stale_after (float): time in seconds after which a node that hasn't published statistics isn't counted in the totals.
+
+        Returns:
+            dict: ``{'nodes': {node: stats}, 'total': totals}``. Totals sum up ``items``, ``failures``, ``busy``, ``free_slots`` and ``items_per_second`` of the live nodes and weight their mean latency by items, ``latency_p95`` is the highest one of the nodes.
+        '''
+        nodes = self.queue.node_stats()
+        now = time.time()
+        live = [stats for stats in nodes.values() if now - stats['published_at'] < stale_after]
+        total = {name: sum(stats[name] for stats in live)
+                 for name in ('items', 'failures', 'busy', 'free_slots', 'items_per_second')}
+        total['nodes'] = len(live)
+        measured = [stats for stats in live if stats['latency_mean'] is not None]
+        measured_items = sum(stats['items'] for stats in measured)
+        total['latency_mean'] = (sum(stats['latency_mean'] * stats['items'] for stats in measured) / measured_items
+                                 if measured_items else None)
+        total['latency_p95'] = max((stats['latency_p95'] for stats in live if stats['latency_p95'] is not None),
+                                   default=None)
+        return {'nodes': nodes, 'total': total}
+
+
+class Node:
+    '''Runs a bounded set of ``SeleniumDriver`` workers fed from a shared queue
+
+    The node is a :class:`selenium_extensions.runner.ParallelRunner` whose items are leased from ``queue`` one at a time, only when a worker is free - a node never holds more items than it has browsers, the rest stay available to other nodes. Leases of running items are extended in the background, so ``visibility_timeout`` only has to cover the time needed to notice a dead node. Failed items are retried by the queue up to its ``max_attempts`` (on any node), crashed workers are restarted by the runner. The node publishes its statistics to the queue every ``heartbeat`` seconds.
+
+    Args:
+        queue (QueueBackend): queue to lease items from.
+        bot_class (type): ``selenium_extensions.core.SeleniumDriver`` subclass to run. Has to be importable by worker processes.
+        workers (int): number of worker processes, i.e. browsers of the node. If set to ``None`` the number of CPUs is used.
+        method (str): name of the ``bot_class`` method that processes a single item.
+        node_id (str): identifier of the node, ``<host name>-<pid>`` by default.
+        visibility_timeout (float): time in seconds a leased item stays invisible to other nodes without a heartbeat.
+        heartbeat (float): time in seconds between lease extensions and statistics updates.
+        **bot_options: keyword arguments passed to ``bot_class``, e.g. ``browser``, ``run_headless``, ``load_images``.
+
+    Attributes:
+        node_id (str): identifier of the node.
+
+    Example:
+        ::
+
+            from selenium_extensions.core import SeleniumDriver
+            from selenium_extensions.distributed import Node
+            from selenium_extensions.distributed import SQLiteQueue
+
+
+            class TitleBot(SeleniumDriver):
+
+                def process_item(self, url):
+                    self.driver.get(url)
+                    return self.driver.title
+
+
+            node = Node(SQLiteQueue('/var/lib/bots/queue.db'), TitleBot, workers=4,
+                        browser='chrome', run_headless=True)
+            node.run(stop_when_empty=True)
+            print(node.stats())
+    '''
+
+    def __init__(self, queue, bot_class, workers=None, method='process_item', node_id=None,
+                 visibility_timeout=300, heartbeat=10, **bot_options):
+        self.queue = queue
+        self.node_id = node_id or '{}-{}'.format(socket.gethostname(), os.getpid())
+        self.visibility_timeout = visibility_timeout
+        self.heartbeat = heartbeat
+        # Crashes are retried by the queue, so every node counts towards max_attempts
+        self.runner = ParallelRunner(bot_class, processes=workers, method=method, max_retries=0, **bot_options)
+        self._leases = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._items = 0
+        self._failures = 0
+        self._latencies = deque(maxlen=1000)
+        self._started_at = None
+
+    def run(self, stop_when_empty=False, max_items=None):
+        '''Processes items from the queue until :meth:`stop` is called
+
+        Args:
+            stop_when_empty (bool): boolean flag that indicates if the node has to stop once no item is pending or leased.
+            max_items (int): number of items to lease before stopping.
+
+        Returns:
+            dict: final statistics of the node, see :meth:`stats`.
+
+        Raises:
+            selenium_extensions.exceptions.SeleniumExtensionsException: worker failed to create ``bot_class`` instance.
+        '''
+        self._stopping.clear()
+        self._started_at = time.time()
+        heartbeat = threading.Thread(target=self._beat, daemon=True)
+        heartbeat.start()
+        try:
+            for token, result in self.runner._run(self._tasks(stop_when_empty, max_items)):
+                with self._lock:
+                    self._leases.pop(token, None)
+                    self._items += 1
+                    self._latencies.append(result.elapsed)
+                if result.error is None:
+                    if not self.queue.complete(token, result.result):
+                        logger.warning('Lease of %r expired before it was completed', result.item)
+                else:
+                    with self._lock:
+                        self._failures += 1
+                    state = self.queue.fail(token, result.error)
+                    logger.info('Item %r failed, it is %s now', result.item, state or 'leased by another node')
+        finally:
+            self._stopping.set()
+            heartbeat.join()
+            with self._lock:
+                abandoned, self._leases = list(self._leases), {}
+            for token in abandoned:
+                self.queue.fail(token, 'Node {} stopped before the item was processed'.format(self.node_id))
+            self.queue.publish_stats(self.node_id, self.stats())
+        return self.stats()
+
+    def stop(self):
+        '''Stops leasing new items, :meth:`run` returns once the running ones are finished'''
+        self._stopping.set()
+
+    def _tasks(self, stop_when_empty, max_items):
+        leased = 0
+        while not self._stopping.is_set() and (max_items is None or leased < max_items):
+            leases = self.queue.lease(self.node_id, 1, self.visibility_timeout)
+            if not leases:
+                if stop_when_empty:
+                    counts = self.queue.counts()
+                    if not counts[PENDING] and not counts[LEASED]:
+                        return
+                yield IDLE
+                continue
+            lease = leases[0]
+            leased += 1
+            with self._lock:
+                self._leases[lease.token] = lease
+            yield lease.token, lease.item
+
+    def _beat(self):
+        while not self._stopping.wait(self.heartbeat):
+            with self._lock:
+                tokens = list(self._leases)
+            for token in tokens:
+                if not self.queue.extend(token, self.visibility_timeout):
+                    logger.warning('Lease %s has expired while the item was processed', token)
+            self.queue.publish_stats(self.node_id, self.stats())
+
+    def stats(self):
+        '''Returns throughput and latency statistics of the node
+
+        Returns:
+            dict: ``node``, ``workers``, ``busy`` and ``free_slots`` (workers with and without an item), processed ``items``, ``failures``, ``items_per_second`` since the start and ``latency_mean``, ``latency_p50``, ``latency_p95`` in seconds over the last 1000 items.
+        '''
+        with self._lock:
+            latencies = sorted(self._latencies)
+            busy = len(self._leases)
+            items, failures = self._items, self._failures
+        wall_time = time.time() - self._started_at if self._started_at else 0
+
+        def percentile(fraction):
+            return latencies[min(int(len(latencies) * fraction), len(latencies) - 1)] if latencies else None
+
+        return {
+            'node': self.node_id,
+            'workers': self.runner.processes,
+            'busy': busy,
+            'free_slots': self.runner.processes - busy,
+            'items': items,
+            'failures': failures,
+            'items_per_second': items / wall_time if wall_time else 0.0,
+            'latency_mean': sum(latencies) / len(latencies) if latencies else None,
+            'latency_p50': percentile(0.5),
+            'latency_p95': percentile(0.95),
+        }
@@ -1,21 +1,35 @@
-import os
+'''Driver factories
 
-from pyvirtualdisplay import Display
-from selenium import webdriver
+Browser backends are imported by the factory that needs them: ``selenium.webdriver`` loads the modules of every browser Selenium supports, so importing it with ``selenium_extensions`` would make processes that never launch a browser (or launch it later) pay for it at startup.
+'''
+from selenium_extensions.display import acquire_virtual_display
+from selenium_extensions.display import release_virtual_display
+from selenium_extensions.exceptions import SeleniumExtensionsException
+from selenium_extensions.proxies import attach_proxy
+from selenium_extensions.proxies import chrome_proxy_extension
+from selenium_extensions.proxies import lease_proxy
+from selenium_extensions.proxies import switch_proxy
 
 
 def chrome_driver(executable_path=None, run_headless=False,
-                  load_images=True, use_proxy=None):
+                  load_images=True, use_proxy=None, resource_policy=None,
+                  profile=None, page_load_strategy='normal'):
     '''Function to initialize ``selenium.webdriver.Chrome`` with extended options
 
     Args:
         executable_path (str): path to the chromedriver binary. If set to ``None`` selenium will serach for ``chromedriver`` in ``$PATH``.
         run_headless (bool): boolean flag that indicates if chromedriver has to be headless (without GUI).
         load_images (bool): boolean flag that indicates if Chrome has to render images.
-        use_proxy (str): use http proxy in <host:port> format.
+        use_proxy (str, selenium_extensions.proxies.Proxy or selenium_extensions.proxies.ProxyPool): proxy in ``[scheme://][user:password@]host[:port]`` format (``host:port`` is an HTTP proxy) or pool to take it from. Authenticated proxies and pools are handled by a bundled extension, which can switch the proxy at runtime - see :func:`selenium_extensions.proxies.switch_proxy`.
+        resource_policy (selenium_extensions.filtering.ResourcePolicy): resource types and URL patterns Chrome mustn't load.
+        profile (str or selenium_extensions.profiles.ProfileTemplate): user data directory or template to clone it from.
+        page_load_strategy ('normal', 'eager' or 'none'): when ``get`` returns - after the ``load`` event, after ``DOMContentLoaded`` or right after the navigation has started. See :func:`selenium_extensions.core.navigate`.
 
     Returns:
-        selenium.webdriver.Chrome: created driver.
+        selenium.webdriver.Chrome: created driver. Its proxy is available as ``proxy`` attribute.
+
+    Raises:
+        selenium_extensions.exceptions.SeleniumExtensionsException: an authenticated proxy is used with headless Chrome, which doesn't load extensions.
 
     Note:
         In order to create Chrome driver Selenium requires `Chrome <https://www.google.com/chrome/browser/desktop/index.html>`_ to be installed and `chromedriver <https://sites.google.com/a/chromium.org/chromedriver/>`_ to be downloaded.
@@ -23,71 +37,217 @@ def chrome_driver(executable_path=None, run_headless=False,
     Warning:
         Headless Chrome is shipping in Chrome 59 and in Chrome 60 for Windows. Update your Chrome browser if you want to use ``headless`` option.
     '''
+    from selenium import webdriver
+    from selenium_extensions.profiles import ProfileClone
+    from selenium_extensions.profiles import ProfileTemplate
+
     chrome_options = webdriver.ChromeOptions()
     if run_headless:
         chrome_options.add_argument('headless')
     if not load_images:
         prefs = {'profile.managed_default_content_settings.images': 2}
         chrome_options.add_experimental_option('prefs', prefs)
-    if use_proxy:
-        chrome_options.add_argument('proxy-server=' + use_proxy)
+    proxy = lease_proxy(use_proxy)
+    # Chrome takes no proxy credentials on the command line, the extension answers the challenges instead
+    use_extension = proxy is not None and (proxy.username is not None or proxy.pool is not None)
+    if use_extension and run_headless:
+        if proxy.username is not None:
+            raise SeleniumExtensionsException('Authenticated proxies require the proxy extension, '
+                                              'which headless Chrome doesn\'t load')
+        use_extension = False
+    if use_extension:
+        chrome_options.add_encoded_extension(chrome_proxy_extension())
+    elif proxy is not None:
+        chrome_options.add_argument(proxy.chrome_argument())
+    if isinstance(profile, ProfileTemplate):
+        profile = profile.clone()
+    if isinstance(profile, ProfileClone):
+        chrome_options.add_argument('user-data-dir=' + profile.profile_dir)
+    elif profile:
+        chrome_options.add_argument('user-data-dir=' + profile)
+    driver_kwargs = {'chrome_options': chrome_options}
     if executable_path:
-        driver = webdriver.Chrome(chrome_options=chrome_options,
-                                  executable_path=executable_path)
+        driver_kwargs['executable_path'] = executable_path
+    desired_capabilities = {'pageLoadStrategy': page_load_strategy}
+    if resource_policy is not None:
+        desired_capabilities.update(resource_policy.chrome_capabilities())
+    driver_kwargs['desired_capabilities'] = desired_capabilities
+    try:
+        driver = webdriver.Chrome(**driver_kwargs)
+    except Exception:
+        if isinstance(profile, ProfileClone):
+            profile.remove()
+        raise
+    driver.profile_clone = profile if isinstance(profile, ProfileClone) else None
+    if use_extension:
+        attach_proxy(driver, None, 'extension')
+        try:
+            switch_proxy(driver, proxy)
+        except Exception:
+            driver.quit()
+            _release_resources(driver)
+            raise
     else:
-        driver = webdriver.Chrome(chrome_options=chrome_options)
+        attach_proxy(driver, proxy)
+    if resource_policy is not None:
+        resource_policy.apply_to_chrome(driver)
     return driver
 
 
 def firefox_driver(executable_path=None, run_headless=False,
-                   load_images=True, use_proxy=None):
+                   load_images=True, use_proxy=None, resource_policy=None,
+                   virtual_display=False, profile=None, page_load_strategy='normal'):
     '''Function to initialize ``selenium.webdriver.Firefox`` with extended options
 
     Args:
         executable_path (str): path to the ``geckdriver`` binary. If set to ``None`` selenium will search for ``geckdriver`` in ``$PATH``.
-        run_headless (bool): boolean flag that indicates if ``geckodriver`` has to be headless (without GUI). ``geckodriver`` doesn't support native headless mode, that's why ``pyvirtualdisplay`` is used.
+        run_headless (bool): boolean flag that indicates if ``geckodriver`` has to be headless (without GUI). Firefox's native headless mode is used unless ``virtual_display`` is set.
         load_images (bool): boolean flag that indicates if Firefox has to render images.
-        use_proxy (str): use http proxy in <host:port> format.
+        use_proxy (str, selenium_extensions.proxies.Proxy or selenium_extensions.proxies.ProxyPool): proxy in ``[scheme://]host[:port]`` format (``host:port`` is an HTTP proxy) or pool to take it from. The proxy can be switched at runtime with :func:`selenium_extensions.proxies.switch_proxy` unless ``resource_policy`` blocks URL patterns.
+        resource_policy (selenium_extensions.filtering.ResourcePolicy): resource types and URL patterns Firefox mustn't load.
+        virtual_display (bool): boolean flag that indicates if headless Firefox has to run in a virtual display instead of the native headless mode, e.g. for Firefox older than 56. The display is shared by all of the drivers and stopped when the last of them shuts down.
+        profile (str, selenium.webdriver.FirefoxProfile or selenium_extensions.profiles.ProfileTemplate): profile directory, profile or template to clone it from.
+        page_load_strategy ('normal', 'eager' or 'none'): when ``get`` returns - after the ``load`` event, after ``DOMContentLoaded`` or right after the navigation has started. See :func:`selenium_extensions.core.navigate`.
 
     Returns:
-        selenium.webdriver.Firefox: created driver.
+        selenium.webdriver.Firefox: created driver. Its proxy is available as ``proxy`` attribute.
+
+    Raises:
+        selenium_extensions.exceptions.SeleniumExtensionsException: an authenticated proxy is used, Firefox can't authenticate to a proxy without user interaction, or ``load_images`` is off but ``profile`` is a template built with images.
 
     Note:
         In order to create Firefox driver Selenium requires `Firefox <https://www.mozilla.org/en-US/firefox/new/>`_ to be installed and `geckodriver <https://github.com/mozilla/geckodriver/releases>`_ to be downloaded.
 
     Note:
-        Firefox doesn't support native headless mode. We use ``pyvirtualdisplay`` to simulate it. In order ``pyvirtualdisplay`` to work you need to install ``Xvfb`` package: ``sudo apt install xvfb``.
+        Native headless mode requires Firefox 56 or newer. For older versions use ``virtual_display=True`` - ``pyvirtualdisplay`` is used to simulate it then. In order ``pyvirtualdisplay`` to work you need to install ``Xvfb`` package: ``sudo apt install xvfb``.
     '''
-    firefox_profile = webdriver.FirefoxProfile()
-    if run_headless:
-        display = Display(visible=0, size=(1024, 768))
-        display.start()
+    from selenium import webdriver
+    from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
+    from selenium_extensions.profiles import ProfileClone
+    from selenium_extensions.profiles import ProfileTemplate
+    from selenium_extensions.profiles import QUICKJAVA_EXTENSION
+
+    firefox_options = webdriver.FirefoxOptions()
+    if isinstance(profile, (ProfileTemplate, ProfileClone)):
+        template = profile.template if isinstance(profile, ProfileClone) else profile
+        # Prebuilt profiles are sent as they are, the extension can't be added to them
+        if not load_images and QUICKJAVA_EXTENSION not in template.extensions:
+            raise SeleniumExtensionsException(
+                'Profile template {} loads images, build it with load_images=False'.format(template.directory))
+    if isinstance(profile, ProfileTemplate):
+        profile = profile.clone()
+    if isinstance(profile, ProfileClone):
+        firefox_profile = profile.firefox_profile()
+        firefox_options.set_preference('browser.cache.disk.parent_directory', profile.cache_dir)
+    elif isinstance(profile, webdriver.FirefoxProfile):
+        firefox_profile = profile
     else:
-        display = None
+        firefox_profile = webdriver.FirefoxProfile(profile)
+    display = None
+    if run_headless:
+        if virtual_display:
+            display = acquire_virtual_display()
+        else:
+            firefox_options.add_argument('-headless')
+    # Preferences are passed through the options, so that prebuilt profiles don't have to be zipped again
     if not load_images:
-        firefox_profile.add_extension(os.path.dirname(
-            os.path.realpath(__file__)) +
-            '/browser_extensions/firefox/quickjava-2.1.2-fx.xpi')
+        if not isinstance(profile, ProfileClone):
+            firefox_profile.add_extension(QUICKJAVA_EXTENSION)
         # Prevents loading the 'thank you for installing screen'
-        firefox_profile.set_preference(
+        firefox_options.set_preference(
             'thatoneguydotnet.QuickJava.curVersion', '2.1.2.1')
         # Turns images off
-        firefox_profile.set_preference(
+        firefox_options.set_preference(
             'thatoneguydotnet.QuickJava.startupStatus.Images', 2)
         # Turns animated images off
-        firefox_profile.set_preference(
+        firefox_options.set_preference(
             'thatoneguydotnet.QuickJava.startupStatus.AnimatedImage', 2)
-    if use_proxy:
-        _ = use_proxy.split(':')
-        firefox_profile.set_preference('network.proxy.type', 1)
-        firefox_profile.set_preference('network.proxy.http', _[0])
-        firefox_profile.set_preference('network.proxy.http_port', int(_[1]))
-        firefox_profile.set_preference('network.proxy.ssl', _[0])
-        firefox_profile.set_preference('network.proxy.ssl_port', int(_[1]))
+    proxy = lease_proxy(use_proxy)
+    if proxy is not None:
+        if proxy.username is not None:
+            raise SeleniumExtensionsException('Firefox can\'t authenticate to a proxy without user interaction')
+        for name, value in proxy.firefox_preferences().items():
+            firefox_options.set_preference(name, value)
+    # A PAC file of the policy routes the requests itself, so the proxy can't be switched by the preferences
+    switchable = True
+    if resource_policy is not None:
+        policy_preferences = resource_policy.firefox_preferences(proxy)
+        switchable = 'network.proxy.autoconfig_url' not in policy_preferences
+        for name, value in policy_preferences.items():
+            firefox_options.set_preference(name, value)
+    capabilities = DesiredCapabilities.FIREFOX.copy()
+    capabilities['pageLoadStrategy'] = page_load_strategy
+    driver_kwargs = {'firefox_profile': firefox_profile,
+                     'firefox_options': firefox_options,
+                     'capabilities': capabilities}
     if executable_path:
-        driver = webdriver.Firefox(
-            firefox_profile, executable_path=executable_path)
-    else:
-        driver = webdriver.Firefox(firefox_profile)
+        driver_kwargs['executable_path'] = executable_path
+    try:
+        driver = webdriver.Firefox(**driver_kwargs)
+    except Exception:
+        if display is not None:
+            release_virtual_display(display)
+        if isinstance(profile, ProfileClone):
+            profile.remove()
+        raise
+    driver.profile_clone = profile if isinstance(profile, ProfileClone) else None
     driver.display = display
+    attach_proxy(driver, proxy, 'preferences' if switchable else None)
     return driver
+
+
+def create_driver(browser='chrome', resource_limits=None, **driver_options):
+    '''Creates a webdriver for ``browser`` using the matching driver factory
+
+    Args:
+        browser ('chrome', 'firefox' or 'fake'): webdriver to create.
+        resource_limits (selenium_extensions.monitoring.ResourceLimits): memory and CPU caps applied to the processes of the driver right after the launch.
+        **driver_options: keyword arguments passed to :func:`chrome_driver`, :func:`firefox_driver` or :func:`selenium_extensions.fake.fake_driver`.
+
+    Returns:
+        selenium.webdriver.Chrome, selenium.webdriver.Firefox or selenium_extensions.fake.FakeWebDriver: created driver.
+
+    Raises:
+        selenium_extensions.exceptions.SeleniumExtensionsException: ``browser`` is not supported by ``selenium_extensions`` or ``resource_limits`` can't be applied.
+
+    Example:
+        ::
+
+            from selenium_extensions.drivers import create_driver
+
+
+            driver = create_driver('firefox', run_headless=True, load_images=False)
+    '''
+    from selenium_extensions.fake import fake_driver
+
+    available_browsers = {'chrome': chrome_driver, 'firefox': firefox_driver, 'fake': fake_driver}
+    browser = (browser or 'chrome').lower()
+    if browser not in available_browsers:
+        raise SeleniumExtensionsException('Provided browser ({}) isn\'t \
+            supported by selenium_extensions package. Available browsers \
+            are {}'.format(browser, ', '.join(sorted(available_browsers))))
+    driver = available_browsers[browser](**driver_options)
+    if resource_limits is not None:
+        try:
+            resource_limits.apply(driver)
+        except SeleniumExtensionsException:
+            driver.quit()
+            _release_resources(driver)
+            raise
+    return driver
+
+
+def _release_resources(driver):
+    '''Releases the virtual display, the cloned profile and the cgroup of a stopped driver, only once'''
+    display = getattr(driver, 'display', None)
+    if display is not None:
+        driver.display = None
+        release_virtual_display(display)
+    profile_clone = getattr(driver, 'profile_clone', None)
+    if profile_clone is not None:
+        driver.profile_clone = None
+        profile_clone.remove()
+    resource_limits = getattr(driver, 'resource_limits', None)
+    if resource_limits is not None:
+        driver.resource_limits = None
+        resource_limits.release(driver)
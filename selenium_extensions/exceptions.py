@@ -1,2 +1,6 @@
 class SeleniumExtensionsException(Exception):
     '''Base class for a selenium_extensions package exception'''
+
+
+class DriverHangException(SeleniumExtensionsException):
+    '''The driver hung or died and had to be killed'''
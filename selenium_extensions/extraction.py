@@ -0,0 +1,98 @@
+from selenium_extensions.exceptions import SeleniumExtensionsException
+from selenium_extensions.instrumentation import instrumented
+from selenium_extensions.scripts import EXTRACT_ROWS
+
+
+def field_specs(fields):
+    '''Converts ``fields`` of :func:`extract` into the ``[name, selector, attribute]`` lists the page scripts take
+
+    Args:
+        fields (dict): ``{name: selector or (selector, attribute)}``, see :func:`extract`.
+
+    Returns:
+        list: a ``[name, selector, attribute]`` list per field, ``None`` if ``fields`` is ``None``.
+    '''
+    if fields is None:
+        return None
+    specs = []
+    for name, field in fields.items():
+        if field is None or isinstance(field, str):
+            field = (field, 'text')
+        selector, attribute = field
+        specs.append([name, selector, attribute])
+    return specs
+
+
+@instrumented()
+def extract(driver, row_locator, fields, root=None):
+    '''Extracts a record from every row matched by ``row_locator`` in a single script round-trip
+
+    Args:
+        driver (selenium.webdriver.): Selenium webdriver to use.
+        row_locator ((selenium.webdriver.common.by.By., str)): locator of a single row described using `By`.
+        fields (dict): fields to extract from every row - ``{name: css_selector}`` for the text of a descendant or ``{name: (css_selector, attribute)}`` for its attribute. ``None`` as a selector means the row itself, ``'text'`` and ``'html'`` are special attributes. Missing descendants give ``None``.
+        root (selenium.webdriver.remote.webelement.WebElement): element to search rows in instead of the whole page.
+
+    Returns:
+        list: a dict per row, in document order.
+
+    Example:
+        ::
+
+            from selenium import webdriver
+            from selenium.webdriver.common.by import By
+            from selenium_extensions.extraction import extract
+
+
+            driver = webdriver.Chrome()
+            driver.get('https://example.com/products')
+            products = extract(driver, (By.CSS_SELECTOR, 'table#products tbody tr'), {
+                'name': 'td.name',
+                'price': 'td.price',
+                'url': ('td.name a', 'href'),
+                'id': (None, 'data-id'),
+            })
+    '''
+    _, _, records = driver.execute_script(
+        EXTRACT_ROWS, row_locator[0], row_locator[1], field_specs(fields), root, 0, None, None)
+    return records
+
+
+def iter_extract(driver, row_locator, fields, chunk_size=500, root=None):
+    '''Same as :func:`extract`, but yields the records in chunks of ``chunk_size`` rows
+
+    Rows are located once and kept in the page between chunks, so only a chunk at a time has to be serialized, sent over the wire and held in memory. Use it for pages with tens of thousands of rows.
+
+    Args:
+        driver (selenium.webdriver.): Selenium webdriver to use.
+        row_locator ((selenium.webdriver.common.by.By., str)): locator of a single row described using `By`.
+        fields (dict): fields to extract from every row, see :func:`extract`.
+        chunk_size (int): number of rows extracted by a single script call.
+        root (selenium.webdriver.remote.webelement.WebElement): element to search rows in instead of the whole page.
+
+    Yields:
+        dict: a record per row, in document order.
+
+    Raises:
+        SeleniumExtensionsException: the page navigated away while the rows were being extracted.
+
+    Example:
+        ::
+
+            from selenium_extensions.extraction import iter_extract
+
+
+            for record in iter_extract(driver, (By.CSS_SELECTOR, 'tr.row'), {'id': (None, 'data-id'), 'name': 'td'}):
+                save(record)
+    '''
+    specs = field_specs(fields)
+    offset, total, token = 0, None, None
+    while total is None or offset < total:
+        chunk = driver.execute_script(
+            EXTRACT_ROWS, row_locator[0], row_locator[1], specs, root, offset, chunk_size, token)
+        if chunk is None:
+            raise SeleniumExtensionsException('The page has changed during the extraction')
+        token, total, records = chunk
+        offset += len(records)
+        for record in records:
+            yield record
@@ -0,0 +1,1394 @@
+'''In-process fake WebDriver backed by a static HTML model
+
+:class:`FakeWebDriver` speaks the WebDriver protocol to an in-process :class:`FakeBrowser` instead of a browser, so command hooks, ``WebElement`` and Selenium exceptions work exactly as with a real driver. Pages are parsed into a DOM without CSS layout or JavaScript: element visibility comes from the ``hidden`` attribute and inline ``display``/``visibility`` styles, and the scripts ``selenium_extensions`` runs inside the page (see :mod:`selenium_extensions.scripts`) are emulated in Python.
+'''
+import base64
+import itertools
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from collections import OrderedDict
+from html import escape
+from html.parser import HTMLParser
+from urllib.error import HTTPError
+from urllib.parse import unquote
+from urllib.parse import urldefrag
+from urllib.parse import urlencode
+from urllib.parse import urljoin
+from urllib.parse import urlsplit
+from urllib.parse import urlunsplit
+from urllib.request import urlopen
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.command import Command
+from selenium.webdriver.remote.errorhandler import ErrorCode
+from selenium.webdriver.remote.webdriver import WebDriver as RemoteWebDriver
+
+from selenium_extensions import scripts
+from selenium_extensions.proxies import attach_proxy
+from selenium_extensions.proxies import lease_proxy
+
+
+VOID_TAGS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source', 'track', 'wbr',
+])
+BLOCK_TAGS = frozenset([
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'fieldset', 'figcaption', 'figure',
+    'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav', 'ol', 'option', 'p',
+    'pre', 'section', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'ul',
+])
+# Elements that are never rendered
+HIDDEN_TAGS = frozenset(['head', 'link', 'meta', 'noscript', 'script', 'style', 'template', 'title'])
+BOOLEAN_ATTRIBUTES = frozenset([
+    'async', 'autofocus', 'checked', 'defer', 'disabled', 'hidden', 'multiple', 'readonly', 'required', 'selected',
+])
+FORM_CONTROLS = frozenset(['button', 'input', 'option', 'select', 'textarea'])
+# Start tags closing the listed open elements, e.g. <li> closes the previous <li>
+IMPLICITLY_CLOSED = {
+    'li': ('li',), 'option': ('option',), 'p': ('p',), 'tr': ('tr', 'td', 'th'), 'td': ('td', 'th'), 'th': ('td', 'th'),
+}
+POLL_INTERVAL = 0.05
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) selenium_extensions FakeWebDriver'
+
+# Keys.ENTER, Keys.RETURN and Keys.BACKSPACE, the rest of the special keys is ignored
+_ENTER_KEYS = ('\ue006', '\ue007')
+_BACKSPACE = '\ue003'
+
+
+class _FakeError(Exception):
+    '''Error returned to ``FakeWebDriver`` as a WebDriver error response'''
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code[0]
+        self.message = message
+
+
+class Node:
+    '''Element or text node of a fake document
+
+    Scheduled callbacks and script handlers may change the document through :meth:`append`, :meth:`remove`, ``attrs`` and ``state``.
+
+    Attributes:
+        tag (str): lowercase tag name, ``None`` for text nodes.
+        attrs (dict): attributes of the element.
+        text (str): text of a text node.
+        children (list): child nodes.
+        parent (Node): parent node, ``None`` if the node is detached.
+        state (dict): runtime state changed by the user, e.g. ``value``, ``checked`` and ``selected``.
+    '''
+
+    def __init__(self, tag=None, attrs=None, text=None):
+        self.tag = tag
+        self.attrs = attrs if attrs is not None else {}
+        self.text = text
+        self.children = []
+        self.parent = None
+        self.state = {}
+        self.element_id = None
+
+    def __repr__(self):
+        if self.tag is None:
+            return '<Node text {!r}>'.format(self.text[:20])
+        return '<Node {}{}>'.format(self.tag, ''.join(' {}="{}"'.format(*item) for item in self.attrs.items()))
+
+    @property
+    def is_element(self):
+        return self.tag is not None and self.tag != '#document'
+
+    @property
+    def classes(self):
+        return self.attrs.get('class', '').split()
+
+    def root(self):
+        node = self
+        while node.parent is not None:
+            node = node.parent
+        return node
+
+    def element_children(self):
+        return [child for child in self.children if child.is_element]
+
+    def descendants(self):
+        '''Yields the descendant elements in document order'''
+        stack = list(reversed(self.children))
+        while stack:
+            node = stack.pop()
+            if node.tag is not None:
+                yield node
+                stack.extend(reversed(node.children))
+
+    def append(self, content):
+        '''Appends a node or nodes parsed from an HTML string
+
+        Args:
+            content (Node or str): node or HTML to append.
+
+        Returns:
+            list: appended nodes.
+        '''
+        nodes = [content] if isinstance(content, Node) else _parse_fragment(content)
+        for node in nodes:
+            if node.parent is not None:
+                node.parent.children.remove(node)
+            node.parent = self
+            self.children.append(node)
+        self._mutated()
+        return nodes
+
+    def remove(self):
+        '''Detaches the node from its document, making its WebElement stale'''
+        if self.parent is not None:
+            self._mutated()
+            self.parent.children.remove(self)
+            self.parent = None
+
+    def _mutated(self):
+        root = self.root()
+        if isinstance(root, Document):
+            root.mutations += 1
+
+
+class Document(Node):
+    '''Document of a page loaded by :class:`FakeBrowser`
+
+    Attributes:
+        url (str): URL of the document.
+        mutations (int): number of nodes added or removed since the document has been loaded.
+        ready_at (float): time the document finishes loading, its ``readyState`` is ``loading`` until then.
+    '''
+
+    def __init__(self, url, html, load_time=0):
+        super().__init__('#document')
+        self.url = url
+        self.mutations = 0
+        self.ready_at = 0
+        self.timing = {'ttfb': load_time * 1000, 'dom_content_loaded': load_time * 1000, 'load': load_time * 1000}
+        self.navigating = False
+        self.extractions = {}
+        self.cache_token = None
+        self.cache_mutations = 0
+        builder = _TreeBuilder(self)
+        builder.feed(html)
+        builder.close()
+
+    @property
+    def title(self):
+        for node in self.descendants():
+            if node.tag == 'title':
+                return ' '.join(_text_content(node).split())
+        return ''
+
+
+class _TreeBuilder(HTMLParser):
+    '''Builds the node tree of a document, closing elements the way lenient HTML parsers do'''
+
+    def __init__(self, root):
+        super().__init__(convert_charrefs=True)
+        self.stack = [root]
+
+    def handle_starttag(self, tag, attrs):
+        closed = IMPLICITLY_CLOSED.get(tag, ())
+        while len(self.stack) > 1 and self.stack[-1].tag in closed:
+            self.stack.pop()
+        node = Node(tag, OrderedDict((name, value if value is not None else '') for name, value in attrs))
+        self._adopt(node)
+        if tag not in VOID_TAGS:
+            self.stack.append(node)
+
+    def handle_startendtag(self, tag, attrs):
+        self._adopt(Node(tag, OrderedDict((name, value if value is not None else '') for name, value in attrs)))
+
+    def handle_endtag(self, tag):
+        for index in range(len(self.stack) - 1, 0, -1):
+            if self.stack[index].tag == tag:
+                del self.stack[index:]
+                return
+
+    def handle_data(self, data):
+        self._adopt(Node(text=data))
+
+    def _adopt(self, node):
+        node.parent = self.stack[-1]
+        self.stack[-1].children.append(node)
+
+
+def _parse_fragment(html):
+    container = Node('#fragment')
+    builder = _TreeBuilder(container)
+    builder.feed(html)
+    builder.close()
+    for node in container.children:
+        node.parent = None
+    return container.children
+
+
+def _serialize(node):
+    if node.tag is None:
+        if node.parent is not None and node.parent.tag in ('script', 'style'):
+            return node.text
+        return escape(node.text, quote=False)
+    inner = ''.join(_serialize(child) for child in node.children)
+    if not node.is_element:
+        return inner
+    attrs = ''.join(' {}="{}"'.format(name, escape(value)) for name, value in node.attrs.items())
+    if node.tag in VOID_TAGS:
+        return '<{}{}>'.format(node.tag, attrs)
+    return '<{0}{1}>{2}</{0}>'.format(node.tag, attrs, inner)
+
+
+def _text_content(node):
+    if node.tag is None:
+        return node.text
+    return ''.join(_text_content(child) for child in node.children)
+
+
+def _hidden_itself(node):
+    if node.tag in HIDDEN_TAGS or 'hidden' in node.attrs:
+        return True
+    if node.tag == 'input' and node.attrs.get('type', '').lower() == 'hidden':
+        return True
+    style = node.attrs.get('style', '').replace(' ', '').lower()
+    return 'display:none' in style or 'visibility:hidden' in style
+
+
+def _displayed(node):
+    while node is not None and node.is_element:
+        if _hidden_itself(node):
+            return False
+        node = node.parent
+    return True
+
+
+def _visible_text(node):
+    '''Approximates ``innerText``: rendered text with collapsed whitespace and a line per block'''
+    if not _displayed(node):
+        return ''
+    parts = []
+
+    def walk(parent):
+        for child in parent.children:
+            if child.tag is None:
+                parts.append(child.text)
+            elif not _hidden_itself(child):
+                block = child.tag in BLOCK_TAGS
+                if block:
+                    parts.append('\n')
+                walk(child)
+                if block:
+                    parts.append('\n')
+
+    walk(node)
+    lines = (' '.join(line.split()) for line in ''.join(parts).split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+def _select_of(option):
+    node = option.parent
+    while node is not None and node.tag != 'select':
+        node = node.parent
+    return node
+
+
+def _selected_option(select):
+    options = [node for node in select.descendants() if node.tag == 'option']
+    selected = [option for option in options if option.state.get('selected', 'selected' in option.attrs)]
+    if selected:
+        return selected[-1]
+    if select.state.get('deselected'):
+        return None
+    return options[0] if options else None
+
+
+def _is_selected(node):
+    if node.tag == 'option':
+        select = _select_of(node)
+        return _selected_option(select) is node if select is not None else 'selected' in node.attrs
+    return _is_checked(node)
+
+
+def _is_checked(node):
+    return node.tag == 'input' and node.state.get('checked', 'checked' in node.attrs)
+
+
+def _value(node):
+    if node.tag == 'select':
+        option = _selected_option(node)
+        return _value(option) if option is not None else ''
+    if 'value' in node.state:
+        return node.state['value']
+    if node.tag == 'textarea':
+        return _text_content(node)
+    if node.tag == 'option':
+        return node.attrs.get('value', ' '.join(_text_content(node).split()))
+    if node.tag == 'input' and node.attrs.get('type', '').lower() in ('checkbox', 'radio'):
+        return node.attrs.get('value', 'on')
+    return node.attrs.get('value', '')
+
+
+def _set_value(node, value):
+    value = '' if value is None else str(value)
+    if node.tag != 'select':
+        node.state['value'] = value
+        return
+    options = [option for option in node.descendants() if option.tag == 'option']
+    match = next((option for option in options if _value(option) == value), None)
+    for option in options:
+        option.state['selected'] = option is match
+    node.state['deselected'] = match is None
+
+
+def _property(node, name, base_url):
+    '''Returns the DOM property ``name`` of the element or ``None`` if it's undefined'''
+    if name == 'value' and node.tag in FORM_CONTROLS:
+        return _value(node)
+    if name == 'checked' and node.tag == 'input':
+        return _is_checked(node)
+    if name == 'selected' and node.tag == 'option':
+        return _is_selected(node)
+    if name == 'disabled' and node.tag in FORM_CONTROLS:
+        return 'disabled' in node.attrs
+    if name in ('href', 'src', 'action') and name in node.attrs:
+        return urljoin(base_url, node.attrs[name])
+    if name in ('id', 'title', 'lang', 'dir'):
+        return node.attrs.get(name, '')
+    if name in ('name', 'placeholder') and node.tag in FORM_CONTROLS:
+        return node.attrs.get(name, '')
+    if name == 'type' and node.tag == 'input':
+        return node.attrs.get('type', 'text').lower()
+    properties = {
+        'className': lambda: node.attrs.get('class', ''),
+        'tagName': lambda: node.tag.upper(),
+        'textContent': lambda: _text_content(node),
+        'innerText': lambda: _visible_text(node),
+        'innerHTML': lambda: ''.join(_serialize(child) for child in node.children),
+        'outerHTML': lambda: _serialize(node),
+        'scrollTop': lambda: node.state.get('scrollTop', 0),
+        'childElementCount': lambda: len(node.element_children()),
+    }
+    if name in properties:
+        return properties[name]()
+    return None
+
+
+_SIMPLE_SELECTOR = re.compile(r'''
+    (?P<tag>\*|[a-zA-Z][\w-]*)
+  | \#(?P<id>[\w-]+)
+  | \.(?P<cls>[\w-]+)
+  | \[\s*(?P<attr>[\w:-]+)\s*(?:(?P<op>[~|^$*]?=)\s*(?P<val>"[^"]*"|'[^']*'|[^\]\s]+)\s*)?\]
+  | :(?P<pseudo>[\w-]+)(?:\((?P<arg>[^)]*)\))?
+''', re.X)
+_COMBINATOR = re.compile(r'\s*([>+~])\s*|\s+')
+_PSEUDO_CLASSES = frozenset(['first-child', 'last-child', 'nth-child', 'checked', 'disabled', 'enabled', 'not'])
+_selector_cache = {}
+
+
+def _invalid_selector(selector):
+    return _FakeError(ErrorCode.INVALID_SELECTOR, 'FakeWebDriver does not support the selector {!r}'.format(selector))
+
+
+def _parse_compound(text, position, selector):
+    simples = []
+    while position < len(text):
+        match = _SIMPLE_SELECTOR.match(text, position)
+        if match is None:
+            break
+        if match.group('tag'):
+            simples.append(('tag', match.group('tag').lower()))
+        elif match.group('id'):
+            simples.append(('id', match.group('id')))
+        elif match.group('cls'):
+            simples.append(('class', match.group('cls')))
+        elif match.group('attr'):
+            value = match.group('val')
+            if value is not None and value[:1] in ('"', "'"):
+                value = value[1:-1]
+            simples.append(('attr', match.group('attr').lower(), match.group('op'), value))
+        else:
+            pseudo, argument = match.group('pseudo'), match.group('arg')
+            if pseudo not in _PSEUDO_CLASSES:
+                raise _invalid_selector(selector)
+            if pseudo == 'not':
+                argument, end = _parse_compound(argument.strip(), 0, selector)
+                if end != len(match.group('arg').strip()):
+                    raise _invalid_selector(selector)
+            simples.append(('pseudo', pseudo, argument))
+        position = match.end()
+    return simples, position
+
+
+def _parse_selector(selector):
+    '''Parses a CSS selector into groups of ``[(combinator, simple selectors), ...]``'''
+    if selector in _selector_cache:
+        return _selector_cache[selector]
+    groups = []
+    for group in re.split(r''',(?=(?:[^"'\]]|"[^"]*"|'[^']*')*$)''', selector):
+        group, parts, combinator, position = group.strip(), [], None, 0
+        while True:
+            simples, position = _parse_compound(group, position, selector)
+            if not simples:
+                raise _invalid_selector(selector)
+            parts.append((combinator, simples))
+            if position == len(group):
+                break
+            match = _COMBINATOR.match(group, position)
+            if match is None:
+                raise _invalid_selector(selector)
+            combinator, position = match.group(1) or ' ', match.end()
+        groups.append(parts)
+    _selector_cache[selector] = groups
+    return groups
+
+
+def _matches_simple(node, simple):
+    kind = simple[0]
+    if kind == 'tag':
+        return simple[1] == '*' or node.tag == simple[1]
+    if kind == 'id':
+        return node.attrs.get('id') == simple[1]
+    if kind == 'class':
+        return simple[1] in node.classes
+    if kind == 'attr':
+        _, name, operator, expected = simple
+        actual = node.attrs.get(name)
+        if actual is None:
+            return False
+        return {
+            None: lambda: True,
+            '=': lambda: actual == expected,
+            '~=': lambda: expected in actual.split(),
+            '|=': lambda: actual == expected or actual.startswith(expected + '-'),
+            '^=': lambda: bool(expected) and actual.startswith(expected),
+            '$=': lambda: bool(expected) and actual.endswith(expected),
+            '*=': lambda: bool(expected) and expected in actual,
+        }[operator]()
+    _, pseudo, argument = simple
+    if pseudo == 'not':
+        return not all(_matches_simple(node, negated) for negated in argument)
+    if pseudo == 'checked':
+        return _is_selected(node) if node.tag == 'option' else _is_checked(node)
+    if pseudo in ('disabled', 'enabled'):
+        return node.tag in FORM_CONTROLS and ('disabled' in node.attrs) == (pseudo == 'disabled')
+    siblings = node.parent.element_children() if node.parent is not None else [node]
+    if pseudo == 'first-child':
+        return siblings[0] is node
+    if pseudo == 'last-child':
+        return siblings[-1] is node
+    position = siblings.index(node) + 1
+    argument = argument.strip().lower()
+    if argument in ('odd', 'even'):
+        return position % 2 == (argument == 'odd')
+    return argument.isdigit() and position == int(argument)
+
+
+def _matches_complex(node, parts, index):
+    combinator, simples = parts[index]
+    if not all(_matches_simple(node, simple) for simple in simples):
+        return False
+    if index == 0:
+        return True
+    if combinator in ('>', ' '):
+        ancestor = node.parent
+        while ancestor is not None and ancestor.is_element:
+            if _matches_complex(ancestor, parts, index - 1):
+                return True
+            if combinator == '>':
+                return False
+            ancestor = ancestor.parent
+        return False
+    siblings = node.parent.element_children() if node.parent is not None else [node]
+    previous = siblings[:siblings.index(node)]
+    if combinator == '+':
+        previous = previous[-1:]
+    return any(_matches_complex(sibling, parts, index - 1) for sibling in previous)
+
+
+def select(root, selector):
+    '''Returns the descendants of ``root`` matching the CSS ``selector`` like ``querySelectorAll``
+
+    Supports type, ``#id``, ``.class`` and attribute selectors, the descendant, child and sibling combinators, selector lists and the ``:first-child``, ``:last-child``, ``:nth-child()``, ``:checked``, ``:disabled``, ``:enabled`` and ``:not()`` pseudo-classes.
+
+    Args:
+        root (Node): node to search in.
+        selector (str): CSS selector.
+
+    Returns:
+        list: matching elements in document order.
+    '''
+    groups = _parse_selector(selector)
+    return [node for node in root.descendants()
+            if any(_matches_complex(node, parts, len(parts) - 1) for parts in groups)]
+
+
+_XPATH_STEP = re.compile(r'''(//|/)\s*(\.\.|\.|\*|[\w-]+)((?:\[(?:[^\]'"]|'[^']*'|"[^"]*")*\])*)''')
+_XPATH_PREDICATE = re.compile(r'''\[((?:[^\]'"]|'[^']*'|"[^"]*")*)\]''')
+_XPATH_TEST = re.compile(r'''^(?:
+    (?P<function>contains|starts-with)\(\s*(?P<operand>[^,]+?)\s*,\s*(?P<needle>"[^"]*"|'[^']*')\s*\)
+  | (?P<value>[^=!]+?)\s*(?:(?P<op>!?=)\s*(?P<literal>"[^"]*"|'[^']*'|\d+))?
+)$''', re.X)
+
+
+def _xpath_value(node, operand):
+    operand = operand.strip()
+    if operand.startswith('@'):
+        return node.attrs.get(operand[1:].lower())
+    if operand == 'text()':
+        return ''.join(child.text for child in node.children if child.tag is None)
+    if operand in ('.', 'string()', 'string(.)'):
+        return _text_content(node)
+    if operand in ('normalize-space()', 'normalize-space(.)'):
+        return ' '.join(_text_content(node).split())
+    if operand == 'normalize-space(text())':
+        return ' '.join(_xpath_value(node, 'text()').split())
+    return None
+
+
+def _xpath_filter(nodes, predicate, expression):
+    predicate = predicate.strip()
+    if predicate.isdigit():
+        return nodes[int(predicate) - 1:int(predicate)]
+    if predicate == 'last()':
+        return nodes[-1:]
+    filtered = nodes
+    for condition in re.split(r'\s+and\s+', predicate):
+        match = _XPATH_TEST.match(condition.strip())
+        if match is None:
+            raise _invalid_selector(expression)
+        filtered = [node for node in filtered if _xpath_test(node, match, expression)]
+    return filtered
+
+
+def _xpath_test(node, match, expression):
+    if match.group('function'):
+        value = _xpath_value(node, match.group('operand'))
+        needle = match.group('needle')[1:-1]
+        if value is None:
+            return False
+        return needle in value if match.group('function') == 'contains' else value.startswith(needle)
+    if match.group('value').strip() not in ('text()', '.', 'string()', 'string(.)', 'normalize-space()',
+                                            'normalize-space(.)', 'normalize-space(text())') \
+            and not match.group('value').strip().startswith('@'):
+        raise _invalid_selector(expression)
+    value = _xpath_value(node, match.group('value'))
+    if match.group('op') is None:
+        return bool(value)
+    literal = match.group('literal').strip('\'"')
+    return value is not None and (value == literal) == (match.group('op') == '=')
+
+
+def xpath(context, expression):
+    '''Evaluates a subset of XPath 1.0 against ``context``
+
+    Supports location paths of ``/`` and ``//`` steps with tag names, ``*``, ``.`` and ``..``, and predicates with positions, ``last()``, ``@attribute``, ``text()``, ``normalize-space()``, ``contains()`` and ``starts-with()`` joined with ``and``.
+
+    Args:
+        context (Node): context node of relative expressions.
+        expression (str): XPath expression.
+
+    Returns:
+        list: matching elements in document order.
+    '''
+    expression = expression.strip()
+    if expression.startswith('.') and not expression.startswith('..'):
+        nodes, expression = [context], expression[1:]
+    else:
+        nodes = [context.root()]
+    if not expression:
+        return nodes
+    position = 0
+    while position < len(expression):
+        match = _XPATH_STEP.match(expression, position)
+        if match is None:
+            raise _invalid_selector(expression)
+        axis, name, predicates = match.groups()
+        found = []
+        for node in nodes:
+            if name == '..':
+                parents, candidates = [], [node.parent] if node.parent is not None else []
+            elif name == '.':
+                parents, candidates = [], [node]
+            else:
+                parents, candidates = [node] + list(node.descendants()) if axis == '//' else [node], None
+            groups = [candidates] if candidates is not None else [
+                [child for child in parent.element_children() if name == '*' or child.tag == name.lower()]
+                for parent in parents]
+            for group in groups:
+                for predicate in _XPATH_PREDICATE.findall(predicates):
+                    group = _xpath_filter(group, predicate, expression)
+                found.extend(group)
+        nodes = _document_order(found)
+        position = match.end()
+    return [node for node in nodes if node.is_element]
+
+
+def _document_order(nodes):
+    unique = list(OrderedDict((id(node), node) for node in nodes).values())
+    if len(unique) < 2:
+        return unique
+    order = {id(node): index for index, node in enumerate(unique[0].root().descendants())}
+    return sorted(unique, key=lambda node: order.get(id(node), -1))
+
+
+def _origin(url):
+    '''Returns the origin of ``url`` like ``location.origin`` does, ``'null'`` for opaque origins'''
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        return 'null'
+    return '{}://{}'.format(parts.scheme, parts.netloc.rpartition('@')[2])
+
+
+def _cookie_visible(cookie, host):
+    '''Tells if ``cookie`` is sent to ``host``, ignoring its path'''
+    domain = cookie.get('domain') or ''
+    if domain.startswith('.'):
+        return host == domain[1:] or host.endswith(domain)
+    return host == domain
+
+
+def find(root, by, value):
+    '''Resolves a Selenium locator to elements under ``root`` like WebDriver does
+
+    Args:
+        root (Node): document or element to search in.
+        by (selenium.webdriver.common.by.By.): locator strategy.
+        value (str): locator value.
+
+    Returns:
+        list: matching elements in document order.
+    '''
+    if by == By.ID:
+        return [node for node in root.descendants() if node.attrs.get('id') == value]
+    if by == By.NAME:
+        return [node for node in root.descendants() if node.attrs.get('name') == value]
+    if by == By.CLASS_NAME:
+        if not value or len(value.split()) > 1:
+            raise _FakeError(ErrorCode.INVALID_SELECTOR, 'Compound class names are not permitted')
+        return [node for node in root.descendants() if value in node.classes]
+    if by == By.TAG_NAME:
+        return [node for node in root.descendants() if value == '*' or node.tag == value.lower()]
+    if by == By.CSS_SELECTOR:
+        return select(root, value)
+    if by in (By.LINK_TEXT, By.PARTIAL_LINK_TEXT):
+        links = [(node, _visible_text(node).strip()) for node in root.descendants() if node.tag == 'a']
+        if by == By.LINK_TEXT:
+            return [node for node, text in links if text == value]
+        return [node for node, text in links if value in text]
+    if by == By.XPATH:
+        return xpath(root, value)
+    raise _FakeError(ErrorCode.INVALID_SELECTOR, 'Unsupported locator strategy: {}'.format(by))
+
+
+class _Window:
+    def __init__(self, handle):
+        self.handle = handle
+        self.history = []
+        self.position = -1
+        self.document = None
+        self.session_storage = {}
+
+
+class FakeBrowser:
+    '''In-process browser ``FakeWebDriver`` sends its commands to
+
+    Pages come from ``pages`` first. URLs missing there are loaded with ``loader``, or with ``urllib`` if they are ``http``, ``https`` or ``file`` URLs. ``about:blank`` and ``data:`` URLs are supported as well. Pages are static: only clicks, typing and the callbacks of :meth:`schedule`, ``on_scroll`` and :meth:`register_script` change them.
+
+    Args:
+        pages (dict): ``{url: html}`` pages to serve. ``html`` can be a function called with the URL to render the page. URLs are looked up as is, without the fragment and without the query.
+        latency (float or function): simulated time in seconds every command takes, or a function of the command name returning it.
+        page_load_time (float): simulated time in seconds a page takes to load, on top of ``latency``.
+        loader (function): called with the URL of a page missing in ``pages``, returns its HTML or a ``(final URL, HTML)`` tuple if the page has been redirected.
+
+    Attributes:
+        document (Document): document of the current window.
+        lock (threading.RLock): lock every command holds while it touches the documents. Callbacks are called with it held already.
+        on_scroll (function): called as ``on_scroll(browser, element)`` when a page (``element`` is ``None``) or an element is scrolled, e.g. to append the next page of an infinite feed.
+        commands (collections.Counter): number of executed commands by their name.
+        cookies (list): cookies of all domains in Selenium's format. WebDriver commands only see the cookies of the current host.
+        local_storage (dict): ``localStorage`` items by origin. ``sessionStorage`` is kept per window.
+    '''
+
+    def __init__(self, pages=None, latency=0, page_load_time=0, loader=None):
+        self.pages = dict(pages or {})
+        self.loader = loader
+        self.latency = latency
+        self.page_load_time = page_load_time
+        self.lock = threading.RLock()
+        self.on_scroll = None
+        self.commands = Counter()
+        self.w3c = False
+        self.session_id = None
+        self.page_load_strategy = 'normal'
+        self.cookies = []
+        self.local_storage = {}
+        self.implicit_wait = 0
+        self.script_timeout = 30
+        self.scripts = {
+            scripts.WAIT_FOR_ELEMENT: FakeBrowser._wait_for_element,
+            scripts.COUNT_ELEMENTS: FakeBrowser._count_elements,
+            scripts.WAIT_FOR_ANY_ELEMENT: FakeBrowser._wait_for_any_element,
+            scripts.RUN_OPERATIONS: FakeBrowser._run_operations,
+            scripts.ELEMENTS_ARE_ATTACHED: FakeBrowser._elements_are_attached,
+            scripts.SYNC_ELEMENT_CACHE: FakeBrowser._sync_element_cache,
+            scripts.HARVEST_SCROLL: FakeBrowser._harvest_scroll,
+            scripts.EXTRACT_ROWS: FakeBrowser._extract_rows,
+            scripts.NAVIGATE: FakeBrowser._navigate_script,
+            scripts.SCROLL_PAGE: lambda browser: browser._scroll(None),
+            scripts.SCROLL_ELEMENT: FakeBrowser._scroll,
+            scripts.CLEAR_STORAGE: FakeBrowser._clear_storage,
+            scripts.SNAPSHOT_STORAGE: FakeBrowser._snapshot_storage,
+            scripts.RESTORE_STORAGE: FakeBrowser._restore_storage,
+            scripts.MARK_NAVIGATION: FakeBrowser._mark_navigation,
+            scripts.RESOURCE_ENTRIES: lambda browser: [],
+            scripts.USER_AGENT: lambda browser: USER_AGENT,
+            scripts.OPEN_TAB: FakeBrowser._open_tab,
+            scripts.READY_STATE: FakeBrowser._ready_state,
+        }
+        self._elements = {}
+        self._ids = itertools.count(1)
+        self._windows = OrderedDict()
+        self._window_ids = itertools.count(1)
+        self._current = self._open_window()
+        self._quit = False
+        self._handlers = {
+            Command.NEW_SESSION: self._new_session,
+            Command.QUIT: self._quit_session,
+            Command.STATUS: lambda params: {'ready': True, 'message': 'fake'},
+            Command.GET: lambda params: self.navigate(params['url']),
+            Command.GET_CURRENT_URL: lambda params: self.document.url,
+            Command.GET_TITLE: lambda params: self.document.title,
+            Command.GET_PAGE_SOURCE: lambda params: _serialize(self.document),
+            Command.REFRESH: lambda params: self.navigate(self.document.url, history=False),
+            Command.GO_BACK: lambda params: self._traverse(-1),
+            Command.GO_FORWARD: lambda params: self._traverse(1),
+            Command.FIND_ELEMENT: lambda params: self._find_element(self.document, params, single=True),
+            Command.FIND_ELEMENTS: lambda params: self._find_element(self.document, params, single=False),
+            Command.FIND_CHILD_ELEMENT: lambda params: self._find_element(self._node(params), params, single=True),
+            Command.FIND_CHILD_ELEMENTS: lambda params: self._find_element(self._node(params), params, single=False),
+            Command.CLICK_ELEMENT: lambda params: self._click(self._interactable(params)),
+            Command.SUBMIT_ELEMENT: lambda params: self._submit(self._node(params), None),
+            Command.SEND_KEYS_TO_ELEMENT: self._send_keys,
+            Command.CLEAR_ELEMENT: lambda params: _set_value(self._interactable(params), ''),
+            Command.GET_ELEMENT_TEXT: lambda params: _visible_text(self._node(params)),
+            Command.GET_ELEMENT_TAG_NAME: lambda params: self._node(params).tag,
+            Command.GET_ELEMENT_ATTRIBUTE: self._get_attribute,
+            Command.GET_ELEMENT_PROPERTY: lambda params: _property(
+                self._node(params), params['name'], self.document.url),
+            Command.IS_ELEMENT_SELECTED: lambda params: _is_selected(self._node(params)),
+            Command.IS_ELEMENT_ENABLED: lambda params: 'disabled' not in self._node(params).attrs,
+            Command.IS_ELEMENT_DISPLAYED: lambda params: _displayed(self._node(params)),
+            Command.EXECUTE_SCRIPT: lambda params: self._execute_script(params, asynchronous=False),
+            Command.EXECUTE_ASYNC_SCRIPT: lambda params: self._execute_script(params, asynchronous=True),
+            Command.SET_SCRIPT_TIMEOUT: lambda params: setattr(self, 'script_timeout', params['ms'] / 1000),
+            Command.IMPLICIT_WAIT: lambda params: setattr(self, 'implicit_wait', params['ms'] / 1000),
+            Command.SET_TIMEOUTS: self._set_timeouts,
+            Command.GET_ALL_COOKIES: lambda params: [dict(cookie) for cookie in self._visible_cookies()],
+            Command.ADD_COOKIE: self._add_cookie,
+            Command.DELETE_COOKIE: lambda params: self.cookies.__setitem__(
+                slice(None), [cookie for cookie in self.cookies if cookie['name'] != params['name']]),
+            Command.DELETE_ALL_COOKIES: lambda params: self.cookies.clear(),
+            Command.GET_WINDOW_HANDLES: lambda params: list(self._windows),
+            Command.GET_CURRENT_WINDOW_HANDLE: lambda params: self._window().handle,
+            Command.SWITCH_TO_WINDOW: self._switch_to_window,
+            Command.CLOSE: self._close_window,
+        }
+        # Commands that wait for the page release the lock while they wait
+        self._waiting_commands = frozenset([
+            Command.FIND_ELEMENT, Command.FIND_ELEMENTS, Command.FIND_CHILD_ELEMENT, Command.FIND_CHILD_ELEMENTS,
+            Command.EXECUTE_ASYNC_SCRIPT,
+        ])
+
+    @property
+    def document(self):
+        return self._window().document
+
+    def execute(self, command, params):
+        '''Executes a WebDriver command, called by ``FakeWebDriver``
+
+        Args:
+            command (str): name of the command, one of ``selenium.webdriver.remote.command.Command``.
+            params (dict): parameters of the command.
+
+        Returns:
+            dict: WebDriver response.
+        '''
+        delay = self.latency(command) if callable(self.latency) else self.latency
+        if command == Command.GET and self.page_load_strategy != 'none':
+            delay += self.page_load_time
+        if delay:
+            time.sleep(delay)
+        self.commands[command] += 1
+        handler = self._handlers.get(command)
+        try:
+            if handler is None:
+                raise _FakeError(ErrorCode.UNKNOWN_COMMAND, 'FakeWebDriver does not implement {!r}'.format(command))
+            if self._quit and command != Command.NEW_SESSION:
+                raise _FakeError(ErrorCode.INVALID_SESSION_ID, 'The session has been quit')
+            if command in self._waiting_commands:
+                value = handler(params)
+            else:
+                with self.lock:
+                    value = handler(params)
+        except _FakeError as error:
+            return {'status': error.code, 'message': error.message, 'value': {'message': error.message}}
+        return {'status': ErrorCode.SUCCESS, 'sessionId': self.session_id, 'value': self._to_wire(value)}
+
+    def register_script(self, script, handler):
+        '''Emulates ``script`` with ``handler`` in ``execute_script`` and ``execute_async_script``
+
+        Args:
+            script (str): exact JavaScript source the driver is called with.
+            handler (function): called as ``handler(browser, *args)`` with WebElements resolved to :class:`Node` objects, returns the result of the script. Handlers of synchronous scripts are called with ``lock`` held, asynchronous ones have to take it themselves when they touch the documents.
+        '''
+        self.scripts[script] = handler
+
+    def schedule(self, delay, callback):
+        '''Calls ``callback(browser)`` with ``lock`` held in ``delay`` seconds, e.g. to make an element appear later
+
+        Args:
+            delay (float): time in seconds to wait.
+            callback (function): function to call.
+
+        Returns:
+            threading.Timer: started timer, ``cancel`` it to drop the callback.
+        '''
+        def fire():
+            with self.lock:
+                callback(self)
+
+        timer = threading.Timer(delay, fire)
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    def find(self, by, value, root=None):
+        '''Resolves a Selenium locator in the current document, see :func:`find`'''
+        return find(root if root is not None else self.document, by, value)
+
+    def navigate(self, url, history=True):
+        '''Loads ``url`` into the current window
+
+        Args:
+            url (str): URL to load.
+            history (bool): boolean flag that indicates if the URL has to be added to the history of the window.
+        '''
+        window = self._window()
+        url, html = self._load(url)
+        document = Document(url, html, self.page_load_time)
+        if self.page_load_strategy == 'none':
+            # get has returned right away, the page keeps loading in the background
+            document.ready_at = time.time() + self.page_load_time
+        if history:
+            del window.history[window.position + 1:]
+            window.history.append(url)
+            window.position += 1
+        self._replace_document(window, document)
+
+    def _load(self, url):
+        '''Returns ``(url, html)`` of the page, the URL changes if the page has been redirected'''
+        for key in (url, urldefrag(url)[0], urlunsplit(urlsplit(url)[:3] + ('', ''))):
+            page = self.pages.get(key)
+            if page is not None:
+                return url, page(url) if callable(page) else page
+        if url == 'about:blank':
+            return url, ''
+        if url.startswith('data:'):
+            header, _, data = url[len('data:'):].partition(',')
+            return url, base64.b64decode(data).decode('utf-8') if header.endswith(';base64') else unquote(data)
+        if self.loader is not None:
+            try:
+                page = self.loader(url)
+            except Exception as error:
+                raise _FakeError(ErrorCode.UNKNOWN_ERROR, 'unknown error: failed to load {}: {}'.format(url, error))
+            return page if isinstance(page, tuple) else (url, page)
+        if urlsplit(url).scheme not in ('http', 'https', 'file'):
+            raise _FakeError(ErrorCode.UNKNOWN_ERROR, 'unknown error: net::ERR_NAME_NOT_RESOLVED {}'.format(url))
+        try:
+            with urlopen(url, timeout=30) as response:
+                return response.geturl(), response.read().decode(
+                    response.headers.get_content_charset() or 'utf-8', 'replace')
+        except HTTPError as error:
+            # Browsers render error pages as well
+            return url, error.read().decode('utf-8', 'replace')
+        except (OSError, ValueError) as error:
+            raise _FakeError(ErrorCode.UNKNOWN_ERROR, 'unknown error: failed to load {}: {}'.format(url, error))
+
+    def _replace_document(self, window, document):
+        previous, window.document = window.document, document
+        if previous is not None:
+            self._elements = {element_id: node for element_id, node in self._elements.items()
+                              if node.root() is not previous}
+
+    def _traverse(self, step):
+        window = self._window()
+        position = window.position + step
+        if 0 <= position < len(window.history):
+            window.position = position
+            url, html = self._load(window.history[position])
+            self._replace_document(window, Document(url, html, self.page_load_time))
+
+    def _open_window(self):
+        window = _Window('fake-window-{}'.format(next(self._window_ids)))
+        window.document = Document('about:blank', '')
+        self._windows[window.handle] = window
+        return window
+
+    def _window(self):
+        if self._current is None:
+            raise _FakeError(ErrorCode.NO_SUCH_WINDOW, 'no such window: target window already closed')
+        return self._current
+
+    def _switch_to_window(self, params):
+        handle = params.get('name', params.get('handle'))
+        if handle not in self._windows:
+            raise _FakeError(ErrorCode.NO_SUCH_WINDOW, 'no such window: {}'.format(handle))
+        self._current = self._windows[handle]
+
+    def _close_window(self, params):
+        window = self._windows.pop(self._window().handle)
+        self._replace_document(window, Document('about:blank', ''))
+        self._current = None
+
+    def _new_session(self, params):
+        self._quit = False
+        self.session_id = uuid.uuid4().hex
+        self.page_load_strategy = params['desiredCapabilities'].get('pageLoadStrategy', 'normal')
+        return dict(params['desiredCapabilities'], browserName='fake', javascriptEnabled=True)
+
+    def _quit_session(self, params):
+        self._quit = True
+        self._elements.clear()
+
+    def _set_timeouts(self, params):
+        if 'script' in params:
+            self.script_timeout = params['script'] / 1000
+        if 'implicit' in params:
+            self.implicit_wait = params['implicit'] / 1000
+        if params.get('type') == 'script':
+            self.script_timeout = params['ms'] / 1000
+        elif params.get('type') == 'implicit':
+            self.implicit_wait = params['ms'] / 1000
+
+    def _add_cookie(self, params):
+        cookie = dict(params['cookie'])
+        cookie.setdefault('domain', urlsplit(self.document.url).hostname or '')
+        cookie.setdefault('path', '/')
+        self.cookies = [existing for existing in self.cookies
+                        if (existing['name'], existing['domain']) != (cookie['name'], cookie['domain'])]
+        self.cookies.append(cookie)
+
+    def _visible_cookies(self):
+        host = urlsplit(self.document.url).hostname
+        return [cookie for cookie in self.cookies if host is None or _cookie_visible(cookie, host)]
+
+    def _storage(self, name):
+        '''Returns ``localStorage`` or ``sessionStorage`` of the current origin, ``None`` for opaque origins'''
+        origin = _origin(self.document.url)
+        if origin == 'null':
+            return None
+        areas = self.local_storage if name == 'localStorage' else self._window().session_storage
+        return areas.setdefault(origin, {})
+
+    def _poll(self, check, timeout):
+        '''Calls ``check`` with the lock held until it returns something else than ``None`` or ``timeout`` expires'''
+        deadline = time.time() + timeout
+        while True:
+            with self.lock:
+                result = check()
+            remaining = deadline - time.time()
+            if result is not None or remaining <= 0:
+                return result
+            time.sleep(min(POLL_INTERVAL, remaining))
+
+    def _reference(self, node):
+        if node.element_id is None:
+            node.element_id = 'fake-element-{}'.format(next(self._ids))
+        self._elements[node.element_id] = node
+        return {'ELEMENT': node.element_id}
+
+    def _resolve(self, element_id):
+        node = self._elements.get(element_id)
+        if node is None or node.root() is not self.document:
+            raise _FakeError(ErrorCode.STALE_ELEMENT_REFERENCE,
+                             'stale element reference: element is not attached to the page document')
+        return node
+
+    def _node(self, params):
+        return self._resolve(params['id'])
+
+    def _interactable(self, params):
+        node = self._node(params)
+        if not _displayed(node):
+            raise _FakeError(ErrorCode.ELEMENT_NOT_VISIBLE, 'element not visible')
+        return node
+
+    def _to_wire(self, value):
+        if isinstance(value, Node):
+            return self._reference(value)
+        if isinstance(value, (list, tuple)):
+            return [self._to_wire(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self._to_wire(item) for key, item in value.items()}
+        return value
+
+    def _from_wire(self, value):
+        if isinstance(value, dict):
+            element_id = value.get('ELEMENT', value.get('element-6066-11e4-a52e-4f735466cecf'))
+            if element_id is not None:
+                return self._resolve(element_id)
+            return {key: self._from_wire(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._from_wire(item) for item in value]
+        return value
+
+    def _find_element(self, root, params, single):
+        def check():
+            found = self.find(params['using'], params['value'], root)
+            return found or None
+
+        found = self._poll(check, self.implicit_wait) or []
+        if not single:
+            return found
+        if not found:
+            raise _FakeError(ErrorCode.NO_SUCH_ELEMENT, 'no such element: Unable to locate element: {}'.format(
+                {'method': params['using'], 'selector': params['value']}))
+        return found[0]
+
+    def _get_attribute(self, params):
+        '''Mirrors the getAttribute atom: boolean attributes as ``'true'``, properties before attributes'''
+        node, name = self._node(params), params['name'].lower()
+        if name in ('class', 'classname'):
+            return node.attrs.get('class')
+        if name in BOOLEAN_ATTRIBUTES:
+            if name == 'checked':
+                value = _is_checked(node)
+            elif name == 'selected':
+                value = _is_selected(node)
+            else:
+                value = name in node.attrs
+            return 'true' if value else None
+        value = _property(node, params['name'], self.document.url)
+        if value is None:
+            return node.attrs.get(name)
+        return str(value).lower() if isinstance(value, bool) else str(value)
+
+    def _click(self, node):
+        if 'disabled' in node.attrs and node.tag in FORM_CONTROLS:
+            return
+        if node.tag == 'input' and node.attrs.get('type', '').lower() == 'checkbox':
+            node.state['checked'] = not _is_checked(node)
+        elif node.tag == 'input' and node.attrs.get('type', '').lower() == 'radio':
+            for radio in find(self.document, By.NAME, node.attrs.get('name')) if node.attrs.get('name') else []:
+                radio.state['checked'] = False
+            node.state['checked'] = True
+        elif node.tag == 'option':
+            select = _select_of(node)
+            if select is not None:
+                _set_value(select, _value(node))
+        submits = node.tag == 'button' and node.attrs.get('type', 'submit').lower() == 'submit' or \
+            node.tag == 'input' and node.attrs.get('type', '').lower() in ('submit', 'image')
+        ancestor = node
+        while ancestor is not None and ancestor.is_element:
+            if ancestor.tag == 'a' and 'href' in ancestor.attrs:
+                href = ancestor.attrs['href']
+                if not href.startswith(('#', 'javascript:')):
+                    self.navigate(urljoin(self.document.url, href))
+                return
+            if ancestor.tag == 'form' and submits:
+                self._submit(ancestor, node)
+                return
+            ancestor = ancestor.parent
+
+    def _submit(self, node, submitter):
+        form = node
+        while form is not None and form.tag != 'form':
+            form = form.parent
+        if form is None:
+            raise _FakeError(ErrorCode.NO_SUCH_ELEMENT, 'no such element: the element is not in a form')
+        fields = []
+        for field in form.descendants():
+            name = field.attrs.get('name')
+            if not name or 'disabled' in field.attrs or field.tag not in ('input', 'select', 'textarea', 'button'):
+                continue
+            kind = field.attrs.get('type', '').lower()
+            if kind in ('checkbox', 'radio') and not _is_checked(field):
+                continue
+            if (field.tag == 'button' or kind in ('submit', 'image')) and field is not submitter:
+                continue
+            fields.append((name, _value(field)))
+        action = urljoin(self.document.url, form.attrs.get('action', ''))
+        if form.attrs.get('method', 'get').lower() == 'get':
+            action = urlunsplit(urlsplit(action)[:3] + (urlencode(fields), ''))
+        self.navigate(action)
+
+    def _send_keys(self, params):
+        node = self._interactable(params)
+        if 'disabled' in node.attrs or 'readonly' in node.attrs:
+            raise _FakeError(ErrorCode.INVALID_ELEMENT_STATE, 'invalid element state: the element is not editable')
+        value = _value(node)
+        for key in ''.join(params['value']):
+            if key in _ENTER_KEYS:
+                node.state['value'] = value
+                if node.tag == 'input':
+                    self._submit(node, None)
+                    return
+                value += '\n'
+            elif key == _BACKSPACE:
+                value = value[:-1]
+            elif not '\ue000' <= key <= '\ue05d':
+                value += key
+        if node.tag == 'select':
+            _set_value(node, value)
+        else:
+            node.state['value'] = value
+
+    def _execute_script(self, params, asynchronous):
+        handler = self.scripts.get(params['script'])
+        if handler is None:
+            raise _FakeError(ErrorCode.JAVASCRIPT_ERROR,
+                             'javascript error: FakeWebDriver cannot run this script, register a handler for it')
+        if asynchronous:
+            with self.lock:
+                args = self._from_wire(params['args'])
+        else:
+            args = self._from_wire(params['args'])
+        try:
+            return handler(self, *args)
+        except _FakeError:
+            raise
+        except Exception as error:
+            raise _FakeError(ErrorCode.JAVASCRIPT_ERROR, 'javascript error: {}'.format(error))
+
+    def _extract(self, node, fields):
+        '''Mirrors ``seExtract`` of :data:`selenium_extensions.scripts.EXTRACT_FIELDS`'''
+        record = {}
+        for name, selector, attribute in fields:
+            target = node
+            if selector:
+                found = select(node, selector)
+                target = found[0] if found else None
+            value = None
+            if target is not None and attribute == 'text':
+                value = ' '.join(_text_content(target).split())
+            elif target is not None and attribute == 'html':
+                value = _property(target, 'innerHTML', self.document.url)
+            elif target is not None:
+                value = _property(target, attribute, self.document.url)
+                if value is None:
+                    value = target.attrs.get(attribute.lower())
+            record[name] = value
+        return record
+
+    def _wait_for_element(self, by, value, clickable, timeout):
+        def check():
+            for node in self.find(by, value):
+                if not clickable or _displayed(node) and 'disabled' not in node.attrs:
+                    return node
+            return None
+
+        return self._poll(check, timeout / 1000)
+
+    def _count_elements(self, locators):
+        return [len(self.find(by, value)) for by, value in locators]
+
+    def _wait_for_any_element(self, locators, timeout):
+        def check():
+            return next((index for index, (by, value) in enumerate(locators) if self.find(by, value)), None)
+
+        return self._poll(check, timeout / 1000)
+
+    def _run_operations(self, operations, stop_on_error):
+        actions = {
+            'click': lambda node, argument: self._click(node),
+            'fill': _set_value,
+            'clear': lambda node, argument: _set_value(node, ''),
+            'select': _set_value,
+            'check': lambda node, argument: self._click(node) if _is_checked(node) != bool(argument) else None,
+        }
+        results = []
+        for by, value, action, argument in operations:
+            try:
+                if action not in actions:
+                    raise ValueError('Unsupported action: {}'.format(action))
+                found = self.find(by, value)
+                if not found:
+                    raise ValueError('Unable to locate element: {}'.format(value))
+                actions[action](found[0], argument)
+                results.append([True, None])
+            except (ValueError, _FakeError) as error:
+                results.append([False, str(error)])
+                if stop_on_error:
+                    break
+        return results
+
+    def _elements_are_attached(self, elements):
+        # Detached elements fail to resolve already, like they do in real browsers
+        return [node.root() is self.document for node in elements]
+
+    def _sync_element_cache(self, entries, token, mutations):
+        document = self.document
+        if document.cache_token is None:
+            document.cache_token, document.cache_mutations = uuid.uuid4().hex, document.mutations
+        current = document.mutations - document.cache_mutations
+        if token == document.cache_token and mutations == current:
+            return [token, current, None]
+        valid = []
+        for by, value, node in entries:
+            found = self.find(by, value)
+            valid.append(token == document.cache_token and bool(found) and found[0] is node)
+        return [document.cache_token, current, valid]
+
+    def _harvest_scroll(self, by, value, fields, idle, limit, container):
+        def collect():
+            items = []
+            for node in self.find(by, value):
+                if len(items) >= limit:
+                    break
+                if 'data-se-harvested' in node.attrs:
+                    continue
+                node.attrs['data-se-harvested'] = ''
+                items.append(self._extract(node, fields) if fields else node)
+            return items or None
+
+        with self.lock:
+            items = collect()
+            if items:
+                return items
+            self._scroll(container)
+        return self._poll(collect, idle / 1000) or []
+
+    def _extract_rows(self, by, value, fields, root, offset, limit, token):
+        extractions = self.document.extractions
+        if token is None:
+            token = uuid.uuid4().hex
+            rows = extractions[token] = self.find(by, value, root)
+        elif token in extractions:
+            rows = extractions[token]
+        else:
+            return None
+        end = len(rows) if limit is None else min(offset + limit, len(rows))
+        records = [self._extract(row, fields) for row in rows[offset:end]]
+        if end >= len(rows):
+            del extractions[token]
+        return [token, len(rows), records]
+
+    def _navigate_script(self, by, value, ready_state, timeout, stop):
+        with self.lock:
+            if self.document.navigating:
+                return None
+
+        def check():
+            if by is not None:
+                found = self.find(by, value)
+                if found:
+                    return [found[0]]
+            # Fake documents are complete as soon as they exist
+            return [None] if ready_state is not None else None
+
+        result = self._poll(check, timeout / 1000)
+        with self.lock:
+            return [result is not None, result[0] if result else None, self.document.url, dict(self.document.timing)]
+
+    def _clear_storage(self):
+        for name in ('localStorage', 'sessionStorage'):
+            storage = self._storage(name)
+            if storage is not None:
+                storage.clear()
+
+    def _snapshot_storage(self):
+        storages = [self._storage(name) for name in ('localStorage', 'sessionStorage')]
+        return [self.document.url, _origin(self.document.url)] + [
+            None if storage is None else dict(storage) for storage in storages]
+
+    def _restore_storage(self, cookies, local, session):
+        for name, items in (('localStorage', local), ('sessionStorage', session)):
+            storage = self._storage(name)
+            if storage is not None:
+                storage.update(items)
+        failed = []
+        for cookie in cookies:
+            # document.cookie can only set cookies of the current host and its parent domains
+            if cookie.get('httpOnly') or not _cookie_visible(cookie, urlsplit(self.document.url).hostname or ''):
+                failed.append(cookie['name'])
+            else:
+                self._add_cookie({'cookie': {key: value for key, value in cookie.items() if key != 'sameSite'}})
+        return failed
+
+    def _open_tab(self):
+        # window.open() leaves the current window focused
+        self._open_window()
+
+    def _ready_state(self):
+        if self.document.navigating:
+            return None
+        return 'loading' if time.time() < self.document.ready_at else 'complete'
+
+    def _mark_navigation(self):
+        self.document.navigating = True
+
+    def _scroll(self, element):
+        target = element if element is not None else self.document
+        target.state['scrollTop'] = target.state.get('scrollTop', 0) + 1
+        if self.on_scroll is not None:
+            self.on_scroll(self, element)
+
+
+class FakeWebDriver(RemoteWebDriver):
+    '''WebDriver that runs against an in-process :class:`FakeBrowser` instead of a real browser
+
+    Helpers can be tested and benchmarked without launching a browser and without the noise of one: every command costs exactly the configured ``latency``. Create it with :func:`fake_driver` or ``SeleniumDriver(browser='fake')``.
+
+    Args:
+        pages (dict): ``{url: html}`` pages to serve, see :class:`FakeBrowser`.
+        latency (float or function): simulated time in seconds every command takes.
+        page_load_time (float): simulated time in seconds a page takes to load.
+        page_load_strategy ('normal', 'eager' or 'none'): reported in the capabilities. With ``none`` ``get`` returns right away and the page's ``readyState`` is ``loading`` for ``page_load_time``, otherwise pages are always loaded completely.
+        use_proxy (str, selenium_extensions.proxies.Proxy or selenium_extensions.proxies.ProxyPool): proxy recorded as ``proxy`` attribute and switched by :func:`selenium_extensions.proxies.switch_proxy` like a real one. Pages aren't loaded through it.
+        loader (function): loads pages missing in ``pages``, see :class:`FakeBrowser`.
+
+    Attributes:
+        fake_browser (FakeBrowser): browser the driver talks to, e.g. to schedule DOM changes or register script handlers.
+    '''
+
+    def __init__(self, pages=None, latency=0, page_load_time=0, page_load_strategy='normal', loader=None):
+        self.fake_browser = FakeBrowser(pages, latency, page_load_time, loader)
+        super().__init__(command_executor=self.fake_browser,
+                         desired_capabilities={'browserName': 'fake', 'pageLoadStrategy': page_load_strategy})
+        # Nothing has to be uploaded, file inputs get local paths
+        self._is_remote = False
+
+
+def fake_driver(pages=None, latency=0, page_load_time=0, page_load_strategy='normal', use_proxy=None, **browser_options):
+    '''Function to initialize :class:`FakeWebDriver`
+
+    Args:
+        pages (dict): ``{url: html}`` pages to serve. ``html`` can be a function called with the URL to render the page. Other URLs are loaded with ``urllib``.
+        latency (float or function): simulated time in seconds every command takes, or a function of the command name returning it.
+        page_load_time (float): simulated time in seconds a page takes to load, on top of ``latency``.
+        page_load_strategy ('normal', 'eager' or 'none'): reported in the capabilities. With ``none`` ``get`` returns right away and the page's ``readyState`` is ``loading`` for ``page_load_time``, otherwise pages are always loaded completely.
+        use_proxy (str, selenium_extensions.proxies.Proxy or selenium_extensions.proxies.ProxyPool): proxy recorded as ``proxy`` attribute and switched by :func:`selenium_extensions.proxies.switch_proxy` like a real one. Pages aren't loaded through it.
+        **browser_options: options of the real browsers (``run_headless``, ``load_images``, ``resource_policy``, ``profile``, ...) are accepted and ignored, so a bot switches to the fake backend by changing ``browser`` only.
+
+    Returns:
+        FakeWebDriver: created driver.
+
+    Example:
+        ::
+
+            from selenium.webdriver.common.by import By
+            from selenium_extensions.core import click_on_element
+            from selenium_extensions.fake import fake_driver
+
+
+            driver = fake_driver(pages={
+                'https://example.com/': '<a id="next" href="/page/2">Next</a>',
+                'https://example.com/page/2': '<p class="result">Second page</p>',
+            }, latency=0.005)
+            driver.get('https://example.com/')
+            click_on_element(driver, (By.ID, 'next'))
+            print(driver.current_url)  # https://example.com/page/2
+    '''
+    driver = FakeWebDriver(pages, latency, page_load_time, page_load_strategy)
+    attach_proxy(driver, lease_proxy(use_proxy), 'fake')
+    return driver
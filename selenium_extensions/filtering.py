@@ -0,0 +1,237 @@
+import json
+from urllib.parse import quote
+
+from selenium_extensions.helpers import execute_cdp_command
+from selenium_extensions.proxies import Proxy
+from selenium_extensions.scripts import RESOURCE_ENTRIES
+
+
+# File extensions of every resource type, matched at the end of the URL's path only
+RESOURCE_TYPE_EXTENSIONS = {
+    'image': ['png', 'jpg', 'jpeg', 'gif', 'webp', 'svg', 'ico', 'bmp'],
+    'font': ['woff', 'woff2', 'ttf', 'otf', 'eot'],
+    'stylesheet': ['css'],
+    'media': ['mp4', 'webm', 'mp3', 'ogg', 'm4a', 'wav', 'mov', 'm3u8'],
+    'script': ['js'],
+}
+
+# URL patterns (``*`` matches any sequence of characters) for every resource type. A URL has to end with the
+# extension, so that hosts like ``www.movies.com`` and ``.json`` files don't match. Chrome's patterns treat ``?`` as
+# a wildcard for any single character, a query string after the extension can't be matched without ``.jsonp`` or
+# ``.json?v=1`` matching too, so Chrome doesn't block ``/app.js?v=1`` by type - Firefox's PAC file does.
+RESOURCE_TYPE_PATTERNS = {
+    resource_type: ['*.' + extension for extension in extensions]
+    for resource_type, extensions in RESOURCE_TYPE_EXTENSIONS.items()
+}
+
+# URL patterns of common analytics and advertising hosts
+TRACKER_PATTERNS = [
+    '*google-analytics.com*', '*googletagmanager.com*', '*googlesyndication.com*',
+    '*doubleclick.net*', '*adservice.google.*', '*connect.facebook.net*',
+    '*hotjar.com*', '*mc.yandex.ru*', '*scorecardresearch.com*', '*amazon-adsystem.com*',
+    '*criteo.com*', '*taboola.com*', '*outbrain.com*', '*quantserve.com*',
+]
+
+# Firefox preferences that switch resource types off natively, other types are blocked by URL patterns
+_FIREFOX_TYPE_PREFERENCES = {
+    'image': {'permissions.default.image': 2},
+    'font': {'gfx.downloadable_fonts.enabled': False},
+    'stylesheet': {'permissions.default.stylesheet': 2},
+}
+
+# Port nobody listens on - requests routed there by the PAC file fail immediately
+_BLACKHOLE_PROXY = 'PROXY 127.0.0.1:9'
+
+
+class ResourcePolicy:
+    '''Describes which requests the browser is allowed to make
+
+    Pass the policy as ``resource_policy`` to :func:`selenium_extensions.drivers.chrome_driver`, :func:`selenium_extensions.drivers.firefox_driver` or :class:`selenium_extensions.core.SeleniumDriver`. Chrome blocks the requests with DevTools' ``Network.setBlockedURLs``. Firefox switches resource types off with preferences and routes requests matching the URL patterns to a dead proxy with a generated PAC file.
+
+    Args:
+        block_types (iterable): resource types to block - any of ``'image'``, ``'font'``, ``'stylesheet'``, ``'media'``, ``'script'``. Chrome recognizes a type by the extension at the end of the URL, resources with a query string after it (``/app.js?v=1``) are loaded.
+        block_patterns (iterable): URL patterns to block, ``*`` matches any sequence of characters, e.g. ``'*.example.com/ads/*'``.
+        block_trackers (bool): boolean flag that indicates if common analytics and advertising hosts have to be blocked.
+        collect_stats (bool): boolean flag that indicates if requests have to be counted by :func:`resource_stats`. Chrome records the performance log for this.
+
+    Raises:
+        ValueError: unknown resource type in ``block_types``.
+
+    Example:
+        ::
+
+            from selenium_extensions.core import SeleniumDriver
+            from selenium_extensions.filtering import ResourcePolicy
+
+
+            policy = ResourcePolicy(block_types=['image', 'font', 'media'], block_trackers=True)
+            bot = SeleniumDriver(browser='chrome', run_headless=True, resource_policy=policy)
+    '''
+
+    def __init__(self, block_types=(), block_patterns=(), block_trackers=False, collect_stats=True):
+        unknown = set(block_types) - set(RESOURCE_TYPE_PATTERNS)
+        if unknown:
+            raise ValueError('Unknown resource types: {}'.format(', '.join(sorted(unknown))))
+        self.block_types = frozenset(block_types)
+        self.block_patterns = list(block_patterns)
+        self.block_trackers = block_trackers
+        self.collect_stats = collect_stats
+
+    @property
+    def url_patterns(self):
+        '''list: all of the URL patterns blocked by the policy'''
+        patterns = []
+        for resource_type in sorted(self.block_types):
+            patterns.extend(RESOURCE_TYPE_PATTERNS[resource_type])
+        if self.block_trackers:
+            patterns.extend(TRACKER_PATTERNS)
+        return patterns + self.block_patterns
+
+    def chrome_capabilities(self):
+        '''Returns desired capabilities Chrome has to be started with'''
+        if not self.collect_stats:
+            return {}
+        logging_prefs = {'performance': 'ALL'}
+        return {'loggingPrefs': logging_prefs, 'goog:loggingPrefs': logging_prefs}
+
+    def apply_to_chrome(self, driver):
+        '''Blocks the URL patterns in a running Chrome'''
+        execute_cdp_command(driver, 'Network.enable')
+        execute_cdp_command(driver, 'Network.setBlockedURLs', {'urls': self.url_patterns})
+
+    def firefox_preferences(self, use_proxy=None):
+        '''Returns Firefox preferences implementing the policy
+
+        Args:
+            use_proxy (str or selenium_extensions.proxies.Proxy): proxy allowed requests have to go through.
+
+        Returns:
+            dict: preference names and values.
+        '''
+        preferences = {}
+        extensions = []
+        for resource_type in sorted(self.block_types):
+            if resource_type in _FIREFOX_TYPE_PREFERENCES:
+                preferences.update(_FIREFOX_TYPE_PREFERENCES[resource_type])
+            else:
+                extensions.extend(RESOURCE_TYPE_EXTENSIONS[resource_type])
+        patterns = (TRACKER_PATTERNS if self.block_trackers else []) + self.block_patterns
+        if patterns or extensions:
+            preferences.update({
+                'network.proxy.type': 2,
+                'network.proxy.autoconfig_url': 'data:application/x-ns-proxy-autoconfig,' + quote(
+                    self._pac_file(patterns, extensions, use_proxy)),
+                # Let the PAC file see the full URL of https requests, not only the host
+                'network.proxy.autoconfig_url.include_path': True,
+            })
+        return preferences
+
+    @staticmethod
+    def _pac_file(patterns, extensions, use_proxy):
+        allowed = Proxy.parse(use_proxy).pac_entry() if use_proxy else 'DIRECT'
+        # shExpMatch treats ``?`` as a wildcard, so extensions are matched with a regular expression instead
+        extension_regexp = 'null'
+        if extensions:
+            extension_regexp = 'new RegExp({}, "i")'.format(json.dumps('\\.(?:{})(?:[?#]|$)'.format('|'.join(extensions))))
+        return (
+            'var patterns = {};\n'
+            'var extensions = {};\n'
+            'function FindProxyForURL(url, host) {{\n'
+            '    if (extensions && extensions.test(url)) {{\n'
+            '        return {};\n'
+            '    }}\n'
+            '    for (var i = 0; i < patterns.length; i++) {{\n'
+            '        if (shExpMatch(url, patterns[i])) {{\n'
+            '            return {};\n'
+            '        }}\n'
+            '    }}\n'
+            '    return {};\n'
+            '}}\n'
+        ).format(json.dumps(patterns), extension_regexp, json.dumps(_BLACKHOLE_PROXY), json.dumps(_BLACKHOLE_PROXY),
+                 json.dumps(allowed))
+
+
+def _empty_stats():
+    return {'allowed': 0, 'blocked': 0, 'bytes_loaded': 0, 'bytes_saved': 0,
+            'by_type': {}}
+
+
+def _count_chrome_requests(driver, stats):
+    # Requests that started but haven't finished yet survive between calls
+    requests = getattr(driver, '_se_pending_requests', None)
+    if requests is None:
+        requests = driver._se_pending_requests = {}
+    for entry in driver.get_log('performance'):
+        message = json.loads(entry['message'])['message']
+        method, params = message['method'], message.get('params', {})
+        if method == 'Network.requestWillBeSent':
+            requests[params['requestId']] = params.get('type', 'Other').lower()
+        elif method in ('Network.loadingFinished', 'Network.loadingFailed'):
+            resource_type = requests.pop(params['requestId'], 'other')
+            type_stats = stats['by_type'].setdefault(
+                resource_type, {'allowed': 0, 'blocked': 0, 'bytes_loaded': 0})
+            if method == 'Network.loadingFailed' and (
+                    params.get('blockedReason') or 'BLOCKED_BY_CLIENT' in params.get('errorText', '')):
+                type_stats['blocked'] += 1
+                stats['blocked'] += 1
+            else:
+                type_stats['allowed'] += 1
+                type_stats['bytes_loaded'] += int(params.get('encodedDataLength', 0))
+                stats['allowed'] += 1
+                stats['bytes_loaded'] += int(params.get('encodedDataLength', 0))
+
+
+def _count_firefox_requests(driver):
+    stats = _empty_stats()
+    entries = driver.execute_script(RESOURCE_ENTRIES)
+    for resource_type, size in entries:
+        type_stats = stats['by_type'].setdefault(
+            resource_type, {'allowed': 0, 'blocked': 0, 'bytes_loaded': 0})
+        type_stats['allowed'] += 1
+        type_stats['bytes_loaded'] += size
+        stats['allowed'] += 1
+        stats['bytes_loaded'] += size
+    return stats
+
+
+def resource_stats(driver):
+    '''Returns counters of requests made and blocked by the browser
+
+    Chrome counts every request since the driver was created (requires ``collect_stats`` in the :class:`ResourcePolicy`). Firefox doesn't report blocked requests, so only allowed requests of the current page are counted there.
+
+    ``bytes_saved`` is an estimate: every blocked request is assumed to be as big as an average allowed request of the same type (or of any type if none of this type was allowed).
+
+    Args:
+        driver (selenium.webdriver.): Selenium webdriver created with a ``resource_policy``.
+
+    Returns:
+        dict: ``allowed``, ``blocked``, ``bytes_loaded``, ``bytes_saved`` and the same counters per resource type in ``by_type``.
+
+    Example:
+        ::
+
+            from selenium_extensions.drivers import chrome_driver
+            from selenium_extensions.filtering import ResourcePolicy
+            from selenium_extensions.filtering import resource_stats
+
+
+            driver = chrome_driver(resource_policy=ResourcePolicy(block_types=['image', 'font']))
+            driver.get('https://example.com')
+            print(resource_stats(driver))
+    '''
+    if driver.name == 'chrome':
+        stats = getattr(driver, '_se_resource_stats', None)
+        if stats is None:
+            stats = driver._se_resource_stats = _empty_stats()
+        _count_chrome_requests(driver, stats)
+    else:
+        stats = _count_firefox_requests(driver)
+    average = stats['bytes_loaded'] / stats['allowed'] if stats['allowed'] else 0
+    bytes_saved = 0
+    for type_stats in stats['by_type'].values():
+        if type_stats['allowed']:
+            bytes_saved += type_stats['blocked'] * type_stats['bytes_loaded'] / type_stats['allowed']
+        else:
+            bytes_saved += type_stats['blocked'] * average
+    stats['bytes_saved'] = int(bytes_saved)
+    return stats
@@ -1,10 +1,14 @@
+import os
+import signal
 import time
 
 from selenium.common.exceptions import StaleElementReferenceException
 from selenium.common.exceptions import TimeoutException
 
+from selenium_extensions.scripts import ELEMENTS_ARE_ATTACHED
 
-def kill_virtual_display(self, display):
+
+def kill_virtual_display(display):
     '''Kills virtual display created by ``pyvirtualdisplay.Display()``
 
     Args:
@@ -59,7 +63,49 @@ def element_has_gone_stale(element):
         return True
 
 
-def wait_for_function_truth(condition_function, *args, time_to_wait=10, time_step=0.1):
+def elements_have_gone_stale(driver, elements):
+    '''Checks which of ``elements`` have gone stale in a single script round-trip
+
+    If the browser refuses to pass one of the elements to the script because it has already gone stale, every element is checked with :func:`element_has_gone_stale` instead.
+
+    Args:
+        driver (selenium.webdriver.): Selenium webdriver the elements belong to.
+        elements (list): Selenium webelements to check for.
+
+    Returns:
+        list: True for every element that has gone stale, False otherwise.
+
+    Example:
+        ::
+
+            from selenium_extensions.helpers import elements_have_gone_stale
+
+
+            rows = driver.find_elements_by_css_selector('tr')
+            ...
+            stale_rows = [row for row, stale in zip(rows, elements_have_gone_stale(driver, rows)) if stale]
+    '''
+    try:
+        return [not attached for attached in driver.execute_script(ELEMENTS_ARE_ATTACHED, list(elements))]
+    except StaleElementReferenceException:
+        return [element_has_gone_stale(element) for element in elements]
+
+
+def ensure_script_timeout(driver, timeout):
+    '''Makes sure async scripts are allowed to run for at least ``timeout`` seconds
+
+    The timeout is remembered on the driver, so the round-trip is skipped if it is already long enough.
+
+    Args:
+        driver (selenium.webdriver.): Selenium webdriver to use.
+        timeout (float): minimal script timeout in seconds.
+    '''
+    if getattr(driver, '_se_script_timeout', 0) < timeout:
+        driver.set_script_timeout(timeout)
+        driver._se_script_timeout = timeout
+
+
+def wait_for_function_truth(condition_function, *args, time_to_wait=10, time_step=0.1, backoff=1, max_time_step=None):
     '''Waits for function represented by ``condition_function`` to return any non-False value
 
     Args:
@@ -67,6 +113,8 @@ def wait_for_function_truth(condition_function, *args, time_to_wait=10, time_ste
         *args: arguments that should be applied to the function.
         time_to_wait (int): time in seconds to wait.
         time_step (float): step in seconds between checks.
+        backoff (float): factor the step is multiplied by after every unsuccessful check. Values greater than 1 make first checks frequent and later ones cheaper.
+        max_time_step (float): upper bound for the step in seconds when ``backoff`` is used.
 
     Returns:
         bool: True if ``wait_for_function_truth`` succeeded and didn't reach ``time_to_wait`` limit
@@ -90,11 +138,40 @@ def wait_for_function_truth(condition_function, *args, time_to_wait=10, time_ste
             return True
         else:
             time.sleep(time_step)
+            time_step *= backoff
+            if max_time_step is not None:
+                time_step = min(time_step, max_time_step)
     raise TimeoutException(
         'Timeout waiting for {}'.format(condition_function.__name__)
     )
 
 
+def execute_cdp_command(driver, command, params=None):
+    '''Executes Chrome DevTools Protocol command using chromedriver's ``goog/cdp/execute`` endpoint
+
+    Args:
+        driver (selenium.webdriver.Chrome): Chrome webdriver to use.
+        command (str): DevTools Protocol command, e.g. ``Network.setBlockedURLs``.
+        params (dict): parameters of the command.
+
+    Returns:
+        dict: result of the command.
+
+    Example:
+        ::
+
+            from selenium_extensions.helpers import execute_cdp_command
+
+
+            execute_cdp_command(driver, 'Network.setBlockedURLs', {'urls': ['*.woff2']})
+    '''
+    commands = driver.command_executor._commands
+    if 'executeCdpCommand' not in commands:
+        commands['executeCdpCommand'] = ('POST', '/session/$sessionId/goog/cdp/execute')
+    response = driver.execute('executeCdpCommand', {'cmd': command, 'params': params or {}})
+    return response['value']
+
+
 def join_css_classes(*args):
     '''Joins css classes into a single string
 
@@ -114,3 +191,83 @@ def join_css_classes(*args):
             print(classes)  # '.class2 .class2'
     '''
     return ' '.join(['.{}'.format(c) for c in args])
+
+
+def _child_process_ids(pid):
+    '''Returns ids of all descendants of process ``pid`` using ``psutil`` if it is installed and ``/proc`` otherwise'''
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        try:
+            return [child.pid for child in psutil.Process(pid).children(recursive=True)]
+        except psutil.Error:
+            return []
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return []
+    children = {}
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open('/proc/{}/stat'.format(entry)) as stat:
+                # The command name may contain spaces, the parent id is the second field after it
+                parent = int(stat.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+    found, parents = [], [pid]
+    while parents:
+        descendants = children.get(parents.pop(), [])
+        found.extend(descendants)
+        parents.extend(descendants)
+    return found
+
+
+def driver_process_ids(driver):
+    '''Returns ids of the processes started for the driver - the webdriver binary and everything it launched, e.g. the browser
+
+    Descendants are looked up with ``psutil`` if it is installed and using ``/proc`` otherwise. On systems without either only the webdriver binary is found.
+
+    Args:
+        driver (selenium.webdriver.): Selenium webdriver to inspect.
+
+    Returns:
+        list: process ids, the webdriver binary first. Empty for remote drivers.
+
+    Example:
+        ::
+
+            from selenium_extensions.helpers import driver_process_ids
+
+
+            print(driver_process_ids(driver))  # [chromedriver, chrome, chrome renderers...]
+    '''
+    process = getattr(getattr(driver, 'service', None), 'process', None)
+    if process is None:
+        return []
+    return [process.pid] + _child_process_ids(process.pid)
+
+
+def kill_driver_processes(driver):
+    '''Kills the webdriver binary and all of the processes it launched without talking to them
+
+    Args:
+        driver (selenium.webdriver.): Selenium webdriver to kill.
+    '''
+    kill_signal = getattr(signal, 'SIGKILL', signal.SIGTERM)
+    # Collect the whole tree first, killed processes' children get reparented
+    for pid in reversed(driver_process_ids(driver)):
+        try:
+            os.kill(pid, kill_signal)
+        except OSError:
+            pass
+    process = getattr(getattr(driver, 'service', None), 'process', None)
+    if process is not None:
+        try:
+            process.wait(timeout=5)
+        except Exception:
+            pass
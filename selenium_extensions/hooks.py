@@ -0,0 +1,67 @@
+from functools import partial
+
+
+def add_command_hook(driver, hook):
+    '''Adds a hook around every WebDriver command issued by ``driver``
+
+    ``driver.execute`` is wrapped once per driver, so hooks also see commands issued by ``WebElement`` methods. Every hook is called as ``hook(execute, command, params)`` and has to return ``execute(command, params)`` - the result of the rest of the chain. Hooks added later run closer to the actual command.
+
+    Args:
+        driver (selenium.webdriver.): Selenium webdriver to hook into.
+        hook (function): hook to add.
+
+    Example:
+        ::
+
+            from selenium_extensions.hooks import add_command_hook
+
+
+            def log_command(execute, command, params):
+                print(command)
+                return execute(command, params)
+
+
+            add_command_hook(driver, log_command)
+    '''
+    hooks = getattr(driver, '_se_command_hooks', None)
+    if hooks is None:
+        hooks = driver._se_command_hooks = []
+        original_execute = driver.execute
+
+        def execute(command, params=None):
+            chain = original_execute
+            for command_hook in reversed(hooks):
+                chain = partial(command_hook, chain)
+            return chain(command, params)
+
+        driver.execute = execute
+    hooks.append(hook)
+
+
+def remove_command_hook(driver, hook):
+    '''Removes a hook added by :func:`add_command_hook`
+
+    Args:
+        driver (selenium.webdriver.): Selenium webdriver the hook was added to.
+        hook (function): hook to remove.
+    '''
+    hooks = getattr(driver, '_se_command_hooks', [])
+    if hook in hooks:
+        hooks.remove(hook)
+
+
+# Attributes holding the objects the hooks of a driver dispatch to
+HOOK_TARGETS = ('_se_element_cache', '_se_instrumentation', '_se_timeouts')
+
+
+def detach_hook_targets(driver):
+    '''Detaches the element cache, the instrumentation and the adaptive timeouts from ``driver``
+
+    Their hooks are added once per driver and look the objects up on every command, so they stay installed and do nothing until new objects are attached. Called when a pooled driver changes hands, so a bot doesn't get the objects of the previous one.
+
+    Args:
+        driver (selenium.webdriver.): Selenium webdriver to detach from.
+    '''
+    for name in HOOK_TARGETS:
+        if hasattr(driver, name):
+            setattr(driver, name, None)
@@ -0,0 +1,502 @@
+import base64
+import gzip
+import http.client
+import json
+import logging
+import os
+import threading
+import zlib
+from collections import namedtuple
+from functools import wraps
+from http.cookiejar import Cookie
+from http.cookiejar import CookieJar
+from urllib.parse import urljoin
+from urllib.parse import urlsplit
+from urllib.request import Request
+
+from selenium.common.exceptions import WebDriverException
+
+from selenium_extensions.core import count_elements
+from selenium_extensions.core import element_is_present
+from selenium_extensions.core import elements_are_present
+from selenium_extensions.core import shut_down
+from selenium_extensions.core import wait_for_element_to_be_present
+from selenium_extensions.drivers import create_driver
+from selenium_extensions.exceptions import SeleniumExtensionsException
+from selenium_extensions.extraction import extract
+from selenium_extensions.extraction import iter_extract
+from selenium_extensions.fake import FakeWebDriver
+from selenium_extensions.fake import _visible_text
+from selenium_extensions.helpers import execute_cdp_command
+from selenium_extensions.proxies import Proxy
+from selenium_extensions.proxies import lease_proxy
+from selenium_extensions.scripts import USER_AGENT
+
+
+logger = logging.getLogger(__name__)
+
+HTTP = 'http'
+BROWSER = 'browser'
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/65.0.3325.181 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': 'gzip, deflate',
+}
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+
+HttpResponse = namedtuple('HttpResponse', ['url', 'status', 'headers', 'body', 'text'])
+HttpResponse.__doc__ = '''Response of :meth:`HttpClient.get`
+
+Attributes:
+    url (str): final URL after redirects.
+    status (int): HTTP status code.
+    headers (http.client.HTTPMessage): response headers.
+    body (bytes): decompressed response body.
+    text (str): body decoded with the charset of the response, UTF-8 by default.
+'''
+
+
+class HttpClient:
+    '''HTTP client with a keep-alive connection pool, a cookie jar and a proxy shared with the browser
+
+    Args:
+        proxy (str or selenium_extensions.proxies.Proxy): HTTP proxy in ``[http://][user:password@]host[:port]`` format, the same as ``use_proxy`` of the drivers.
+        headers (dict): headers sent with every request on top of :data:`DEFAULT_HEADERS`.
+        timeout (float): time in seconds to wait for the server.
+        max_connections (int): number of idle connections kept open per host.
+        max_redirects (int): number of redirects to follow.
+
+    Raises:
+        selenium_extensions.exceptions.SeleniumExtensionsException: ``proxy`` is a SOCKS proxy or an HTTP proxy reached over TLS, which ``http.client`` doesn't support.
+
+    Attributes:
+        cookie_jar (http.cookiejar.CookieJar): cookies of the client.
+        headers (dict): headers sent with every request.
+
+    Example:
+        ::
+
+            from selenium_extensions.hybrid import HttpClient
+
+
+            client = HttpClient(proxy='127.0.0.1:8080')
+            response = client.get('https://example.com/products')
+            print(response.status, len(response.text))
+    '''
+
+    def __init__(self, proxy=None, headers=None, timeout=30, max_connections=10, max_redirects=10):
+        self.proxy = Proxy.parse(proxy) if proxy else None
+        if self.proxy is not None and self.proxy.scheme != 'http':
+            raise SeleniumExtensionsException('HttpClient supports plain HTTP proxies only, not {}'.format(self.proxy))
+        self._proxy_headers = {}
+        if self.proxy is not None and self.proxy.username is not None:
+            credentials = '{}:{}'.format(self.proxy.username, self.proxy.password or '').encode('utf-8')
+            self._proxy_headers['Proxy-Authorization'] = 'Basic ' + base64.b64encode(credentials).decode('ascii')
+        self.headers = dict(DEFAULT_HEADERS, **(headers or {}))
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_redirects = max_redirects
+        self.cookie_jar = CookieJar()
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def get(self, url, headers=None):
+        '''Fetches ``url`` following redirects
+
+        Args:
+            url (str): URL to fetch.
+            headers (dict): headers of this request on top of the client's ones.
+
+        Returns:
+            HttpResponse: final response. Error statuses are returned as well.
+        '''
+        for _ in range(self.max_redirects + 1):
+            response = self._request(url, dict(self.headers, **(headers or {})))
+            location = response.headers.get('Location')
+            if response.status not in REDIRECT_CODES or not location:
+                return response
+            url = urljoin(url, location)
+        raise http.client.HTTPException('Too many redirects: {}'.format(url))
+
+    def close(self):
+        '''Closes all of the idle connections'''
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+    def _request(self, url, headers):
+        parts = urlsplit(url)
+        request = Request(url, headers=headers)
+        self.cookie_jar.add_cookie_header(request)
+        forwarded = self.proxy is not None and parts.scheme == 'http'
+        target = url if forwarded else (parts.path or '/') + ('?' + parts.query if parts.query else '')
+        request_headers = dict(request.header_items(), **(self._proxy_headers if forwarded else {}))
+        key = (parts.scheme, parts.hostname, parts.port)
+        for attempt in range(2):
+            connection, reused = self._acquire(key, parts)
+            try:
+                connection.request('GET', target, headers=request_headers)
+                raw = connection.getresponse()
+                body = raw.read()
+            except (http.client.HTTPException, ConnectionError) as error:
+                connection.close()
+                # A kept-alive connection may have been closed by the server meanwhile
+                if reused and attempt == 0:
+                    continue
+                raise error
+            break
+        if raw.will_close:
+            connection.close()
+        else:
+            self._release(key, connection)
+        self.cookie_jar.extract_cookies(raw, request)
+        encoding = raw.headers.get('Content-Encoding', '').lower()
+        if encoding == 'gzip':
+            body = gzip.decompress(body)
+        elif encoding == 'deflate':
+            body = zlib.decompress(body)
+        charset = raw.headers.get_content_charset() or 'utf-8'
+        return HttpResponse(url, raw.status, raw.headers, body, body.decode(charset, 'replace'))
+
+    def _acquire(self, key, parts):
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        if self.proxy is not None:
+            connection = connection_class(self.proxy.host, self.proxy.port, timeout=self.timeout)
+            if parts.scheme == 'https':
+                connection.set_tunnel(parts.hostname, port, headers=self._proxy_headers)
+        else:
+            connection = connection_class(parts.hostname, port, timeout=self.timeout)
+        return connection, False
+
+    def _release(self, key, connection):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_connections:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def set_cookie(self, cookie):
+        '''Adds a cookie in Selenium's format (``driver.get_cookies()``) to the jar
+
+        Args:
+            cookie (dict): cookie with ``name``, ``value`` and optionally ``domain``, ``path``, ``secure``, ``expiry`` and ``httpOnly``.
+        '''
+        domain = cookie.get('domain', '')
+        self.cookie_jar.set_cookie(Cookie(
+            version=0, name=cookie['name'], value=cookie['value'], port=None, port_specified=False,
+            domain=domain, domain_specified=domain.startswith('.'), domain_initial_dot=domain.startswith('.'),
+            path=cookie.get('path', '/'), path_specified=True, secure=cookie.get('secure', False),
+            expires=cookie.get('expiry'), discard=cookie.get('expiry') is None, comment=None, comment_url=None,
+            rest={'HttpOnly': None} if cookie.get('httpOnly') else {}))
+
+    def cookies_for(self, url):
+        '''Returns cookies of the jar sent to ``url`` in Selenium's format, ready for ``driver.add_cookie``
+
+        Args:
+            url (str): URL the cookies have to match.
+
+        Returns:
+            list: cookies as dictionaries.
+        '''
+        request = Request(url)
+        self.cookie_jar.add_cookie_header(request)
+        names = set(part.split('=', 1)[0].strip() for part in (request.get_header('Cookie') or '').split(';'))
+        cookies = []
+        for cookie in self.cookie_jar:
+            if cookie.name in names and _domain_matches(urlsplit(url).hostname or '', cookie.domain):
+                entry = {'name': cookie.name, 'value': cookie.value, 'path': cookie.path, 'secure': cookie.secure,
+                         'domain': cookie.domain}
+                if cookie.expires is not None:
+                    entry['expiry'] = cookie.expires
+                cookies.append(entry)
+        return cookies
+
+
+def _domain_matches(host, domain):
+    domain = domain.lstrip('.')
+    return host == domain or host.endswith('.' + domain)
+
+
+class DomainModes:
+    '''Learns per domain whether pages can be opened over HTTP or need the browser
+
+    A domain starts in ``'http'`` mode. After ``failures`` HTTP attempts in a row had to be escalated to the browser, its pages are opened in the browser right away. Every ``probe_interval`` browser pages HTTP is tried again, in case the site has changed.
+
+    Args:
+        path (str): JSON file the statistics are loaded from and saved to, so learning survives restarts.
+        failures (int): number of consecutive escalations after which the domain switches to the browser.
+        probe_interval (int): number of browser pages after which HTTP is tried again.
+
+    Example:
+        ::
+
+            from selenium_extensions.hybrid import DomainModes
+
+
+            modes = DomainModes('modes.json')
+            print(modes.stats())  # {'example.com': {'mode': 'http', 'http_pages': 120, ...}}
+    '''
+
+    def __init__(self, path=None, failures=2, probe_interval=100):
+        self.path = path
+        self.failures = failures
+        self.probe_interval = probe_interval
+        self._domains = {}
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            with open(path) as stats:
+                self._domains = json.load(stats)
+
+    def mode(self, domain):
+        '''Returns the mode the next page of ``domain`` has to be opened in, ``'http'`` or ``'browser'``'''
+        with self._lock:
+            stats = self._domains.get(domain)
+            if stats is None or stats['failures_in_row'] < self.failures:
+                return HTTP
+            return BROWSER if stats['since_probe'] < self.probe_interval else HTTP
+
+    def record(self, domain, mode, escalated=False):
+        '''Records how a page of ``domain`` has been opened
+
+        Args:
+            domain (str): domain of the page.
+            mode ('http' or 'browser'): mode the page was attempted in.
+            escalated (bool): boolean flag that indicates if an HTTP attempt had to be escalated to the browser.
+        '''
+        with self._lock:
+            stats = self._domains.setdefault(domain, {
+                'http_pages': 0, 'browser_pages': 0, 'escalations': 0, 'failures_in_row': 0, 'since_probe': 0})
+            if mode == HTTP and not escalated:
+                stats['http_pages'] += 1
+                stats['failures_in_row'] = 0
+            elif mode == HTTP:
+                stats['escalations'] += 1
+                stats['failures_in_row'] += 1
+                stats['since_probe'] = 0
+            else:
+                stats['browser_pages'] += 1
+                stats['since_probe'] += 1
+            if self.path is not None:
+                self._save()
+
+    def stats(self):
+        '''Returns a copy of the statistics of every domain, including its current ``mode``'''
+        with self._lock:
+            domains = json.loads(json.dumps(self._domains))
+        for domain, stats in domains.items():
+            stats['mode'] = self.mode(domain)
+        return domains
+
+    def _save(self):
+        temporary = '{}.{}.tmp'.format(self.path, os.getpid())
+        with open(temporary, 'w') as stats:
+            json.dump(self._domains, stats, indent=2, sort_keys=True)
+        os.replace(temporary, self.path)
+
+
+def looks_client_rendered(driver, min_text=200):
+    '''Guesses whether a page fetched over HTTP is rendered by JavaScript
+
+    Args:
+        driver (selenium_extensions.fake.FakeWebDriver): driver of the HTTP fast path with the page loaded.
+        min_text (int): number of characters of visible text a server-rendered page has at least.
+
+    Returns:
+        bool: ``True`` if the page has scripts but hardly any text.
+    '''
+    document = driver.fake_browser.document
+    body = next((node for node in document.descendants() if node.tag == 'body'), document)
+    has_scripts = any(node.tag == 'script' for node in document.descendants())
+    return has_scripts and len(_visible_text(body)) < min_text
+
+
+def _on_current_driver(helper):
+    @wraps(helper)
+    def call(self, *args, **kwargs):
+        return helper(self.driver, *args, **kwargs)
+    return call
+
+
+class HybridDriver:
+    '''Base class for bots that fetch server-rendered pages over HTTP and use the browser only for pages that need JavaScript
+
+    :meth:`open` fetches a page with :class:`HttpClient` and parses it into a :class:`selenium_extensions.fake.FakeWebDriver`, so ``driver`` and locator-based helpers (``element_is_present``, ``count_elements``, ``extract``, ...) work on the raw HTML without a browser. The page is escalated to the real browser if the request fails, the page doesn't contain ``expect`` or ``needs_browser`` says so. The browser is launched on the first escalation only. Cookies are copied both ways on every switch, the proxy is shared and the browser's user agent is used for HTTP once it runs. :class:`DomainModes` learns which domains need the browser and opens their pages there right away.
+
+    Args:
+        browser ('chrome', 'firefox' or 'fake'): webdriver to escalate to.
+        executable_path (str): path to the browser's webdriver binary.
+        run_headless (bool): boolean flag that indicates if webdriver has to be headless (without GUI).
+        load_images (bool): boolean flag that indicates if webdriver has to render images.
+        use_proxy (str, selenium_extensions.proxies.Proxy or selenium_extensions.proxies.ProxyPool): HTTP proxy for both the browser and the HTTP client. A proxy taken from a pool is kept for the lifetime of the bot.
+        headers (dict): additional headers of the HTTP client, Chrome sends them as well.
+        modes (DomainModes): per-domain learning of the mode. Defaults to in-memory learning.
+        needs_browser (function): called with the driver of the HTTP path after the page has been parsed, returns ``True`` if the page has to be opened in the browser. Defaults to :func:`looks_client_rendered` when ``open`` gets no ``expect``.
+        browser_timeout (float): time in seconds to wait for ``expect`` in the browser.
+        **driver_options: additional keyword arguments passed to the driver factory of ``browser``.
+
+    Attributes:
+        driver (selenium.webdriver.): driver the current page has been opened in.
+        mode ('http' or 'browser'): mode the current page has been opened in.
+        response (HttpResponse): response of the last page fetched over HTTP.
+        client (HttpClient): HTTP client of the fast path.
+
+    Example:
+        ::
+
+            from selenium.webdriver.common.by import By
+            from selenium_extensions.hybrid import DomainModes
+            from selenium_extensions.hybrid import HybridDriver
+
+
+            class ShopBot(HybridDriver):
+
+                def products(self, url):
+                    self.open(url, expect=(By.CSS_SELECTOR, 'tr.product'))
+                    return self.extract((By.CSS_SELECTOR, 'tr.product'), {'name': 'td.name', 'price': 'td.price'})
+
+
+            bot = ShopBot(browser='chrome', run_headless=True, modes=DomainModes('modes.json'))
+            for url in urls:
+                print(bot.products(url), bot.mode)
+            bot.shut_down()
+    '''
+
+    def __init__(self, browser='chrome', executable_path=None, run_headless=False, load_images=True, use_proxy=None,
+                 headers=None, modes=None, needs_browser=None, browser_timeout=10, **driver_options):
+        use_proxy = lease_proxy(use_proxy)
+        self.client = HttpClient(proxy=use_proxy, headers=headers)
+        self.modes = modes if modes is not None else DomainModes()
+        self.needs_browser = needs_browser
+        self.browser_timeout = browser_timeout
+        self._custom_headers = dict(headers or {})
+        self._browser_arguments = dict(browser=browser, executable_path=executable_path, run_headless=run_headless,
+                                       load_images=load_images, use_proxy=use_proxy, **driver_options)
+        self._browser = None
+        self.http_driver = FakeWebDriver(loader=self._fetch)
+        self.driver = self.http_driver
+        self.mode = None
+        self.response = None
+
+    @property
+    def browser(self):
+        '''Driver of the real browser, launched on first use'''
+        if self._browser is None:
+            self._browser = create_driver(**self._browser_arguments)
+            if 'User-Agent' not in self._custom_headers:
+                self.client.headers['User-Agent'] = self._browser.execute_script(USER_AGENT)
+            if self._browser.name == 'chrome':
+                execute_cdp_command(self._browser, 'Network.enable')
+                if self._custom_headers:
+                    execute_cdp_command(self._browser, 'Network.setExtraHTTPHeaders', {'headers': self._custom_headers})
+        return self._browser
+
+    def open(self, url, expect=None, mode=None):
+        '''Opens ``url`` over HTTP if possible and in the browser otherwise
+
+        Args:
+            url (str): URL to open.
+            expect ((selenium.webdriver.common.by.By., str)): locator of an element the page must contain, e.g. the data to extract. Its absence in the raw HTML means the page is rendered by JavaScript.
+            mode ('http' or 'browser'): mode to open the page in, overriding the learnt one.
+
+        Returns:
+            selenium.webdriver.: driver the page has been opened in, also available as ``driver``.
+
+        Raises:
+            selenium.common.exceptions.TimeoutException: ``expect`` hasn't appeared in the browser in ``browser_timeout`` seconds.
+        '''
+        domain = urlsplit(url).hostname or ''
+        if (mode or self.modes.mode(domain)) == HTTP:
+            reason = self._open_over_http(url, expect)
+            if reason is None:
+                self.modes.record(domain, HTTP)
+                return self.driver
+            logger.info('Opening %s in the browser: %s', url, reason)
+            self.modes.record(domain, HTTP, escalated=True)
+        self._open_in_browser(url, expect)
+        self.modes.record(domain, BROWSER)
+        return self.driver
+
+    def _fetch(self, url):
+        self.response = self.client.get(url)
+        return self.response.url, self.response.text
+
+    def _open_over_http(self, url, expect):
+        '''Loads the page into the HTTP driver and returns why it has to be escalated or ``None``'''
+        self.response = None
+        try:
+            self.http_driver.get(url)
+        except WebDriverException as error:
+            return 'request failed: {}'.format(error.msg)
+        if self.response is None:
+            # about:blank and data: URLs are not fetched
+            self.driver, self.mode = self.http_driver, HTTP
+            return None
+        if self.response.status >= 400:
+            return 'status {}'.format(self.response.status)
+        content_type = self.response.headers.get('Content-Type', 'text/html')
+        if 'html' not in content_type and 'xml' not in content_type:
+            return 'content type {}'.format(content_type)
+        if expect is not None and not self.http_driver.fake_browser.find(*expect):
+            return '{} is not in the HTML'.format(expect[1])
+        needs_browser = self.needs_browser or (looks_client_rendered if expect is None else None)
+        if needs_browser is not None and needs_browser(self.http_driver):
+            return 'the page needs JavaScript'
+        self.driver, self.mode = self.http_driver, HTTP
+        return None
+
+    def _open_in_browser(self, url, expect):
+        browser = self.browser
+        self._push_cookies(browser, url)
+        browser.get(url)
+        self.driver, self.mode = browser, BROWSER
+        if expect is not None:
+            wait_for_element_to_be_present(browser, expect, waiting_time=self.browser_timeout, in_page=True)
+        for cookie in browser.get_cookies():
+            self.client.set_cookie(cookie)
+
+    def _push_cookies(self, browser, url):
+        '''Copies cookies of the HTTP client to the browser before it opens ``url``'''
+        cookies = self.client.cookies_for(url)
+        if not cookies:
+            return
+        if browser.name == 'chrome':
+            for cookie in cookies:
+                params = dict(cookie, url=url)
+                if 'expiry' in params:
+                    params['expires'] = params.pop('expiry')
+                execute_cdp_command(browser, 'Network.setCookie', params)
+            return
+        # Other browsers accept cookies only for the domain they are on
+        if urlsplit(browser.current_url).hostname != urlsplit(url).hostname:
+            browser.get(url)
+        present = set((cookie['name'], cookie['value']) for cookie in browser.get_cookies())
+        for cookie in cookies:
+            if (cookie['name'], cookie['value']) not in present:
+                browser.add_cookie(cookie)
+
+    element_is_present = _on_current_driver(element_is_present)
+    count_elements = _on_current_driver(count_elements)
+    elements_are_present = _on_current_driver(elements_are_present)
+    extract = _on_current_driver(extract)
+    iter_extract = _on_current_driver(iter_extract)
+
+    def shut_down(self):
+        '''Shuts the browser down if it has been launched and closes the HTTP connections'''
+        try:
+            if self._browser is not None:
+                shut_down(self._browser)
+                self._browser = None
+        finally:
+            self.http_driver.quit()
+            self.client.close()
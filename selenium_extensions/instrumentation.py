@@ -0,0 +1,297 @@
+import bisect
+import os
+import threading
+import time
+from functools import partial
+from functools import wraps
+
+from selenium.common.exceptions import TimeoutException
+
+from selenium_extensions.hooks import add_command_hook
+
+
+# Upper bounds of histogram buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Upper bounds of buckets for the number of WebDriver commands issued by a helper call
+COMMAND_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+_METRIC_PREFIX = 'selenium_extensions_'
+
+
+class Histogram:
+    '''Thread-safe histogram with fixed buckets'''
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+
+    def cumulative_buckets(self):
+        '''Returns ``(upper_bound, count)`` pairs, the last upper bound being ``inf``'''
+        with self._lock:
+            counts = list(self.counts)
+        total = 0
+        cumulative = []
+        for upper_bound, count in zip(self.buckets + (float('inf'),), counts):
+            total += count
+            cumulative.append((upper_bound, total))
+        return cumulative
+
+
+class _CallFrame:
+    '''Helper call in progress on the current thread'''
+
+    def __init__(self):
+        self.commands = 0
+
+
+def _time_command(driver, execute, command, params):
+    '''Command hook that records the command with the instrumentation attached to the driver'''
+    instrumentation = getattr(driver, '_se_instrumentation', None)
+    if instrumentation is None:
+        return execute(command, params)
+    return instrumentation._command_hook(execute, command, params)
+
+
+class Instrumentation:
+    '''Records timings of WebDriver commands and ``selenium_extensions`` helpers
+
+    Instrumentation is opt-in: pass an instance as ``instrumentation`` to :class:`selenium_extensions.core.SeleniumDriver` or call :meth:`instrument` on a driver. Drivers without instrumentation pay for a single attribute lookup per helper call.
+
+    Recorded histograms:
+
+    - ``webdriver_command_seconds`` - latency of every WebDriver command, by ``command``.
+    - ``helper_seconds`` - latency of every helper call, by ``helper``.
+    - ``helper_webdriver_commands`` - number of WebDriver commands issued by a helper call, by ``helper``.
+    - ``wait_seconds`` - time spent in waiting helpers, by ``helper`` and ``outcome`` (``success`` or ``timeout``).
+
+    Args:
+        exporters (iterable): exporters called by :meth:`export` - :class:`LogExporter`, :class:`PrometheusFileExporter`, :class:`CallbackExporter` or any object with ``export(snapshot)`` method.
+        export_interval (float): time in seconds after which recorded metrics are exported automatically. If set to ``None`` metrics are only exported by calling :meth:`export`.
+        buckets (tuple): upper bounds of histogram buckets in seconds.
+
+    Example:
+        ::
+
+            from selenium_extensions.core import SeleniumDriver
+            from selenium_extensions.instrumentation import Instrumentation
+            from selenium_extensions.instrumentation import PrometheusFileExporter
+
+
+            instrumentation = Instrumentation(
+                exporters=[PrometheusFileExporter('/var/lib/node_exporter/bots.prom')], export_interval=15)
+            bot = SeleniumDriver(browser='chrome', instrumentation=instrumentation)
+            ...
+            instrumentation.export()
+    '''
+
+    def __init__(self, exporters=(), export_interval=None, buckets=DEFAULT_BUCKETS):
+        self.exporters = list(exporters)
+        self.export_interval = export_interval
+        self.buckets = buckets
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._last_export = time.time()
+
+    def instrument(self, driver):
+        '''Starts recording commands issued by ``driver``
+
+        Args:
+            driver (selenium.webdriver.): Selenium webdriver to instrument.
+        '''
+        if not hasattr(driver, '_se_instrumentation'):
+            add_command_hook(driver, partial(_time_command, driver))
+        driver._se_instrumentation = self
+
+    def histogram(self, name, buckets=None, **labels):
+        '''Returns histogram ``name`` with ``labels``, creating it with ``buckets`` (or the default ones) on first use'''
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(buckets or self.buckets))
+        return histogram
+
+    def _command_hook(self, execute, command, params):
+        for frame in getattr(self._local, 'frames', ()):
+            frame.commands += 1
+        start = time.time()
+        try:
+            return execute(command, params)
+        finally:
+            self.histogram('webdriver_command_seconds', command=command).observe(time.time() - start)
+
+    def measure(self, helper, waits, function, *args, **kwargs):
+        '''Calls ``function`` recording it as ``helper``
+
+        Args:
+            helper (str): name of the helper.
+            waits (bool): boolean flag that indicates if the helper waits, so its outcome has to be recorded. Raising ``TimeoutException`` or returning ``False`` counts as a timeout.
+            function (function): function to call.
+
+        Returns:
+            value returned by ``function``.
+        '''
+        frames = self._local.__dict__.setdefault('frames', [])
+        frame = _CallFrame()
+        frames.append(frame)
+        outcome = 'success'
+        start = time.time()
+        try:
+            result = function(*args, **kwargs)
+            if result is False:
+                outcome = 'timeout'
+            return result
+        except TimeoutException:
+            outcome = 'timeout'
+            raise
+        finally:
+            elapsed = time.time() - start
+            frames.remove(frame)
+            self.histogram('helper_seconds', helper=helper).observe(elapsed)
+            self.histogram('helper_webdriver_commands', COMMAND_COUNT_BUCKETS,
+                           helper=helper).observe(frame.commands)
+            if waits:
+                self.histogram('wait_seconds', helper=helper, outcome=outcome).observe(elapsed)
+            if self.export_interval is not None and time.time() - self._last_export >= self.export_interval:
+                self.export()
+
+    def snapshot(self):
+        '''Returns current state of all of the histograms
+
+        Returns:
+            list: dicts with ``name``, ``labels``, ``count``, ``sum`` and cumulative ``buckets``.
+        '''
+        with self._lock:
+            histograms = list(self._histograms.items())
+        return [{'name': name, 'labels': dict(labels), 'count': histogram.count,
+                 'sum': histogram.sum, 'buckets': histogram.cumulative_buckets()}
+                for (name, labels), histogram in sorted(histograms, key=lambda item: item[0])]
+
+    def export(self):
+        '''Passes the current snapshot to every exporter'''
+        self._last_export = time.time()
+        snapshot = self.snapshot()
+        for exporter in self.exporters:
+            exporter.export(snapshot)
+
+
+def instrumented(waits=False):
+    '''Decorator that records calls of a helper taking the driver as its first argument
+
+    Calls are recorded only if the driver was instrumented with :meth:`Instrumentation.instrument`.
+
+    Args:
+        waits (bool): boolean flag that indicates if the helper waits for something.
+    '''
+    def decorator(function):
+        @wraps(function)
+        def wrapper(driver, *args, **kwargs):
+            instrumentation = getattr(driver, '_se_instrumentation', None)
+            if instrumentation is None:
+                return function(driver, *args, **kwargs)
+            return instrumentation.measure(function.__name__, waits, function, driver, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class LogExporter:
+    '''Exports every histogram as a log line
+
+    Args:
+        logger (logging.Logger): logger to use. Defaults to ``selenium_extensions.instrumentation`` logger.
+        level (int): logging level, ``logging.INFO`` by default.
+    '''
+
+    def __init__(self, logger=None, level=None):
+        import logging
+
+        self.logger = logger or logging.getLogger(__name__)
+        self.level = logging.INFO if level is None else level
+
+    def export(self, snapshot):
+        for metric in snapshot:
+            labels = ' '.join('{}={}'.format(key, value) for key, value in sorted(metric['labels'].items()))
+            average = metric['sum'] / metric['count'] if metric['count'] else 0
+            self.logger.log(self.level, '%s %s count=%d sum=%.6f avg=%.6f',
+                            metric['name'], labels, metric['count'], metric['sum'], average)
+
+
+def _format_labels(labels):
+    return ','.join('{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                    for key, value in sorted(labels.items()))
+
+
+def prometheus_text(snapshot):
+    '''Formats a snapshot in Prometheus text exposition format
+
+    Args:
+        snapshot (list): snapshot returned by :meth:`Instrumentation.snapshot`.
+
+    Returns:
+        str: metrics in Prometheus text format.
+    '''
+    lines = []
+    typed = set()
+    for metric in snapshot:
+        name = _METRIC_PREFIX + metric['name']
+        if name not in typed:
+            lines.append('# TYPE {} histogram'.format(name))
+            typed.add(name)
+        for upper_bound, count in metric['buckets']:
+            labels = dict(metric['labels'], le='+Inf' if upper_bound == float('inf') else repr(upper_bound))
+            lines.append('{}_bucket{{{}}} {}'.format(name, _format_labels(labels), count))
+        labels = _format_labels(metric['labels'])
+        lines.append('{}_sum{{{}}} {}'.format(name, labels, repr(metric['sum'])))
+        lines.append('{}_count{{{}}} {}'.format(name, labels, metric['count']))
+    return '\n'.join(lines) + '\n'
+
+
+class PrometheusFileExporter:
+    '''Writes metrics in Prometheus text format to a file, e.g. for node_exporter's textfile collector
+
+    The file is replaced atomically, so readers never see a partially written file.
+
+    Args:
+        path (str): path to the file.
+        mode (int): permissions of the file. Readable by everyone by default, as the collector usually runs as another user.
+    '''
+
+    def __init__(self, path, mode=0o644):
+        self.path = path
+        self.mode = mode
+
+    def export(self, snapshot):
+        import tempfile
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(descriptor, 'w') as metrics_file:
+            metrics_file.write(prometheus_text(snapshot))
+        # mkstemp creates the file readable by its owner only
+        os.chmod(temporary_path, self.mode)
+        os.replace(temporary_path, self.path)
+
+
+class CallbackExporter:
+    '''Passes every snapshot to ``callback``
+
+    Args:
+        callback (function): function called with the snapshot returned by :meth:`Instrumentation.snapshot`.
+    '''
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def export(self, snapshot):
+        self.callback(snapshot)
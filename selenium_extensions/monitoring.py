@@ -0,0 +1,268 @@
+import os
+import threading
+import time
+from collections import namedtuple
+
+from selenium_extensions.exceptions import SeleniumExtensionsException
+from selenium_extensions.helpers import driver_process_ids
+from selenium_extensions.hooks import add_command_hook
+
+
+ResourceUsage = namedtuple('ResourceUsage', ['rss', 'cpu_time', 'cpu_percent', 'processes', 'pages', 'age'])
+ResourceUsage.__doc__ = '''Resources used by the process tree of a driver
+
+Attributes:
+    rss (int): resident memory of all of the processes in bytes. Memory shared between the processes is counted for every one of them.
+    cpu_time (float): user and system CPU time of the running processes in seconds.
+    cpu_percent (float): CPU usage since the previous measurement in percent of a single core.
+    processes (int): number of processes.
+    pages (int): number of pages opened with ``get``.
+    age (float): time in seconds since the driver has been launched.
+'''
+
+
+def _process_usage(pid):
+    '''Returns ``(rss, cpu_time)`` of process ``pid`` using ``psutil`` if it is installed and ``/proc`` otherwise'''
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        try:
+            process = psutil.Process(pid)
+            cpu_times = process.cpu_times()
+            return process.memory_info().rss, cpu_times.user + cpu_times.system
+        except psutil.Error:
+            return 0, 0
+    try:
+        with open('/proc/{}/statm'.format(pid)) as statm:
+            rss = int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        with open('/proc/{}/stat'.format(pid)) as stat:
+            # Fields after the command name start with the state, utime and stime are the 12th and the 13th of them
+            fields = stat.read().rsplit(')', 1)[1].split()
+        return rss, (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    except (OSError, IndexError, ValueError):
+        return 0, 0
+
+
+class _ResourceMonitor:
+    '''Counts pages opened by a driver and remembers the previous CPU measurement'''
+
+    def __init__(self):
+        from selenium.webdriver.remote.command import Command
+
+        self.get_command = Command.GET
+        self.started_at = time.time()
+        self.pages = 0
+        self.measured_at = None
+        self.cpu_time = 0
+
+    def count_pages(self, execute, command, params):
+        result = execute(command, params)
+        if command == self.get_command:
+            self.pages += 1
+        return result
+
+
+def monitor_resources(driver):
+    '''Starts counting pages opened by the driver, so :func:`resource_usage` can report them
+
+    Args:
+        driver (selenium.webdriver.): Selenium webdriver to monitor.
+    '''
+    if getattr(driver, '_se_resource_monitor', None) is None:
+        driver._se_resource_monitor = _ResourceMonitor()
+        add_command_hook(driver, driver._se_resource_monitor.count_pages)
+
+
+def resource_usage(driver):
+    '''Measures resources used by the driver, the browser and the rest of its processes
+
+    Processes are inspected with ``psutil`` if it is installed and using ``/proc`` otherwise. Remote drivers have no local processes, only ``pages`` and ``age`` are reported for them.
+
+    Args:
+        driver (selenium.webdriver.): Selenium webdriver to measure.
+
+    Returns:
+        ResourceUsage: resources used by the process tree of the driver.
+
+    Example:
+        ::
+
+            from selenium_extensions.monitoring import monitor_resources
+            from selenium_extensions.monitoring import resource_usage
+
+
+            monitor_resources(driver)
+            ...
+            usage = resource_usage(driver)
+            print('{:.0f} MB after {} pages'.format(usage.rss / 2 ** 20, usage.pages))
+    '''
+    monitor_resources(driver)
+    monitor = driver._se_resource_monitor
+    pids = driver_process_ids(driver)
+    rss, cpu_time = 0, 0
+    for pid in pids:
+        process_rss, process_cpu_time = _process_usage(pid)
+        rss += process_rss
+        cpu_time += process_cpu_time
+    now = time.time()
+    since, cpu_before = monitor.measured_at or monitor.started_at, monitor.cpu_time
+    cpu_percent = max(cpu_time - cpu_before, 0) / (now - since) * 100 if now > since else 0
+    monitor.measured_at, monitor.cpu_time = now, cpu_time
+    return ResourceUsage(rss, cpu_time, cpu_percent, len(pids), monitor.pages, now - monitor.started_at)
+
+
+class RecyclePolicy:
+    '''Thresholds after which a browser has to be recycled
+
+    Browsers grow over hours of scraping, so ``SeleniumDriver`` launched with a policy can replace its browser between tasks with :meth:`selenium_extensions.core.SeleniumDriver.recycle_if_needed`. ``ParallelRunner`` workers call it after every item.
+
+    Args:
+        max_rss (int): resident memory of the process tree in bytes.
+        max_pages (int): number of pages opened with ``get``.
+        max_age (float): time in seconds since the browser has been launched.
+
+    Example:
+        ::
+
+            from selenium_extensions.core import SeleniumDriver
+            from selenium_extensions.monitoring import RecyclePolicy
+
+
+            bot = SeleniumDriver(browser='chrome', run_headless=True,
+                                 recycle_policy=RecyclePolicy(max_rss=2 * 2 ** 30, max_pages=500, max_age=3600))
+            for url in urls:
+                bot.driver.get(url)
+                ...
+                bot.recycle_if_needed()
+    '''
+
+    def __init__(self, max_rss=None, max_pages=None, max_age=None):
+        self.max_rss = max_rss
+        self.max_pages = max_pages
+        self.max_age = max_age
+
+    def exceeded(self, usage):
+        '''Returns the threshold ``usage`` has crossed or ``None`` if it is within the limits
+
+        Args:
+            usage (ResourceUsage): resources used by the browser.
+
+        Returns:
+            str: description of the crossed threshold.
+        '''
+        if self.max_rss is not None and usage.rss > self.max_rss:
+            return 'memory {:.0f} MB > {:.0f} MB'.format(usage.rss / 2 ** 20, self.max_rss / 2 ** 20)
+        if self.max_pages is not None and usage.pages >= self.max_pages:
+            return 'pages {} >= {}'.format(usage.pages, self.max_pages)
+        if self.max_age is not None and usage.age >= self.max_age:
+            return 'age {:.0f}s >= {:.0f}s'.format(usage.age, self.max_age)
+        return None
+
+
+class ResourceLimits:
+    '''Hard memory and CPU caps for the processes of a driver
+
+    Passed to :func:`selenium_extensions.drivers.create_driver` (or ``SeleniumDriver``) as ``resource_limits``. Right after the launch the webdriver binary and the browser are moved into their own cgroup and/or get ``rlimits``, processes they start later inherit both. A browser crossing ``memory`` is killed by the kernel instead of taking the whole node down, :class:`selenium_extensions.supervisor.Supervisor` can respawn it.
+
+    Linux only. cgroups require a cgroup v2 directory the current user may write to (e.g. delegated by systemd with ``Delegate=yes`` or inside a container) with the ``memory`` and ``cpu`` controllers available.
+
+    Args:
+        memory (int): cgroup memory limit of the process tree in bytes.
+        cpu (float): cgroup CPU limit of the process tree in cores, e.g. ``1.5``.
+        rlimits (dict): ``{resource.RLIMIT_*: (soft, hard)}`` limits of every process. Chrome reserves a lot of address space, so prefer ``memory`` over ``RLIMIT_AS``.
+        cgroup_root (str): cgroup directory to create the drivers' cgroups in.
+
+    Example:
+        ::
+
+            import resource
+
+            from selenium_extensions.core import SeleniumDriver
+            from selenium_extensions.monitoring import ResourceLimits
+
+
+            limits = ResourceLimits(memory=3 * 2 ** 30, cpu=1, rlimits={resource.RLIMIT_NOFILE: (4096, 4096)})
+            bot = SeleniumDriver(browser='chrome', run_headless=True, resource_limits=limits)
+    '''
+
+    def __init__(self, memory=None, cpu=None, rlimits=None, cgroup_root='/sys/fs/cgroup/selenium_extensions'):
+        self.memory = memory
+        self.cpu = cpu
+        self.rlimits = rlimits or {}
+        self.cgroup_root = cgroup_root
+        self._lock = threading.Lock()
+
+    def apply(self, driver):
+        '''Applies the limits to the processes of a freshly launched driver
+
+        Args:
+            driver (selenium.webdriver.): Selenium webdriver to limit.
+
+        Raises:
+            selenium_extensions.exceptions.SeleniumExtensionsException: the limits can't be applied.
+        '''
+        pids = driver_process_ids(driver)
+        if not pids:
+            raise SeleniumExtensionsException('Resource limits can only be applied to local drivers')
+        driver.resource_limits = self
+        try:
+            if self.memory is not None or self.cpu is not None:
+                driver.cgroup = self._create_cgroup(pids)
+            if self.rlimits:
+                import resource
+
+                for pid in pids:
+                    for limit, value in self.rlimits.items():
+                        resource.prlimit(pid, limit, value)
+        except (OSError, ImportError, AttributeError) as error:
+            raise SeleniumExtensionsException('Failed to apply resource limits: {}'.format(error)) from error
+
+    def _create_cgroup(self, pids):
+        with self._lock:
+            exists = os.path.isdir(self.cgroup_root)
+            parent = self.cgroup_root if exists else os.path.dirname(self.cgroup_root.rstrip('/'))
+            if not os.path.exists(os.path.join(parent, 'cgroup.controllers')):
+                raise SeleniumExtensionsException('{} is not a cgroup v2 directory'.format(parent))
+            if not exists:
+                os.mkdir(self.cgroup_root)
+                self._write(os.path.join(self.cgroup_root, 'cgroup.subtree_control'), '+memory +cpu')
+        cgroup = os.path.join(self.cgroup_root, 'driver-{}'.format(pids[0]))
+        os.mkdir(cgroup)
+        if self.memory is not None:
+            self._write(os.path.join(cgroup, 'memory.max'), str(int(self.memory)))
+        if self.cpu is not None:
+            period = 100000
+            self._write(os.path.join(cgroup, 'cpu.max'), '{} {}'.format(int(self.cpu * period), period))
+        for pid in pids:
+            try:
+                self._write(os.path.join(cgroup, 'cgroup.procs'), str(pid))
+            except ProcessLookupError:
+                pass
+        return cgroup
+
+    @staticmethod
+    def _write(path, value):
+        with open(path, 'w') as control:
+            control.write(value)
+
+    def release(self, driver):
+        '''Removes the cgroup of a stopped driver
+
+        Args:
+            driver (selenium.webdriver.): Selenium webdriver that has been shut down or killed.
+        '''
+        cgroup = getattr(driver, 'cgroup', None)
+        if cgroup is None:
+            return
+        driver.cgroup = None
+        # Browser processes may need a moment to exit after the driver has stopped
+        for _ in range(50):
+            try:
+                os.rmdir(cgroup)
+                return
+            except FileNotFoundError:
+                return
+            except OSError:
+                time.sleep(0.1)
@@ -0,0 +1,235 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium.common.exceptions import WebDriverException
+
+from selenium_extensions.core import reset_state
+from selenium_extensions.core import shut_down
+from selenium_extensions.drivers import create_driver
+from selenium_extensions.exceptions import SeleniumExtensionsException
+from selenium_extensions.hooks import detach_hook_targets
+
+
+class _PoolEntry:
+    '''Bookkeeping for a single pooled driver'''
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.created_at = time.time()
+        self.uses = 0
+
+
+class DriverPool:
+    '''Pool of pre-launched drivers that can be leased instead of launching a new browser every time
+
+    Drivers are launched with :func:`selenium_extensions.drivers.create_driver` when the pool is created. A leased driver is health-checked before it is handed out and its state is reset with :func:`selenium_extensions.core.reset_state` when it comes back. Drivers that reached ``max_uses`` or ``max_age`` are shut down and replaced by a freshly launched driver in the background. A failed launch is retried with exponential backoff, and if it keeps failing the missing driver is launched again when :meth:`checkout` has nothing to hand out.
+
+    Args:
+        size (int): number of drivers the pool keeps.
+        browser ('chrome', 'firefox' or 'fake'): webdriver to use.
+        max_uses (int): number of leases after which a driver is recycled. If set to ``None`` drivers are never recycled because of usage.
+        max_age (float): time in seconds after which a driver is recycled. If set to ``None`` drivers are never recycled because of age.
+        reset (bool): boolean flag that indicates if drivers' state has to be reset when they are returned to the pool.
+        launch_retries (int): number of times a failed launch of a replacement driver is retried.
+        **driver_options: keyword arguments passed to :func:`selenium_extensions.drivers.create_driver`.
+
+    Example:
+        ::
+
+            from selenium_extensions.core import SeleniumDriver
+            from selenium_extensions.pool import DriverPool
+
+
+            pool = DriverPool(size=4, browser='chrome', run_headless=True, max_uses=50)
+            bot = SeleniumDriver(pool=pool)
+            bot.driver.get('https://google.com')
+            bot.shut_down()  # driver goes back to the pool
+            ...
+            pool.close()
+    '''
+
+    def __init__(self, size=2, browser='chrome', max_uses=None, max_age=None, reset=True, launch_retries=3,
+                 **driver_options):
+        self.size = size
+        self.browser = browser
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.reset = reset
+        self.launch_retries = launch_retries
+        self.driver_options = driver_options
+        self._condition = threading.Condition()
+        self._idle = []
+        self._leased = {}
+        self._closed = False
+        # Replacements being launched and drivers whose replacement failed to launch
+        self._launching = 0
+        self._missing = 0
+        self._launch_error = None
+        try:
+            for _ in range(size):
+                self._idle.append(self._launch())
+        except BaseException:
+            # Browsers launched so far would never be quit
+            for entry in self._idle:
+                shut_down(entry.driver)
+            raise
+
+    def _launch(self):
+        return _PoolEntry(create_driver(self.browser, **self.driver_options))
+
+    def _replace(self):
+        entry = error = None
+        for attempt in range(self.launch_retries + 1):
+            if self._closed:
+                break
+            if attempt:
+                time.sleep(min(2 ** (attempt - 1), 30))
+            try:
+                entry = self._launch()
+                break
+            except Exception as launch_error:
+                error = launch_error
+        with self._condition:
+            self._launching -= 1
+            if entry is None:
+                self._missing += 1
+                self._launch_error = error
+            elif not self._closed:
+                self._idle.append(entry)
+                self._launch_error = None
+                entry = None
+            self._condition.notify_all()
+        if entry is not None:
+            shut_down(entry.driver)
+
+    def _start_replacement(self):
+        '''Launches a driver in the background. Must be called with the lock held.'''
+        self._launching += 1
+        threading.Thread(target=self._replace, daemon=True).start()
+
+    def _retire(self, entry):
+        '''Shuts down ``entry`` and launches its replacement in the background. Must be called with the lock held.'''
+        threading.Thread(target=shut_down, args=(entry.driver,), daemon=True).start()
+        if not self._closed:
+            self._start_replacement()
+
+    def _is_expired(self, entry):
+        if self.max_uses is not None and entry.uses >= self.max_uses:
+            return True
+        if self.max_age is not None and time.time() - entry.created_at >= self.max_age:
+            return True
+        return False
+
+    @staticmethod
+    def _is_healthy(driver):
+        try:
+            driver.current_url
+            return True
+        except WebDriverException:
+            return False
+
+    def checkout(self, timeout=None):
+        '''Leases a healthy driver from the pool
+
+        Args:
+            timeout (float): time in seconds to wait for a free driver. If set to ``None`` waits forever.
+
+        Returns:
+            selenium.webdriver.: leased driver.
+
+        Raises:
+            selenium_extensions.exceptions.SeleniumExtensionsException: the pool is closed, no driver became available in ``timeout`` seconds or no driver can be launched while none are leased.
+        '''
+        deadline = None if timeout is None else time.time() + timeout
+        relaunched = False
+        while True:
+            with self._condition:
+                while not self._idle:
+                    if self._closed:
+                        raise SeleniumExtensionsException('Driver pool is closed')
+                    if self._missing and not self._launching:
+                        if relaunched and not self._leased:
+                            raise SeleniumExtensionsException(
+                                'Can\'t launch a driver for the pool: {!r}'.format(self._launch_error))
+                        self._missing -= 1
+                        self._start_replacement()
+                        relaunched = True
+                    remaining = None if deadline is None else deadline - time.time()
+                    if remaining is not None and remaining <= 0:
+                        raise SeleniumExtensionsException(
+                            'Timeout waiting for a free driver in the pool')
+                    self._condition.wait(remaining)
+                if self._closed:
+                    raise SeleniumExtensionsException('Driver pool is closed')
+                entry = self._idle.pop()
+            if self._is_expired(entry) or not self._is_healthy(entry.driver):
+                with self._condition:
+                    self._retire(entry)
+                continue
+            entry.uses += 1
+            with self._condition:
+                self._leased[id(entry.driver)] = entry
+            return entry.driver
+
+    def checkin(self, driver):
+        '''Returns a leased driver to the pool
+
+        Args:
+            driver (selenium.webdriver.): driver previously leased with :meth:`checkout`.
+
+        Raises:
+            selenium_extensions.exceptions.SeleniumExtensionsException: ``driver`` wasn't leased from this pool.
+        '''
+        with self._condition:
+            entry = self._leased.pop(id(driver), None)
+        if entry is None:
+            raise SeleniumExtensionsException(
+                'Driver {} wasn\'t leased from this pool'.format(driver))
+        detach_hook_targets(driver)
+        healthy = True
+        if self.reset and not self._is_expired(entry):
+            try:
+                reset_state(driver)
+            except WebDriverException:
+                healthy = False
+        with self._condition:
+            if self._closed or not healthy or self._is_expired(entry):
+                self._retire(entry)
+            else:
+                self._idle.append(entry)
+            self._condition.notify()
+
+    @contextmanager
+    def lease(self, timeout=None):
+        '''Context manager that leases a driver and returns it to the pool on exit
+
+        Args:
+            timeout (float): time in seconds to wait for a free driver.
+
+        Example:
+            ::
+
+                with pool.lease() as driver:
+                    driver.get('https://google.com')
+        '''
+        driver = self.checkout(timeout)
+        try:
+            yield driver
+        finally:
+            self.checkin(driver)
+
+    def close(self):
+        '''Shuts down idle drivers. Leased drivers are shut down when they are returned.'''
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._condition.notify_all()
+        for entry in idle:
+            shut_down(entry.driver)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,301 @@
+import base64
+import hashlib
+import json
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import zipfile
+from contextlib import contextmanager
+from io import BytesIO
+
+from selenium.webdriver.firefox.firefox_profile import FirefoxProfile
+
+
+QUICKJAVA_EXTENSION = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                                   'browser_extensions', 'firefox', 'quickjava-2.1.2-fx.xpi')
+
+# Directories holding the HTTP cache inside a profile
+_CACHE_DIRECTORIES = {'Cache', 'Code Cache', 'GPUCache', 'cache2'}
+
+# Files Chrome uses to lock the profile of a running browser
+_CHROME_LOCK_FILES = {'SingletonLock', 'SingletonSocket', 'SingletonCookie', 'lockfile'}
+
+
+def _link_or_copy(source, destination):
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+def _clone_tree(source, destination, link_cache=False, in_cache=False):
+    os.makedirs(destination, exist_ok=True)
+    for entry in os.scandir(source):
+        target = os.path.join(destination, entry.name)
+        if entry.name in _CHROME_LOCK_FILES:
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            _clone_tree(entry.path, target, link_cache,
+                        in_cache or entry.name in _CACHE_DIRECTORIES)
+        elif entry.is_file(follow_symlinks=False):
+            if link_cache and in_cache:
+                _link_or_copy(entry.path, target)
+            else:
+                shutil.copy2(entry.path, target)
+
+
+def _make_cache_read_only(directory, in_cache=False):
+    for entry in os.scandir(directory):
+        if entry.is_dir(follow_symlinks=False):
+            _make_cache_read_only(entry.path, in_cache or entry.name in _CACHE_DIRECTORIES)
+        elif in_cache and entry.is_file(follow_symlinks=False):
+            mode = entry.stat().st_mode
+            os.chmod(entry.path, mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+
+
+@contextmanager
+def _file_lock(path):
+    '''Holds an exclusive lock on the ``path`` file, shared by all of the processes. Does nothing without ``fcntl``.'''
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(path, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _encode_profile(directory):
+    # Same format as ``FirefoxProfile.encoded``: base64 of the zipped profile directory
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zipped:
+        for base, _, files in os.walk(directory):
+            for name in files:
+                path = os.path.join(base, name)
+                zipped.write(path, os.path.relpath(path, directory))
+    return base64.b64encode(buffer.getvalue()).decode('UTF-8')
+
+
+class _PrebuiltFirefoxProfile(FirefoxProfile):
+    '''``FirefoxProfile`` that is sent to ``geckodriver`` as an already zipped template'''
+
+    def __init__(self, encoded):
+        super().__init__()
+        self._encoded = encoded
+
+    @property
+    def encoded(self):
+        return self._encoded
+
+
+class ProfileClone:
+    '''Profile of a single driver cloned from a :class:`ProfileTemplate`
+
+    Attributes:
+        browser (str): browser the profile belongs to.
+        profile_dir (str): Chrome user data directory. ``None`` for Firefox, whose profile is sent to ``geckodriver`` as a prebuilt zip.
+        cache_dir (str): Firefox HTTP cache directory. ``None`` for Chrome, which keeps the cache inside ``profile_dir``.
+    '''
+
+    def __init__(self, template, profile_dir=None, cache_dir=None, temporary=True, encoded=None):
+        self.template = template
+        self.browser = template.browser
+        self.profile_dir = profile_dir
+        self.cache_dir = cache_dir
+        self._temporary = temporary
+        self._encoded = encoded
+
+    def firefox_profile(self):
+        '''Returns ``FirefoxProfile`` that doesn't have to be zipped again'''
+        return _PrebuiltFirefoxProfile(self._encoded or self.template.encoded)
+
+    def remove(self):
+        '''Removes the cloned directories. Profiles of the template itself are kept.'''
+        if not self._temporary:
+            return
+        for directory in (self.profile_dir, self.cache_dir):
+            if directory is not None:
+                shutil.rmtree(directory, ignore_errors=True)
+
+
+class ProfileTemplate:
+    '''Browser profile that is built once and cheaply cloned for every driver
+
+    The template is built in ``directory`` the first time it is used: extensions are installed, preferences are written and ``warm_up_urls`` are visited to fill the HTTP cache. The build is reused by later runs as long as the template's arguments don't change. Firefox profiles are zipped once and the zip is cached on disk, so drivers skip zipping the profile and the extension on every launch.
+
+    Pass the template as ``profile`` to :func:`selenium_extensions.drivers.chrome_driver`, :func:`selenium_extensions.drivers.firefox_driver` or :class:`selenium_extensions.core.SeleniumDriver`. Every driver gets its own clone which is removed by :func:`selenium_extensions.core.shut_down`.
+
+    Args:
+        directory (str): directory the template is stored in.
+        browser ('chrome' or 'firefox'): browser the profile is built for.
+        load_images (bool): boolean flag that indicates if the profile has to render images. Firefox profiles get the QuickJava extension if set to ``False``.
+        extensions (iterable): paths to ``.xpi`` extensions to install into Firefox profiles.
+        preferences (dict): Firefox preferences to write into the profile.
+        warm_up_urls (iterable): URLs to visit while building the template to warm the HTTP cache up.
+        share_cache (bool): boolean flag that indicates if clones have to share the template's HTTP cache. The cache files are hard linked into every clone and made read-only, so browsers can read the warm cache but can't change it. Otherwise every clone gets its own copy of the cache.
+        **driver_options: keyword arguments passed to :func:`selenium_extensions.drivers.create_driver` while warming the cache up.
+
+    Example:
+        ::
+
+            from selenium_extensions.core import SeleniumDriver
+            from selenium_extensions.profiles import ProfileTemplate
+
+
+            template = ProfileTemplate('/var/cache/bots/firefox', browser='firefox', load_images=False,
+                                       warm_up_urls=['https://example.com'], share_cache=True, run_headless=True)
+            bot = SeleniumDriver(browser='firefox', run_headless=True, load_images=False, profile=template)
+    '''
+
+    def __init__(self, directory, browser='firefox', load_images=True, extensions=(), preferences=None,
+                 warm_up_urls=(), share_cache=False, **driver_options):
+        self.directory = os.path.abspath(directory)
+        self.browser = browser.lower()
+        self.load_images = load_images
+        self.extensions = list(extensions)
+        if self.browser == 'firefox' and not load_images:
+            self.extensions.append(QUICKJAVA_EXTENSION)
+        self.preferences = dict(preferences or {})
+        self.warm_up_urls = list(warm_up_urls)
+        self.share_cache = share_cache
+        self.driver_options = driver_options
+        self.profile_dir = os.path.join(self.directory, 'profile')
+        # Chrome keeps the HTTP cache inside the profile, Firefox gets a separate cache directory
+        self.cache_dir = os.path.join(self.directory, 'cache')
+        self._lock = threading.Lock()
+        self._encoded = None
+        self._built = False
+
+    def __getstate__(self):
+        # Templates are passed to worker processes in bot options
+        state = dict(self.__dict__)
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def fingerprint(self):
+        '''str: hash of the arguments the template is built from'''
+        description = json.dumps([self.browser, sorted(self.extensions), self.preferences,
+                                  self.warm_up_urls, self.share_cache], sort_keys=True)
+        return hashlib.sha1(description.encode('utf-8')).hexdigest()
+
+    @property
+    def encoded(self):
+        '''str: zipped, base64 encoded Firefox profile, read from disk once'''
+        self.build()
+        if self._encoded is None:
+            with open(os.path.join(self.directory, 'profile.b64')) as encoded_file:
+                self._encoded = encoded_file.read()
+        return self._encoded
+
+    def build(self, force=False):
+        '''Builds the template unless an up-to-date build is already on disk
+
+        Processes sharing the template build it one at a time, holding a lock on the ``<directory>.lock`` file. The template is built in a temporary directory next to ``directory`` and moved into place when it's complete, so a half-built template is never used.
+
+        Args:
+            force (bool): boolean flag that indicates if the template has to be rebuilt anyway.
+        '''
+        with self._lock:
+            if self._built and not force:
+                return
+            parent = os.path.dirname(self.directory)
+            os.makedirs(parent, exist_ok=True)
+            with _file_lock(self.directory + '.lock'):
+                if not force and self._is_up_to_date():
+                    self._built = True
+                    return
+                building = tempfile.mkdtemp(dir=parent, prefix=os.path.basename(self.directory) + '.build-')
+                try:
+                    os.chmod(building, 0o755)
+                    self._build_into(building)
+                    if os.path.exists(self.directory):
+                        retired = building + '.old'
+                        os.replace(self.directory, retired)
+                        os.replace(building, self.directory)
+                        shutil.rmtree(retired, ignore_errors=True)
+                    else:
+                        os.replace(building, self.directory)
+                except BaseException:
+                    shutil.rmtree(building, ignore_errors=True)
+                    raise
+            self._encoded = None
+            self._built = True
+
+    def _is_up_to_date(self):
+        try:
+            with open(os.path.join(self.directory, 'template.json')) as marker_file:
+                return json.load(marker_file).get('fingerprint') == self.fingerprint
+        except (OSError, ValueError):
+            return False
+
+    def _build_into(self, directory):
+        if self.browser == 'firefox':
+            os.makedirs(os.path.join(directory, 'cache'))
+            self._build_firefox_profile(directory)
+        else:
+            os.makedirs(os.path.join(directory, 'profile'))
+        self._warm_up(directory)
+        if self.share_cache:
+            _make_cache_read_only(directory)
+        # Written last, a template without it is incomplete
+        with open(os.path.join(directory, 'template.json'), 'w') as marker_file:
+            json.dump({'fingerprint': self.fingerprint}, marker_file)
+
+    def _build_firefox_profile(self, directory):
+        firefox_profile = FirefoxProfile()
+        for extension in self.extensions:
+            firefox_profile.add_extension(extension)
+        for name, value in self.preferences.items():
+            firefox_profile.set_preference(name, value)
+        firefox_profile.update_preferences()
+        profile_dir = os.path.join(directory, 'profile')
+        shutil.copytree(firefox_profile.path, profile_dir)
+        shutil.rmtree(firefox_profile.path, ignore_errors=True)
+        with open(os.path.join(directory, 'profile.b64'), 'w') as encoded_file:
+            encoded_file.write(_encode_profile(profile_dir))
+
+    def _warm_up(self, directory):
+        if not self.warm_up_urls:
+            return
+        from selenium_extensions.core import shut_down
+        from selenium_extensions.drivers import create_driver
+
+        if self.browser == 'firefox':
+            # The template that is being built can't be asked for its profile yet
+            with open(os.path.join(directory, 'profile.b64')) as encoded_file:
+                encoded = encoded_file.read()
+            clone = ProfileClone(self, cache_dir=os.path.join(directory, 'cache'), temporary=False, encoded=encoded)
+        else:
+            clone = ProfileClone(self, profile_dir=os.path.join(directory, 'profile'), temporary=False)
+        driver = create_driver(self.browser, profile=clone, **self.driver_options)
+        try:
+            for url in self.warm_up_urls:
+                driver.get(url)
+        finally:
+            shut_down(driver)
+
+    def clone(self):
+        '''Clones the template for a single driver, building it first if needed
+
+        Returns:
+            selenium_extensions.profiles.ProfileClone: cloned profile.
+        '''
+        self.build()
+        if self.browser == 'firefox':
+            cache_dir = tempfile.mkdtemp(prefix='selenium_extensions_cache_')
+            _clone_tree(self.cache_dir, cache_dir, link_cache=self.share_cache)
+            return ProfileClone(self, cache_dir=cache_dir)
+        profile_dir = tempfile.mkdtemp(prefix='selenium_extensions_profile_')
+        _clone_tree(self.profile_dir, profile_dir, link_cache=self.share_cache)
+        return ProfileClone(self, profile_dir=profile_dir)
@@ -0,0 +1,234 @@
+import multiprocessing
+import os
+import queue
+import time
+import traceback
+from collections import deque
+from collections import namedtuple
+
+from selenium_extensions.exceptions import SeleniumExtensionsException
+
+
+#: Yielded by the task iterator of :meth:`ParallelRunner._run` when no item is available yet, but more may come
+IDLE = object()
+
+RunResult = namedtuple('RunResult', ['item', 'result', 'error', 'worker', 'elapsed'])
+RunResult.__doc__ = '''Result of processing a single work item
+
+Attributes:
+    item: processed work item.
+    result: value returned by the bot's method. ``None`` if processing failed.
+    error (str): formatted traceback if processing failed, ``None`` otherwise.
+    worker (int): index of the worker that processed the item.
+    elapsed (float): time in seconds spent processing the item.
+'''
+
+
+def _worker(bot_class, bot_options, method, worker_id, generation, inbox, outbox):
+    try:
+        bot = bot_class(**bot_options)
+    except Exception:
+        outbox.put(('failed', worker_id, generation, None, traceback.format_exc(), 0))
+        return
+    try:
+        outbox.put(('ready', worker_id, generation, None, None, 0))
+        while True:
+            task = inbox.get()
+            if task is None:
+                break
+            index, item = task
+            start = time.time()
+            try:
+                result = getattr(bot, method)(item)
+                outbox.put(('done', worker_id, generation, index, (result, None), time.time() - start))
+            except Exception:
+                outbox.put(('done', worker_id, generation, index, (None, traceback.format_exc()),
+                            time.time() - start))
+            bot.recycle_if_needed()
+    finally:
+        bot.shut_down()
+
+
+class _WorkerSlot:
+    '''Worker process together with its inbox and statistics'''
+
+    def __init__(self):
+        self.process = None
+        self.generation = 0
+        self.inbox = None
+        self.task = None
+        self.ready = False
+        self.items = 0
+        self.failures = 0
+        self.restarts = 0
+
+
+class ParallelRunner:
+    '''Fans a ``SeleniumDriver`` subclass out across worker processes
+
+    Every worker process creates its own instance of ``bot_class`` with ``bot_options`` and calls its ``method`` for each work item it receives. Results are streamed back as soon as they are ready. If a worker process dies its item is retried on a restarted worker up to ``max_retries`` times. Workers call ``recycle_if_needed`` after every item, so a ``recycle_policy`` in ``bot_options`` replaces grown browsers between items.
+
+    Args:
+        bot_class (type): ``selenium_extensions.core.SeleniumDriver`` subclass to run. Has to be importable by worker processes.
+        processes (int): number of worker processes. If set to ``None`` the number of CPUs is used.
+        method (str): name of the ``bot_class`` method that processes a single item.
+        max_retries (int): number of times an item is retried after its worker crashed.
+        **bot_options: keyword arguments passed to ``bot_class``, e.g. ``browser``, ``run_headless``, ``load_images``.
+
+    Example:
+        ::
+
+            from selenium_extensions.core import SeleniumDriver
+            from selenium_extensions.runner import ParallelRunner
+
+
+            class TitleBot(SeleniumDriver):
+
+                def process_item(self, url):
+                    self.driver.get(url)
+                    return self.driver.title
+
+
+            runner = ParallelRunner(TitleBot, processes=8, browser='chrome', run_headless=True)
+            for result in runner.run(urls):
+                print(result.item, result.result or result.error)
+            print(runner.stats)
+    '''
+
+    def __init__(self, bot_class, processes=None, method='process_item', max_retries=2, **bot_options):
+        self.bot_class = bot_class
+        self.processes = processes or os.cpu_count() or 1
+        self.method = method
+        self.max_retries = max_retries
+        self.bot_options = bot_options
+        self._context = multiprocessing.get_context()
+        self._slots = []
+        self._started_at = None
+
+    @property
+    def stats(self):
+        '''dict: per worker statistics - processed ``items``, ``failures``, ``restarts`` and throughput in ``items_per_second``'''
+        wall_time = time.time() - self._started_at if self._started_at else 0
+        return {
+            worker_id: {
+                'items': slot.items,
+                'failures': slot.failures,
+                'restarts': slot.restarts,
+                'items_per_second': slot.items / wall_time if wall_time else 0.0,
+            }
+            for worker_id, slot in enumerate(self._slots)
+        }
+
+    def _start_worker(self, worker_id, outbox):
+        slot = self._slots[worker_id]
+        slot.inbox = self._context.Queue()
+        slot.ready = False
+        slot.generation += 1
+        slot.process = self._context.Process(
+            target=_worker,
+            args=(self.bot_class, self.bot_options, self.method,
+                  worker_id, slot.generation, slot.inbox, outbox),
+            daemon=True)
+        slot.process.start()
+
+    def _stop_workers(self):
+        for slot in self._slots:
+            if slot.process is not None and slot.process.is_alive():
+                slot.inbox.put(None)
+        for slot in self._slots:
+            if slot.process is not None:
+                slot.process.join(10)
+                if slot.process.is_alive():
+                    slot.process.terminate()
+
+    def run(self, items):
+        '''Processes ``items`` and yields :class:`RunResult` in the order of completion
+
+        Args:
+            items (iterable): work items. Items are consumed lazily and have to be picklable.
+
+        Yields:
+            selenium_extensions.runner.RunResult: result of processing a single item.
+
+        Raises:
+            selenium_extensions.exceptions.SeleniumExtensionsException: worker failed to create ``bot_class`` instance.
+        '''
+        for _, result in self._run(enumerate(iter(items))):
+            yield result
+
+    def _run(self, tasks):
+        '''Processes ``(key, item)`` pairs of ``tasks`` and yields ``(key, RunResult)``
+
+        A task is only taken from ``tasks`` when a worker is free. ``tasks`` may yield :data:`IDLE` instead of a pair, it's asked again after the next result or half a second.
+        '''
+        pending = deque()
+        outbox = self._context.Queue()
+        self._slots = [_WorkerSlot() for _ in range(self.processes)]
+        self._started_at = time.time()
+        exhausted = False
+        try:
+            for worker_id in range(self.processes):
+                self._start_worker(worker_id, outbox)
+            while True:
+                for slot in self._slots:
+                    if not slot.ready or slot.task is not None:
+                        continue
+                    if not pending and not exhausted:
+                        try:
+                            task = next(tasks)
+                        except StopIteration:
+                            exhausted = True
+                        else:
+                            if task is not IDLE:
+                                pending.append(tuple(task) + (0,))
+                    if not pending:
+                        break
+                    slot.task = pending.popleft()
+                    slot.inbox.put(slot.task[:2])
+                if exhausted and not pending and all(slot.task is None for slot in self._slots):
+                    return
+                try:
+                    message = outbox.get(timeout=0.5)
+                except queue.Empty:
+                    message = None
+                # Checked after every message as well, the outbox of a busy runner is never empty
+                for result in self._recover_crashed_workers(pending, outbox):
+                    yield result
+                if message is None:
+                    continue
+                kind, worker_id, generation, index, payload, elapsed = message
+                slot = self._slots[worker_id]
+                if generation != slot.generation:
+                    # Sent by a worker that has crashed since, its task has been recovered already
+                    continue
+                if kind == 'failed':
+                    raise SeleniumExtensionsException(
+                        'Worker {} failed to start:\n{}'.format(worker_id, payload))
+                if kind == 'ready':
+                    slot.ready = True
+                    continue
+                index, item = slot.task[:2]
+                slot.task = None
+                slot.items += 1
+                result, error = payload
+                if error is not None:
+                    slot.failures += 1
+                yield index, RunResult(item, result, error, worker_id, elapsed)
+        finally:
+            self._stop_workers()
+
+    def _recover_crashed_workers(self, pending, outbox):
+        for worker_id, slot in enumerate(self._slots):
+            if slot.process.is_alive():
+                continue
+            if slot.task is not None:
+                index, item, attempts = slot.task
+                slot.task = None
+                if attempts < self.max_retries:
+                    pending.appendleft((index, item, attempts + 1))
+                else:
+                    slot.failures += 1
+                    yield index, RunResult(item, None, 'Worker {} crashed {} times while processing the item'.format(
+                        worker_id, attempts + 1), worker_id, 0)
+            slot.restarts += 1
+            self._start_worker(worker_id, outbox)
@@ -0,0 +1,397 @@
+'''JavaScript snippets ``selenium_extensions`` runs inside the page
+
+Snippets that locate elements start with :data:`FIND_ELEMENTS`, which defines ``seFind(by, value, root)`` - a function that resolves a Selenium locator (``By`` strategy and value) to an array of elements using the same strategies as WebDriver.
+'''
+
+FIND_ELEMENTS = '''
+var seFind = function (by, value, root) {
+    root = root || document;
+    var doc = root.ownerDocument || root;
+    var quote = function (text) { return '"' + String(text).replace(/(["\\\\])/g, '\\\\$1') + '"'; };
+    var toArray = function (list) { return Array.prototype.slice.call(list); };
+    var links = function (matches) {
+        return toArray(root.querySelectorAll('a')).filter(function (a) {
+            return matches((a.innerText || a.textContent || '').trim());
+        });
+    };
+    switch (by) {
+        case 'id': return toArray(root.querySelectorAll('[id=' + quote(value) + ']'));
+        case 'name': return toArray(root.querySelectorAll('[name=' + quote(value) + ']'));
+        case 'class name': return toArray(root.getElementsByClassName(value));
+        case 'tag name': return toArray(root.getElementsByTagName(value));
+        case 'css selector': return toArray(root.querySelectorAll(value));
+        case 'link text': return links(function (text) { return text === value; });
+        case 'partial link text': return links(function (text) { return text.indexOf(value) !== -1; });
+        case 'xpath':
+            var snapshot = doc.evaluate(value, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            var found = [];
+            for (var i = 0; i < snapshot.snapshotLength; i++) {
+                found.push(snapshot.snapshotItem(i));
+            }
+            return found;
+    }
+    throw new Error('Unsupported locator strategy: ' + by);
+};
+'''
+
+# Defines seExtract(element, fields) - fields are [name, css selector or null, attribute]
+EXTRACT_FIELDS = '''
+var seExtract = function (element, fields) {
+    var record = {};
+    for (var i = 0; i < fields.length; i++) {
+        var name = fields[i][0], selector = fields[i][1], attribute = fields[i][2];
+        var target = selector ? element.querySelector(selector) : element;
+        var value = null;
+        if (target && attribute === 'text') {
+            value = (target.textContent || '').replace(/\\s+/g, ' ').trim();
+        } else if (target && attribute === 'html') {
+            value = target.innerHTML;
+        } else if (target) {
+            // Same order as WebElement.get_attribute: the property first, then the attribute
+            var property = target[attribute];
+            value = property !== undefined && property !== null && typeof property !== 'object' && typeof property !== 'function'
+                ? property : target.getAttribute(attribute);
+        }
+        record[name] = value;
+    }
+    return record;
+};
+'''
+
+# (element) -> null
+SCROLL_ELEMENT = 'arguments[0].scrollTop = arguments[0].scrollHeight;'
+
+SCROLL_PAGE = 'document.body.scrollTop = document.body.scrollHeight;'
+
+CLEAR_STORAGE = 'try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}'
+
+# () -> [url, origin, localStorage items, sessionStorage items], storage of opaque origins is null
+SNAPSHOT_STORAGE = '''
+var dump = function (name) {
+    try {
+        var storage = window[name], items = {};
+        for (var i = 0; i < storage.length; i++) {
+            var key = storage.key(i);
+            items[key] = storage.getItem(key);
+        }
+        return items;
+    } catch (e) {
+        return null;
+    }
+};
+return [location.href, location.origin, dump('localStorage'), dump('sessionStorage')];
+'''
+
+# (cookies, localStorage items, sessionStorage items) -> names of the cookies document.cookie couldn't set
+RESTORE_STORAGE = '''
+var cookies = arguments[0];
+var fill = function (name, items) {
+    try {
+        for (var key in items) {
+            window[name].setItem(key, items[key]);
+        }
+    } catch (e) {}
+};
+fill('localStorage', arguments[1]);
+fill('sessionStorage', arguments[2]);
+var failed = [];
+cookies.forEach(function (cookie) {
+    var text = cookie.name + '=' + cookie.value + '; path=' + (cookie.path || '/');
+    if (cookie.domain && cookie.domain.charAt(0) === '.') {
+        text += '; domain=' + cookie.domain;
+    }
+    if (cookie.expiry) {
+        text += '; expires=' + new Date(cookie.expiry * 1000).toUTCString();
+    }
+    if (cookie.secure) {
+        text += '; secure';
+    }
+    if (cookie.sameSite) {
+        text += '; samesite=' + cookie.sameSite;
+    }
+    document.cookie = text;
+    // Cookies of another path aren't visible here, WebDriver sets them instead
+    if (document.cookie.split('; ').indexOf(cookie.name + '=' + cookie.value) === -1) {
+        failed.push(cookie.name);
+    }
+});
+return failed;
+'''
+
+# Marks the current document, so NAVIGATE can tell it apart from the one being loaded
+MARK_NAVIGATION = 'window.__seNavigating = true;'
+
+# () -> readyState of the document, null while the document marked by MARK_NAVIGATION is still there
+READY_STATE = 'return window.__seNavigating ? null : document.readyState;'
+
+OPEN_TAB = 'window.open("about:blank");'
+
+USER_AGENT = 'return navigator.userAgent;'
+
+# () -> [[initiator type, transfer size], ...] of the resources loaded by the page
+RESOURCE_ENTRIES = '''
+return performance.getEntriesByType("resource").map(function (entry) {
+    return [entry.initiatorType, entry.transferSize || 0];
+});
+'''
+
+# Firefox chrome context: ({name: value}) -> null, sets the preferences of the running browser
+SET_PREFERENCES = '''
+var prefs = Components.classes["@mozilla.org/preferences-service;1"].getService(Components.interfaces.nsIPrefBranch);
+var values = arguments[0];
+Object.keys(values).forEach(function (name) {
+    var value = values[name];
+    if (typeof value === "boolean") {
+        prefs.setBoolPref(name, value);
+    } else if (typeof value === "number") {
+        prefs.setIntPref(name, value);
+    } else {
+        prefs.setCharPref(name, value);
+    }
+});
+'''
+
+IS_CLICKABLE = '''
+var seIsClickable = function (element) {
+    if (element.disabled) {
+        return false;
+    }
+    var style = window.getComputedStyle(element);
+    return style.visibility !== 'hidden' && style.display !== 'none' && element.getClientRects().length > 0;
+};
+'''
+
+WAIT_FOR = '''
+var seWaitFor = function (check, timeout, done) {
+    var result = check();
+    if (result !== null) {
+        return done(result);
+    }
+    var finished = false, observer, interval, timer;
+    var finish = function (result) {
+        if (finished) {
+            return;
+        }
+        finished = true;
+        observer.disconnect();
+        document.removeEventListener('readystatechange', recheck);
+        clearInterval(interval);
+        clearTimeout(timer);
+        done(result);
+    };
+    var recheck = function () {
+        var result = check();
+        if (result !== null) {
+            finish(result);
+        }
+    };
+    observer = new MutationObserver(recheck);
+    observer.observe(document.documentElement || document, {
+        childList: true, subtree: true, attributes: true, characterData: true
+    });
+    document.addEventListener('readystatechange', recheck);
+    // Stylesheet loads and layout changes make elements visible without mutating the DOM
+    interval = setInterval(recheck, 250);
+    timer = setTimeout(function () { finish(null); }, timeout);
+};
+'''
+
+# Async script: (by, value, clickable, timeout_ms) -> first matching element or null on timeout
+WAIT_FOR_ELEMENT = FIND_ELEMENTS + IS_CLICKABLE + WAIT_FOR + '''
+var by = arguments[0], value = arguments[1], clickable = arguments[2], timeout = arguments[3];
+seWaitFor(function () {
+    var found = seFind(by, value);
+    for (var i = 0; i < found.length; i++) {
+        if (!clickable || seIsClickable(found[i])) {
+            return found[i];
+        }
+    }
+    return null;
+}, timeout, arguments[arguments.length - 1]);
+'''
+
+# (locators) -> [count, ...], locators are [by, value]
+COUNT_ELEMENTS = FIND_ELEMENTS + '''
+var locators = arguments[0];
+return locators.map(function (locator) { return seFind(locator[0], locator[1]).length; });
+'''
+
+# Async script: (locators, timeout_ms) -> index of the first present locator or null on timeout
+WAIT_FOR_ANY_ELEMENT = FIND_ELEMENTS + WAIT_FOR + '''
+var locators = arguments[0], timeout = arguments[1];
+seWaitFor(function () {
+    for (var i = 0; i < locators.length; i++) {
+        if (seFind(locators[i][0], locators[i][1]).length) {
+            return i;
+        }
+    }
+    return null;
+}, timeout, arguments[arguments.length - 1]);
+'''
+
+# (operations, stop_on_error) -> [[ok, error], ...], operations are [by, value, action, argument]
+RUN_OPERATIONS = FIND_ELEMENTS + '''
+var operations = arguments[0], stopOnError = arguments[1];
+var setValue = function (element, value) {
+    var prototype = Object.getPrototypeOf(element);
+    var descriptor = Object.getOwnPropertyDescriptor(prototype, 'value');
+    // Use the native setter so frameworks that track the value (e.g. React) notice the change
+    if (descriptor && descriptor.set) {
+        descriptor.set.call(element, value);
+    } else {
+        element.value = value;
+    }
+    element.dispatchEvent(new Event('input', {bubbles: true}));
+    element.dispatchEvent(new Event('change', {bubbles: true}));
+};
+var actions = {
+    click: function (element) { element.click(); },
+    fill: function (element, value) { element.focus(); setValue(element, value); },
+    clear: function (element) { setValue(element, ''); },
+    select: function (element, value) { setValue(element, value); },
+    check: function (element, value) {
+        if (element.checked !== Boolean(value)) {
+            element.click();
+        }
+    }
+};
+var results = [];
+for (var i = 0; i < operations.length; i++) {
+    var by = operations[i][0], value = operations[i][1], action = operations[i][2];
+    try {
+        if (!actions.hasOwnProperty(action)) {
+            throw new Error('Unsupported action: ' + action);
+        }
+        var element = seFind(by, value)[0];
+        if (!element) {
+            throw new Error('Unable to locate element: ' + value);
+        }
+        actions[action](element, operations[i][3]);
+        results.push([true, null]);
+    } catch (e) {
+        results.push([false, e.message]);
+        if (stopOnError) {
+            break;
+        }
+    }
+}
+return results;
+'''
+
+# (elements) -> [attached, ...]
+ELEMENTS_ARE_ATTACHED = '''
+return arguments[0].map(function (element) { return document.documentElement.contains(element); });
+'''
+
+# (entries, token, mutations) -> [token, mutations, [valid, ...] or null if nothing could have changed]
+# entries are [by, value, element], an entry is valid if its locator still resolves to its element
+SYNC_ELEMENT_CACHE = FIND_ELEMENTS + '''
+var entries = arguments[0], token = arguments[1], mutations = arguments[2];
+var state = window.__seElementCache;
+if (!state) {
+    state = window.__seElementCache = {token: Math.random().toString(36).slice(2), mutations: 0};
+    new MutationObserver(function () { state.mutations++; }).observe(
+        document.documentElement || document, {childList: true, subtree: true});
+}
+if (state.token === token && state.mutations === mutations) {
+    return [state.token, state.mutations, null];
+}
+var valid = entries.map(function (entry) {
+    return state.token === token && seFind(entry[0], entry[1])[0] === entry[2];
+});
+return [state.token, state.mutations, valid];
+'''
+
+# Async script: (by, value, fields or null, idle_ms, limit, scroll element or null) -> [item, ...]
+# Returns items not harvested before, scrolling down and waiting up to idle_ms for new ones if there are none
+HARVEST_SCROLL = FIND_ELEMENTS + EXTRACT_FIELDS + WAIT_FOR + '''
+var by = arguments[0], value = arguments[1], fields = arguments[2], idle = arguments[3], limit = arguments[4];
+var container = arguments[5], done = arguments[arguments.length - 1];
+var collect = function () {
+    var found = seFind(by, value), items = [];
+    for (var i = 0; i < found.length && items.length < limit; i++) {
+        if (found[i].hasAttribute('data-se-harvested')) {
+            continue;
+        }
+        found[i].setAttribute('data-se-harvested', '');
+        items.push(fields ? seExtract(found[i], fields) : found[i]);
+    }
+    return items;
+};
+var items = collect();
+if (items.length) {
+    return done(items);
+}
+if (container) {
+    container.scrollTop = container.scrollHeight;
+} else {
+    window.scrollTo(0, (document.scrollingElement || document.documentElement).scrollHeight);
+}
+seWaitFor(function () {
+    var items = collect();
+    return items.length ? items : null;
+}, idle, function (items) { done(items || []); });
+'''
+
+# (by, value, fields, root or null, offset, limit, token or null) -> [token, total, [record, ...]] or null if the token is unknown
+# Rows are located on the first call and kept in the page under a token, so later chunks don't have to locate them again
+EXTRACT_ROWS = FIND_ELEMENTS + EXTRACT_FIELDS + '''
+var by = arguments[0], value = arguments[1], fields = arguments[2], root = arguments[3];
+var offset = arguments[4], limit = arguments[5], token = arguments[6];
+var extractions = window.__seExtractions = window.__seExtractions || {};
+var rows;
+if (token === null) {
+    rows = seFind(by, value, root);
+    token = Math.random().toString(36).slice(2);
+    extractions[token] = rows;
+} else if (!(rows = extractions[token])) {
+    return null;
+}
+var end = limit === null ? rows.length : Math.min(offset + limit, rows.length), records = [];
+for (var i = offset; i < end; i++) {
+    records.push(seExtract(rows[i], fields));
+}
+if (end >= rows.length) {
+    delete extractions[token];
+}
+return [token, rows.length, records];
+'''
+
+# Async script: (by or null, value, ready_state or null, timeout_ms, stop) -> [reached, element or null, url, timing]
+# or null if it runs in the document the navigation started from, which is marked with window.__seNavigating
+# timing is {ttfb, dom_content_loaded, load} in milliseconds since the navigation start, null if not reached yet
+NAVIGATE = FIND_ELEMENTS + WAIT_FOR + '''
+var by = arguments[0], value = arguments[1], readyState = arguments[2], timeout = arguments[3];
+var stop = arguments[4], done = arguments[arguments.length - 1];
+if (window.__seNavigating) {
+    return done(null);
+}
+var states = ['loading', 'interactive', 'complete'];
+var timing = function () {
+    var entry = performance.getEntriesByType ? performance.getEntriesByType('navigation')[0] : null;
+    if (entry) {
+        return {ttfb: entry.responseStart || null, dom_content_loaded: entry.domContentLoadedEventEnd || null,
+                load: entry.loadEventEnd || null};
+    }
+    var legacy = performance.timing, since = function (time) { return time ? time - legacy.navigationStart : null; };
+    return {ttfb: since(legacy.responseStart), dom_content_loaded: since(legacy.domContentLoadedEventEnd),
+            load: since(legacy.loadEventEnd)};
+};
+seWaitFor(function () {
+    if (by !== null) {
+        var found = seFind(by, value);
+        if (found.length) {
+            return [found[0]];
+        }
+    }
+    if (readyState !== null && states.indexOf(document.readyState) >= states.indexOf(readyState)) {
+        return [null];
+    }
+    return null;
+}, timeout, function (result) {
+    if (stop && document.readyState !== 'complete') {
+        window.stop();
+    }
+    done([result !== null, result && result[0], window.location.href, timing()]);
+});
+'''
@@ -0,0 +1,71 @@
+import time
+from collections import OrderedDict
+
+from selenium_extensions.extraction import field_specs
+from selenium_extensions.helpers import ensure_script_timeout
+from selenium_extensions.scripts import HARVEST_SCROLL
+
+
+def harvest(driver, item_locator, fields=None, key=None, idle_timeout=3, max_items=None,
+            max_time=None, dedup_size=10000, scroll_element=None, batch_size=200):
+    '''Scrolls an infinite feed and yields only the items that weren't yielded before
+
+    Every step is a single async script call: it marks and returns items that haven't been harvested yet or, if there are none, scrolls down and waits inside the page with a ``MutationObserver`` until new items appear. Harvesting stops when no new items appear for ``idle_timeout`` seconds or when the item or time budget runs out. Items are marked in the page, so every element is returned only once however long the feed gets. Feeds that recycle their nodes can be deduplicated by ``key`` - the last ``dedup_size`` keys are remembered.
+
+    Args:
+        driver (selenium.webdriver.): Selenium webdriver to use.
+        item_locator ((selenium.webdriver.common.by.By., str)): locator of a single feed item described using `By`.
+        fields (dict): fields to extract from every item inside the page - ``{name: css_selector}`` for the text of a descendant or ``{name: (css_selector, attribute)}`` for its attribute. ``None`` as a selector means the item itself, ``'text'`` and ``'html'`` are special attributes. If not provided, WebElements are yielded.
+        key (str): name of the field that identifies a record, used for deduplication. Only used with ``fields``.
+        idle_timeout (float): time in seconds to wait for new items after scrolling before the feed is considered exhausted.
+        max_items (int): maximum number of items to yield.
+        max_time (float): maximum time in seconds to spend harvesting.
+        dedup_size (int): number of recent keys remembered for deduplication.
+        scroll_element (selenium.webdriver.remote.webelement.WebElement): element to scroll instead of the page.
+        batch_size (int): maximum number of items returned by a single script call.
+
+    Yields:
+        dict or selenium.webdriver.remote.webelement.WebElement: new feed items.
+
+    Example:
+        ::
+
+            from selenium.webdriver.common.by import By
+            from selenium_extensions.scrolling import harvest
+
+
+            driver.get('https://example.com/feed')
+            for post in harvest(driver, (By.CSS_SELECTOR, 'article.post'),
+                                fields={'id': (None, 'data-id'), 'title': 'h2', 'url': ('a', 'href')},
+                                key='id', max_items=1000):
+                save(post)
+    '''
+    deadline = time.time() + max_time if max_time is not None else None
+    specs = field_specs(fields)
+    seen = OrderedDict()
+    yielded = 0
+    ensure_script_timeout(driver, idle_timeout + 5)
+    while True:
+        idle = idle_timeout
+        if deadline is not None:
+            idle = min(idle, deadline - time.time())
+            if idle <= 0:
+                return
+        limit = batch_size if max_items is None else min(batch_size, max_items - yielded)
+        items = driver.execute_async_script(
+            HARVEST_SCROLL, item_locator[0], item_locator[1], specs,
+            int(idle * 1000), limit, scroll_element)
+        if not items:
+            return
+        for item in items:
+            if key is not None and specs is not None:
+                if item[key] in seen:
+                    seen.move_to_end(item[key])
+                    continue
+                seen[item[key]] = None
+                if len(seen) > dedup_size:
+                    seen.popitem(last=False)
+            yield item
+            yielded += 1
+            if max_items is not None and yielded >= max_items:
+                return
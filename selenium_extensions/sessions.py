@@ -0,0 +1,243 @@
+import json
+import os
+import time
+from urllib.parse import quote
+from urllib.parse import urlsplit
+
+from selenium_extensions.exceptions import SeleniumExtensionsException
+from selenium_extensions.instrumentation import instrumented
+from selenium_extensions.scripts import RESTORE_STORAGE
+from selenium_extensions.scripts import SNAPSHOT_STORAGE
+
+
+# Page of an origin the driver lands on to restore the origin's state. Any same-origin document works, even a 404
+LANDING_PATH = '/robots.txt'
+
+# Cookie fields ``driver.add_cookie`` accepts on every backend
+COOKIE_FIELDS = ('name', 'value', 'path', 'domain', 'secure', 'httpOnly', 'expiry')
+
+
+def _origin(url):
+    parts = urlsplit(url)
+    return '{}://{}'.format(parts.scheme, parts.netloc.rpartition('@')[2])
+
+
+@instrumented()
+def snapshot_session(driver):
+    '''Captures cookies, ``localStorage`` and ``sessionStorage`` of the current page's origin in two WebDriver calls
+
+    Args:
+        driver (selenium.webdriver.): Selenium webdriver to take the snapshot of.
+
+    Returns:
+        dict: JSON-serializable session, ``{'url': current URL, 'origins': {origin: {'cookies': [...], 'localStorage': {...}, 'sessionStorage': {...}}}}``.
+
+    Raises:
+        selenium_extensions.exceptions.SeleniumExtensionsException: the current page has no origin, e.g. ``about:blank`` or a ``data:`` URL.
+
+    Note:
+        WebDriver only exposes cookies sent to the current page, so cookies of other paths and subdomains aren't captured.
+    '''
+    url, origin, local_storage, session_storage = driver.execute_script(SNAPSHOT_STORAGE)
+    if origin in (None, 'null'):
+        raise SeleniumExtensionsException('{} has no origin to take the session of'.format(url))
+    return {'url': url, 'origins': {origin: {
+        'cookies': driver.get_cookies(),
+        'localStorage': local_storage or {},
+        'sessionStorage': session_storage or {},
+    }}}
+
+
+@instrumented()
+def restore_session(driver, session, landing_path=LANDING_PATH, navigate=True):
+    '''Rehydrates the driver with a session taken by :func:`snapshot_session`
+
+    For every origin of the session the driver lands on ``landing_path`` of the origin unless it's on the origin already, then the storage and the cookies are set in a single script call. Only ``HttpOnly`` cookies and cookies of other paths go through ``driver.add_cookie`` one by one. Expired cookies are skipped.
+
+    Args:
+        driver (selenium.webdriver.): Selenium webdriver to restore the session in.
+        session (dict): session returned by :func:`snapshot_session` or :meth:`SessionStore.load`.
+        landing_path (str): path of a cheap page of every origin to set its state on. The page is loaded, so pick one without side effects.
+        navigate (bool): boolean flag that indicates if the driver has to open the URL the session was taken on afterwards.
+    '''
+    now = time.time()
+    current = _origin(driver.current_url)
+    for origin, state in session['origins'].items():
+        cookies = [cookie for cookie in state['cookies'] if cookie.get('expiry') is None or cookie['expiry'] > now]
+        if origin != current:
+            driver.get(origin + landing_path)
+            current = origin
+        failed = set(driver.execute_script(
+            RESTORE_STORAGE, [cookie for cookie in cookies if not cookie.get('httpOnly')],
+            state['localStorage'], state['sessionStorage']))
+        for cookie in cookies:
+            if cookie.get('httpOnly') or cookie['name'] in failed:
+                cookie = {field: cookie[field] for field in COOKIE_FIELDS if field in cookie}
+                if 'expiry' in cookie:
+                    cookie['expiry'] = int(cookie['expiry'])
+                driver.add_cookie(cookie)
+    if navigate and session.get('url'):
+        driver.get(session['url'])
+
+
+class SessionStore:
+    '''On-disk store of browser sessions, so new drivers start logged in instead of repeating the login
+
+    Log in once, :meth:`save` the session, and every driver launched afterwards - including pooled, recycled and respawned ones - can :meth:`restore` it in a few WebDriver calls instead of replaying the login and warm-up navigation. A session holds cookies, ``localStorage`` and ``sessionStorage`` of every origin it was saved on, and the URL it was last saved on.
+
+    Every session is kept in its own compact JSON file in ``directory``, readable by the owner only. Files are replaced atomically, so processes can share the store.
+
+    Args:
+        directory (str): directory to keep the sessions in, created if it doesn't exist.
+        ttl (float): time in seconds after the last :meth:`save` after which a session expires. If set to ``None`` sessions expire only when they fail validation.
+        validate (function): called as ``validate(driver)`` after a session has been restored, returns ``False`` if the session isn't valid anymore, e.g. because the site shows the login form. Invalid sessions are deleted.
+        landing_path (str): path of a cheap page of every origin to restore its state on, see :func:`restore_session`.
+
+    Attributes:
+        stats (dict): number of restored, missing, expired and invalid sessions and of saves.
+
+    Example:
+        ::
+
+            from selenium.webdriver.common.by import By
+            from selenium_extensions.core import SeleniumDriver
+            from selenium_extensions.sessions import SessionStore
+
+
+            store = SessionStore('sessions', ttl=6 * 3600,
+                                 validate=lambda driver: not driver.find_elements(By.ID, 'login-form'))
+            bot = SeleniumDriver(browser='chrome', session_store=store, session_key='alice')
+            if not bot.session_restored:
+                bot.driver.get('https://example.com/login')
+                ...
+                bot.save_session()
+    '''
+
+    def __init__(self, directory, ttl=3600, validate=None, landing_path=LANDING_PATH):
+        self.directory = directory
+        self.ttl = ttl
+        self.validate = validate
+        self.landing_path = landing_path
+        self.stats = {'restored': 0, 'missing': 0, 'expired': 0, 'invalid': 0, 'saved': 0}
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, quote(key, safe='') + '.json')
+
+    def _read(self, key):
+        try:
+            with open(self._path(key)) as session_file:
+                return json.load(session_file)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            # Not written by the store, treated as missing and overwritten by the next save
+            return None
+
+    def _expired(self, session):
+        return session.get('expires_at') is not None and session['expires_at'] <= time.time()
+
+    def load(self, key):
+        '''Returns the session saved under ``key`` or ``None`` if there is none or it has expired
+
+        Args:
+            key (str): name of the session, e.g. the account it is logged in to.
+
+        Returns:
+            dict: session in the format of :func:`snapshot_session` with ``saved_at`` and ``expires_at`` timestamps.
+        '''
+        session = self._read(key)
+        if session is None or self._expired(session):
+            return None
+        return session
+
+    def save(self, driver, key):
+        '''Takes the session of the current page's origin and saves it under ``key``
+
+        Origins saved under ``key`` before are kept, so call it on every site the bot has logged in to. Saving restarts the ``ttl``.
+
+        Args:
+            driver (selenium.webdriver.): Selenium webdriver to take the session of.
+            key (str): name of the session.
+
+        Returns:
+            dict: saved session.
+
+        Raises:
+            selenium_extensions.exceptions.SeleniumExtensionsException: the current page has no origin.
+        '''
+        import tempfile
+
+        snapshot = snapshot_session(driver)
+        session = self.load(key) or {'origins': {}}
+        session['origins'].update(snapshot['origins'])
+        session['url'] = snapshot['url']
+        session['saved_at'] = time.time()
+        session['expires_at'] = None if self.ttl is None else session['saved_at'] + self.ttl
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(descriptor, 'w') as session_file:
+            json.dump(session, session_file, separators=(',', ':'))
+        os.replace(temporary_path, self._path(key))
+        self.stats['saved'] += 1
+        return session
+
+    def restore(self, driver, key, navigate=True, validate=None):
+        '''Restores the session saved under ``key`` in the driver
+
+        Args:
+            driver (selenium.webdriver.): Selenium webdriver to restore the session in.
+            key (str): name of the session.
+            navigate (bool): boolean flag that indicates if the driver has to open the URL the session was saved on.
+            validate (function): validation hook used instead of the store's one.
+
+        Returns:
+            bool: True if the session has been restored and is valid, False if the bot has to log in.
+        '''
+        session = self._read(key)
+        if session is None:
+            self.stats['missing'] += 1
+            return False
+        if self._expired(session):
+            self.stats['expired'] += 1
+            self.delete(key)
+            return False
+        restore_session(driver, session, self.landing_path, navigate)
+        validate = validate or self.validate
+        if validate is not None and not validate(driver):
+            self.stats['invalid'] += 1
+            self.delete(key)
+            driver.delete_all_cookies()
+            return False
+        self.stats['restored'] += 1
+        return True
+
+    def delete(self, key):
+        '''Deletes the session saved under ``key`` if there is one'''
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def purge(self):
+        '''Deletes expired sessions
+
+        Returns:
+            int: number of deleted sessions.
+        '''
+        purged = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path) as session_file:
+                    session = json.load(session_file)
+            except (OSError, ValueError):
+                continue
+            if self._expired(session):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+                purged += 1
+        return purged
@@ -0,0 +1,240 @@
+import atexit
+import http.client
+import logging
+import threading
+import time
+import weakref
+from functools import partial
+from urllib.error import HTTPError
+from urllib.error import URLError
+from urllib.request import urlopen
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.remote.command import Command
+
+from selenium_extensions.core import kill_driver
+from selenium_extensions.core import shut_down
+from selenium_extensions.exceptions import DriverHangException
+from selenium_extensions.hooks import add_command_hook
+from selenium_extensions.hooks import remove_command_hook
+
+
+logger = logging.getLogger(__name__)
+
+_supervisors = weakref.WeakSet()
+
+# Errors meaning the driver or the browser behind it is gone
+CONNECTION_ERRORS = (ConnectionError, URLError, http.client.HTTPException)
+
+
+@atexit.register
+def _kill_supervised_drivers():
+    for supervisor in list(_supervisors):
+        supervisor.kill()
+
+
+class Supervisor:
+    '''Watchdog that kills a hung or crashed driver together with its browser and respawns it
+
+    Every WebDriver command has to finish within ``command_timeout`` seconds (async scripts get their script timeout on top of it). While the driver is idle it is heartbeated every ``heartbeat_interval`` seconds: its process has to be alive and its ``/status`` endpoint has to answer. When either check fails the whole process tree of the driver is killed, its virtual display is released and its cloned profile removed, so nothing is leaked even though ``shut_down`` never ran. Supervised drivers that are still running when the interpreter exits are killed as well.
+
+    The interrupted command raises :class:`selenium_extensions.exceptions.DriverHangException` after the driver has been respawned with the same options and ``restore`` has been replayed, so the bot only has to retry its current step.
+
+    A supervisor watches a single bot, pass a new one to every ``SeleniumDriver``.
+
+    Args:
+        command_timeout (float): time in seconds a single command may take. Has to be longer than the page load timeout.
+        heartbeat_interval (float): time in seconds between heartbeats of an idle driver.
+        heartbeat_timeout (float): time in seconds the driver has to answer a heartbeat in.
+        restore (function): called with the bot after the driver has been respawned, e.g. to log in again or to reopen ``supervisor.last_url``.
+        max_respawns (int): number of respawns after which the supervisor gives up and only raises. If set to ``None`` the driver is always respawned.
+
+    Attributes:
+        respawns (int): number of times the driver has been respawned.
+        last_url (str): last URL the driver was navigated to with ``get``.
+
+    Example:
+        ::
+
+            from selenium_extensions.core import SeleniumDriver
+            from selenium_extensions.exceptions import DriverHangException
+            from selenium_extensions.supervisor import Supervisor
+
+
+            def restore(bot):
+                bot.log_in()
+                bot.driver.get(bot.supervisor.last_url)
+
+
+            bot = MyBot(browser='chrome', run_headless=True,
+                        supervisor=Supervisor(command_timeout=90, restore=restore))
+            for item in items:
+                try:
+                    bot.process(item)
+                except DriverHangException:
+                    bot.process(item)  # the driver has been replaced, retry once
+    '''
+
+    def __init__(self, command_timeout=120, heartbeat_interval=10, heartbeat_timeout=10, restore=None, max_respawns=None):
+        self.command_timeout = command_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.restore = restore
+        self.max_respawns = max_respawns
+        self.respawns = 0
+        self.last_url = None
+        self._lock = threading.Lock()
+        self._driver = None
+        self._hook = None
+        self._respawn = None
+        self._deadline = None
+        self._command = None
+        self._failure = None
+        self._last_heartbeat = 0
+        self._stopped = None
+
+    def supervise(self, driver, respawn=None):
+        '''Starts watching ``driver``, replacing the previously watched one
+
+        Args:
+            driver (selenium.webdriver.): Selenium webdriver to watch.
+            respawn (function): called without arguments to launch a replacement driver, has to call :meth:`supervise` with it and return the object ``restore`` is called with. If set to ``None`` killed drivers are not respawned.
+        '''
+        hook = partial(self._command_hook, driver)
+        with self._lock:
+            self._driver, self._hook, self._respawn = driver, hook, respawn
+            self._deadline, self._command, self._failure = None, None, None
+            self._last_heartbeat = time.time()
+            if self._stopped is None:
+                self._stopped = threading.Event()
+                threading.Thread(target=self._watch, args=(self._stopped,), daemon=True,
+                                 name='selenium-extensions-supervisor').start()
+        add_command_hook(driver, hook)
+        _supervisors.add(self)
+
+    def stop(self):
+        '''Stops watching the driver without touching it'''
+        with self._lock:
+            driver, hook = self._driver, self._hook
+            self._driver, self._hook, self._respawn = None, None, None
+            if self._stopped is not None:
+                self._stopped.set()
+                self._stopped = None
+        if driver is not None:
+            remove_command_hook(driver, hook)
+        _supervisors.discard(self)
+
+    def shut_down(self, driver):
+        '''Shuts the driver down, killing it if it hangs or fails, and stops watching it
+
+        Args:
+            driver (selenium.webdriver.): Selenium webdriver to shut down.
+        '''
+        self._respawn = None
+        try:
+            shut_down(driver)
+        except Exception:
+            kill_driver(driver)
+        finally:
+            self.stop()
+
+    def kill(self):
+        '''Kills the watched driver right away and stops watching it'''
+        driver = self._driver
+        self.stop()
+        if driver is not None:
+            kill_driver(driver)
+
+    def _command_hook(self, driver, execute, command, params):
+        if self._failure is not None and self._driver is driver:
+            self._recover(driver, None)
+        timeout = self.command_timeout
+        if command == Command.EXECUTE_ASYNC_SCRIPT:
+            timeout += getattr(driver, '_se_script_timeout', 0)
+        with self._lock:
+            self._deadline, self._command = time.time() + timeout, command
+        try:
+            result = execute(command, params)
+        except Exception as error:
+            with self._lock:
+                self._deadline = None
+            if self._failure is None and self._driver is driver and self._is_lost(error):
+                self._kill(driver, 'Lost connection to the driver during {!r}: {}'.format(command, error))
+            if self._failure is not None and self._driver is driver:
+                self._recover(driver, error)
+            raise
+        with self._lock:
+            self._deadline = None
+            self._last_heartbeat = time.time()
+        if command == Command.GET:
+            self.last_url = params.get('url')
+        return result
+
+    @staticmethod
+    def _is_lost(error):
+        if isinstance(error, CONNECTION_ERRORS):
+            return True
+        return isinstance(error, WebDriverException) and 'not reachable' in str(error)
+
+    def _recover(self, driver, error):
+        '''Respawns the killed driver, replays ``restore`` and raises ``DriverHangException`` for the interrupted command'''
+        failure, respawn = self._failure, self._respawn
+        if respawn is None:
+            raise DriverHangException(failure) from error
+        if self.max_respawns is not None and self.respawns >= self.max_respawns:
+            self.stop()
+            raise DriverHangException('{} - gave up after {} respawns'.format(failure, self.respawns)) from error
+        self.respawns += 1
+        logger.warning('Respawning the driver (%d): %s', self.respawns, failure)
+        remove_command_hook(driver, self._hook)
+        owner = respawn()
+        if self.restore is not None:
+            self.restore(owner)
+        raise DriverHangException(failure) from error
+
+    def _kill(self, driver, failure):
+        with self._lock:
+            if self._driver is not driver or self._failure is not None:
+                return
+            self._failure = failure
+        logger.error('Killing the driver: %s', failure)
+        try:
+            kill_driver(driver)
+        except Exception:
+            logger.exception('Failed to kill the driver')
+
+    def _watch(self, stopped):
+        while not stopped.wait(min(1, self.heartbeat_interval)):
+            with self._lock:
+                driver, deadline, command = self._driver, self._deadline, self._command
+                if driver is None or self._failure is not None:
+                    continue
+                heartbeat_due = time.time() - self._last_heartbeat >= self.heartbeat_interval
+            if deadline is not None:
+                if time.time() > deadline:
+                    self._kill(driver, '{!r} did not finish in time'.format(command))
+            elif heartbeat_due:
+                failure = self._heartbeat(driver)
+                with self._lock:
+                    self._last_heartbeat = time.time()
+                    # Only an idle driver is expected to answer the heartbeat promptly
+                    idle = self._deadline is None
+                if failure is not None and idle:
+                    self._kill(driver, failure)
+
+    def _heartbeat(self, driver):
+        '''Returns why the driver failed the heartbeat or ``None`` if it is alive'''
+        process = getattr(getattr(driver, 'service', None), 'process', None)
+        if process is not None and process.poll() is not None:
+            return 'The driver process has exited with code {}'.format(process.returncode)
+        url = getattr(driver.command_executor, '_url', None)
+        if url is None:
+            return None
+        try:
+            urlopen(url + '/status', timeout=self.heartbeat_timeout).read()
+        except HTTPError:
+            # Old drivers don't implement /status, but they have answered
+            return None
+        except Exception as error:
+            return 'The driver did not answer the heartbeat: {}'.format(error)
+        return None
@@ -0,0 +1,368 @@
+import queue
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+
+from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.remote.command import Command
+from selenium.webdriver.remote.mobile import Mobile
+from selenium.webdriver.remote.switch_to import SwitchTo
+from selenium.webdriver.remote.webdriver import WebDriver as RemoteWebDriver
+
+from selenium_extensions.core import shut_down
+from selenium_extensions.drivers import create_driver
+from selenium_extensions.exceptions import SeleniumExtensionsException
+from selenium_extensions.monitoring import monitor_resources
+from selenium_extensions.monitoring import resource_usage
+from selenium_extensions.runner import RunResult
+from selenium_extensions.scripts import MARK_NAVIGATION
+from selenium_extensions.scripts import OPEN_TAB
+from selenium_extensions.scripts import READY_STATE
+
+
+# readyState values after which ``get`` of a tab returns, by page load strategy
+READY_STATES = {
+    'normal': ('complete',),
+    'eager': ('interactive', 'complete'),
+    'none': None,
+}
+
+# Response of the commands the pool runs itself
+_SUCCESS = {'status': 0, 'value': None}
+
+# Commands that would affect the other tabs
+_FORBIDDEN_COMMANDS = {
+    Command.SWITCH_TO_WINDOW: 'switch to another window',
+    Command.QUIT: 'quit the browser the other tabs share, return it to its TabPool instead',
+}
+
+
+class _TabExecutor:
+    '''Command executor of a tab, hands the commands over to its pool'''
+
+    def __init__(self, tab_pool, tab):
+        self.tab_pool = tab_pool
+        self.tab = tab
+
+    def execute(self, command, params):
+        return self.tab_pool._execute(self.tab, command, params)
+
+
+class TabDriver(RemoteWebDriver):
+    '''WebDriver of a single tab of the browser shared by a :class:`TabPool`
+
+    A tab is used like a driver of its own. Commands of all of the tabs are serialized by the pool, which switches the browser to the tab before running them. ``get`` only holds the browser while the navigation starts, then the tab polls the page's ``readyState`` and the other tabs run their commands while the page loads. Frames the tab has switched to are switched to again whenever the browser comes back to the tab.
+
+    Tabs have their own command hooks, so element caches, instrumentation and adaptive timeouts attached to a tab don't see the commands of the other tabs. Cookies and ``localStorage`` are shared by all of the tabs, like in any browser.
+
+    Attributes:
+        handle (str): window handle of the tab.
+        index (int): index of the tab in the pool.
+        tab_pool (TabPool): pool the tab belongs to.
+        frames (list): parameters of the frame switches to replay when the browser is switched back to the tab.
+    '''
+
+    def __init__(self, tab_pool, handle, index):
+        # The session is the browser's one, so RemoteWebDriver.__init__, which starts a new session, isn't called
+        browser = tab_pool.driver
+        self.command_executor = _TabExecutor(tab_pool, self)
+        self._is_remote = browser._is_remote
+        self.session_id = browser.session_id
+        self.capabilities = browser.capabilities
+        self.error_handler = browser.error_handler
+        self.w3c = browser.w3c
+        self._web_element_cls = browser._web_element_cls
+        self._switch_to = SwitchTo(self)
+        self._mobile = Mobile(self)
+        self.file_detector = browser.file_detector
+        self.handle = handle
+        self.index = index
+        self.tab_pool = tab_pool
+        self.frames = []
+
+    def __repr__(self):
+        return '<{} {} of {!r}>'.format(type(self).__name__, self.index, self.tab_pool.driver)
+
+
+class TabPool:
+    '''Pool of tabs of a single browser that are leased instead of launching a browser per concurrent task
+
+    Every browser costs hundreds of megabytes, tabs of one browser share most of it. The browser is launched with :func:`selenium_extensions.drivers.create_driver` and ``size`` tabs are opened in it. Tabs are leased like the drivers of :class:`selenium_extensions.pool.DriverPool`, so ``SeleniumDriver(pool=tab_pool)`` drives a tab, and :meth:`run` processes work items with a bot per tab in threads.
+
+    The browser runs one command at a time, so tabs overlap page loads and waits rather than commands. Waits of the ``in_page`` helpers poll instead of waiting inside the page, which would hold the browser for the whole wait.
+
+    Args:
+        size (int): number of tabs.
+        browser ('chrome', 'firefox' or 'fake'): webdriver to use.
+        page_load_strategy ('normal', 'eager' or 'none'): when ``get`` of a tab returns - after the ``load`` event, after ``DOMContentLoaded`` or right after the navigation has started. The browser itself is launched with ``none``, so that page loads don't hold it.
+        page_load_timeout (float): time in seconds ``get`` of a tab waits for the page.
+        **driver_options: keyword arguments passed to :func:`selenium_extensions.drivers.create_driver`.
+
+    Attributes:
+        driver (selenium.webdriver.): driver of the browser. Don't use it while tabs are leased.
+
+    Example:
+        ::
+
+            from selenium_extensions.core import SeleniumDriver
+            from selenium_extensions.tabs import TabPool
+
+
+            class TitleBot(SeleniumDriver):
+
+                def process_item(self, url):
+                    self.driver.get(url)
+                    return self.driver.title
+
+
+            with TabPool(size=8, browser='chrome', run_headless=True) as tabs:
+                for result in tabs.run(TitleBot, urls, element_cache=True):
+                    print(result.item, result.result or result.error)
+    '''
+
+    def __init__(self, size=4, browser='chrome', page_load_strategy='normal', page_load_timeout=30, **driver_options):
+        if page_load_strategy not in READY_STATES:
+            raise SeleniumExtensionsException('Unsupported page load strategy: {}'.format(page_load_strategy))
+        self.size = size
+        self.page_load_strategy = page_load_strategy
+        self.page_load_timeout = page_load_timeout
+        self.driver = create_driver(browser, page_load_strategy='none', **driver_options)
+        monitor_resources(self.driver)
+        self._lock = threading.Lock()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._leased = {}
+        with self._lock:
+            self._current = self.driver.current_window_handle
+            handles = [self._current] + [self._open_tab() for _ in range(size - 1)]
+        self._idle = [TabDriver(self, handle, index) for index, handle in enumerate(handles)]
+
+    def _open_tab(self):
+        '''Opens a tab and returns its handle. Must be called with the lock held.'''
+        handles = self.driver.window_handles
+        if self._current not in handles:
+            self.driver.switch_to.window(handles[0])
+            self._current = handles[0]
+        self.driver.execute_script(OPEN_TAB)
+        opened = [handle for handle in self.driver.window_handles if handle not in handles]
+        if not opened:
+            raise SeleniumExtensionsException('The browser didn\'t open a new tab')
+        return opened[0]
+
+    def _activate(self, tab):
+        '''Switches the browser to ``tab`` and its frames. Must be called with the lock held.'''
+        if self._current == tab.handle:
+            return
+        self.driver.switch_to.window(tab.handle)
+        self._current = tab.handle
+        for frame in tab.frames:
+            self._send(Command.SWITCH_TO_FRAME, frame, check=True)
+
+    def _send(self, command, params, check=False):
+        '''Sends a command of a tab to the browser bypassing the browser driver, so elements are bound to the tab'''
+        response = self.driver.command_executor.execute(command, params)
+        if check and response:
+            self.driver.error_handler.check_response(response)
+        return response
+
+    def _succeeded(self, response):
+        try:
+            if response:
+                self.driver.error_handler.check_response(response)
+            return True
+        except WebDriverException:
+            return False
+
+    def _execute(self, tab, command, params):
+        if command in _FORBIDDEN_COMMANDS:
+            raise SeleniumExtensionsException('A tab can\'t {}'.format(_FORBIDDEN_COMMANDS[command]))
+        if command == Command.GET:
+            return self._load(tab, params)
+        with self._lock:
+            self._activate(tab)
+            response = self._send(command, params)
+            if command == Command.CLOSE:
+                self._current = None
+            elif command == Command.SWITCH_TO_FRAME and self._succeeded(response):
+                tab.frames = [] if params.get('id') is None else tab.frames + [params]
+            elif command == Command.SWITCH_TO_PARENT_FRAME and self._succeeded(response):
+                tab.frames = tab.frames[:-1]
+        return response
+
+    def _load(self, tab, params):
+        '''Starts loading the page in ``tab`` and waits for it without holding the browser'''
+        deadline = time.time() + self.page_load_timeout
+        with self._lock:
+            self._activate(tab)
+            try:
+                self.driver.execute_script(MARK_NAVIGATION)
+            except WebDriverException:
+                # E.g. an error page, which gets replaced anyway
+                pass
+            # Through the browser driver, so its hooks count the page loads
+            self.driver.get(params['url'])
+            tab.frames = []
+        ready_states = READY_STATES[self.page_load_strategy]
+        if ready_states is None:
+            return dict(_SUCCESS)
+        step = 0.01
+        while True:
+            with self._lock:
+                self._activate(tab)
+                state = self.driver.execute_script(READY_STATE)
+            if state in ready_states:
+                return dict(_SUCCESS)
+            if time.time() >= deadline:
+                raise TimeoutException('Timeout loading {} in tab {}'.format(params['url'], tab.index))
+            time.sleep(step)
+            step = min(step * 1.5, 0.25)
+
+    def checkout(self, timeout=None):
+        '''Leases a tab from the pool
+
+        Args:
+            timeout (float): time in seconds to wait for a free tab. If set to ``None`` waits forever.
+
+        Returns:
+            TabDriver: leased tab.
+
+        Raises:
+            selenium_extensions.exceptions.SeleniumExtensionsException: the pool is closed or no tab became available in ``timeout`` seconds.
+        '''
+        deadline = None if timeout is None else time.time() + timeout
+        with self._condition:
+            while not self._idle:
+                if self._closed:
+                    raise SeleniumExtensionsException('Tab pool is closed')
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    raise SeleniumExtensionsException('Timeout waiting for a free tab in the pool')
+                self._condition.wait(remaining)
+            if self._closed:
+                raise SeleniumExtensionsException('Tab pool is closed')
+            tab = self._idle.pop()
+            self._leased[tab.index] = tab
+        return tab
+
+    def checkin(self, tab):
+        '''Returns a leased tab to the pool
+
+        The tab is navigated to ``about:blank`` and comes back as a new :class:`TabDriver` without the hooks and the state of the previous lease. A tab that has been closed is replaced by a new one.
+
+        Args:
+            tab (TabDriver): tab previously leased with :meth:`checkout`.
+
+        Raises:
+            selenium_extensions.exceptions.SeleniumExtensionsException: ``tab`` wasn't leased from this pool.
+        '''
+        with self._condition:
+            if self._leased.get(tab.index) is not tab:
+                raise SeleniumExtensionsException('Tab {!r} wasn\'t leased from this pool'.format(tab))
+            del self._leased[tab.index]
+            if self._closed:
+                return
+        handle = tab.handle
+        try:
+            self._load(tab, {'sessionId': self.driver.session_id, 'url': 'about:blank'})
+        except WebDriverException:
+            with self._lock:
+                handle = self._open_tab()
+        with self._condition:
+            self._idle.append(TabDriver(self, handle, tab.index))
+            self._condition.notify()
+
+    @contextmanager
+    def lease(self, timeout=None):
+        '''Context manager that leases a tab and returns it to the pool on exit
+
+        Args:
+            timeout (float): time in seconds to wait for a free tab.
+        '''
+        tab = self.checkout(timeout)
+        try:
+            yield tab
+        finally:
+            self.checkin(tab)
+
+    def run(self, bot_class, items, method='process_item', **bot_options):
+        '''Processes ``items`` with a ``bot_class`` bot on every tab and yields :class:`selenium_extensions.runner.RunResult` in the order of completion
+
+        Every bot runs in its own thread and is created with ``pool`` set to this pool, the rest of the browser options are ignored. Bots are shut down, i.e. their tabs are returned, when all of the items have been processed or the generator is closed.
+
+        Args:
+            bot_class (type): ``selenium_extensions.core.SeleniumDriver`` subclass to run.
+            items (iterable): work items, consumed lazily.
+            method (str): name of the ``bot_class`` method that processes a single item.
+            **bot_options: keyword arguments passed to ``bot_class``, e.g. ``element_cache`` or ``adaptive_timeouts``.
+
+        Yields:
+            selenium_extensions.runner.RunResult: result of processing a single item, ``worker`` is the index of the tab.
+
+        Raises:
+            selenium_extensions.exceptions.SeleniumExtensionsException: ``bot_class`` instance couldn't be created.
+        '''
+        items = iter(items)
+        items_lock = threading.Lock()
+        results = queue.Queue()
+        stop = threading.Event()
+
+        def work():
+            try:
+                bot = bot_class(pool=self, **bot_options)
+            except Exception:
+                results.put(('failed', traceback.format_exc()))
+                return
+            try:
+                while not stop.is_set():
+                    with items_lock:
+                        try:
+                            item = next(items)
+                        except StopIteration:
+                            break
+                    start = time.time()
+                    try:
+                        result, error = getattr(bot, method)(item), None
+                    except Exception:
+                        result, error = None, traceback.format_exc()
+                    results.put(('done', RunResult(item, result, error, bot.driver.index, time.time() - start)))
+            finally:
+                bot.shut_down()
+                results.put(('stopped', None))
+
+        workers = [threading.Thread(target=work, daemon=True) for _ in range(self.size)]
+        for worker in workers:
+            worker.start()
+        running = len(workers)
+        try:
+            while running:
+                kind, payload = results.get()
+                if kind == 'failed':
+                    raise SeleniumExtensionsException('Tab worker failed to start:\n{}'.format(payload))
+                if kind == 'stopped':
+                    running -= 1
+                    continue
+                yield payload
+        finally:
+            stop.set()
+            for worker in workers:
+                worker.join()
+
+    def resource_usage(self):
+        '''Measures resources used by the browser with all of its tabs, see :func:`selenium_extensions.monitoring.resource_usage`'''
+        return resource_usage(self.driver)
+
+    def close(self):
+        '''Shuts the browser down. Leased tabs stop working.'''
+        with self._condition:
+            self._closed = True
+            self._idle = []
+            self._condition.notify_all()
+        shut_down(self.driver)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
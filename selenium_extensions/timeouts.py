@@ -0,0 +1,257 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from functools import partial
+from urllib.parse import urlsplit
+
+from selenium.common.exceptions import TimeoutException
+
+from selenium_extensions.hooks import add_command_hook
+
+
+# Waiting time of the wait helpers of drivers without adaptive timeouts
+DEFAULT_WAITING_TIME = 2
+
+# Locator key the waits of all of the locators of a domain are pooled under
+ANY_LOCATOR = '*'
+
+
+def locator_key(element_locators):
+    '''Returns the key waits for an element locator, or for any of a list of them, are learned under'''
+    if isinstance(element_locators[0], str):
+        element_locators = [element_locators]
+    return ' | '.join('{}={}'.format(by, value) for by, value in element_locators)
+
+
+def _track_domain(driver, execute, command, params):
+    '''Command hook that remembers the domain of the page the driver has opened last'''
+    result = execute(command, params)
+    if command == 'get':
+        driver._se_domain = urlsplit(params['url']).hostname or ''
+    elif command == 'getCurrentUrl' and isinstance(result, dict) and isinstance(result.get('value'), str):
+        driver._se_domain = urlsplit(result['value']).hostname or ''
+    return result
+
+
+class AdaptiveTimeouts:
+    '''Waiting times of the wait helpers learned per domain and locator from past waits
+
+    Once attached to a driver, :func:`selenium_extensions.core.element_is_present`, :func:`selenium_extensions.core.wait_for_element_to_be_present`, :func:`selenium_extensions.core.wait_for_element_to_be_clickable` and :func:`selenium_extensions.core.wait_for_any_element` called without ``waiting_time`` wait for the ``percentile`` of the times the locator took to appear on the domain, multiplied by ``margin`` and kept between ``min_timeout`` and ``max_timeout``. Locators with fewer than ``min_samples`` successful waits use the distribution of all of the locators of the domain, and ``default`` until the domain has enough samples as well. Explicit ``waiting_time`` is always respected, but the wait is still learned from.
+
+    The domain is the one of the page opened last with ``driver.get``, so it's known without extra WebDriver calls. Only successful waits are learned from, timeouts are counted in :attr:`stats`:
+
+    - ``waits`` - recorded waits, ``adaptive_waits`` of them used a learned timeout.
+    - ``timeouts`` - waits that timed out.
+    - ``rescued`` - adaptive waits that succeeded after the default waiting time would have run out.
+    - ``saved_seconds`` - waiting time adaptive waits saved compared to the default waiting time: the difference for every adaptive wait that timed out, less the time rescued waits waited beyond the default. It's negative if slow sites needed longer timeouts than the default.
+
+    A timed-out wait can't tell a slow element from an absent one, so it isn't learned from. Once a wait for a locator without samples of its own times out, the locator stops using the distribution of the domain and waits for ``default`` until it has ``min_samples`` successful waits - an element slower than the rest of the domain isn't missed on every page.
+
+    Args:
+        percentile (float): percentile of the observed wait times, between 0 and 1.
+        margin (float): factor the percentile is multiplied by.
+        min_timeout (float): lower bound of learned timeouts in seconds.
+        max_timeout (float): upper bound of learned timeouts in seconds.
+        default (float): timeout in seconds used until enough waits have been observed.
+        min_samples (int): number of successful waits needed to use the learned timeout.
+        window (int): number of the latest wait times kept per locator and domain.
+        path (str): JSON file the learned wait times are loaded from, if it exists, and saved to by :meth:`save`.
+        save_interval (float): time in seconds after which a wait saves the learned wait times automatically. If set to ``None`` they're saved only by calling :meth:`save`.
+
+    Attributes:
+        stats (dict): outcome of the recorded waits, see above.
+
+    Example:
+        ::
+
+            from selenium.webdriver.common.by import By
+            from selenium_extensions.core import SeleniumDriver
+            from selenium_extensions.timeouts import AdaptiveTimeouts
+
+
+            timeouts = AdaptiveTimeouts(percentile=0.99, max_timeout=20, path='timeouts.json', save_interval=60)
+            bot = SeleniumDriver(browser='chrome', adaptive_timeouts=timeouts)
+            bot.driver.get('https://example.com/')
+            if bot.element_is_present((By.ID, 'captcha')):  # waits as long as the element usually takes
+                ...
+            print(timeouts.report()['learned'])
+    '''
+
+    def __init__(self, percentile=0.95, margin=1.5, min_timeout=0.5, max_timeout=30, default=DEFAULT_WAITING_TIME,
+                 min_samples=20, window=200, path=None, save_interval=None):
+        self.percentile = percentile
+        self.margin = margin
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.default = default
+        self.min_samples = min_samples
+        self.window = window
+        self.path = path
+        self.save_interval = save_interval
+        self.stats = {'waits': 0, 'adaptive_waits': 0, 'timeouts': 0, 'rescued': 0, 'saved_seconds': 0.0}
+        self._samples = {}
+        # Locators without samples of their own that timed out, they don't use the domain's distribution
+        self._timed_out = set()
+        self._lock = threading.Lock()
+        self._last_save = time.time()
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def attach(self, driver):
+        '''Makes the wait helpers called with ``driver`` use and learn the timeouts
+
+        Args:
+            driver (selenium.webdriver.): Selenium webdriver to attach to.
+        '''
+        if not hasattr(driver, '_se_timeouts'):
+            driver._se_domain = ''
+            add_command_hook(driver, partial(_track_domain, driver))
+        driver._se_timeouts = self
+
+    def timeout(self, domain, key, default=None):
+        '''Returns the waiting time in seconds for the locator ``key`` on ``domain``
+
+        Args:
+            domain (str): domain of the page.
+            key (str): locator key returned by :func:`locator_key`.
+            default (float): timeout used until enough waits have been observed, the store's ``default`` if not provided.
+        '''
+        with self._lock:
+            samples = self._samples.get((domain, key))
+            if samples is None or len(samples) < self.min_samples:
+                if (domain, key) in self._timed_out:
+                    return self.default if default is None else default
+                samples = self._samples.get((domain, ANY_LOCATOR))
+            if samples is None or len(samples) < self.min_samples:
+                return self.default if default is None else default
+            ordered = sorted(samples)
+        value = ordered[max(int(math.ceil(self.percentile * len(ordered))) - 1, 0)]
+        return min(max(value * self.margin, self.min_timeout), self.max_timeout)
+
+    def wait(self, driver, key, waiting_time, wait, default=None):
+        '''Calls ``wait(timeout)`` with the learned timeout unless ``waiting_time`` is provided and records the outcome
+
+        Args:
+            driver (selenium.webdriver.): Selenium webdriver the wait is done with.
+            key (str): locator key returned by :func:`locator_key`.
+            waiting_time (float): explicit waiting time in seconds or ``None`` to use the learned one.
+            wait (function): does the wait, returns ``False`` or raises ``TimeoutException`` if it timed out.
+            default (float): waiting time the caller would use without adaptive timeouts, the store's ``default`` if not provided.
+
+        Returns:
+            value returned by ``wait``.
+        '''
+        default = self.default if default is None else default
+        domain = getattr(driver, '_se_domain', '')
+        adaptive = waiting_time is None
+        if adaptive:
+            waiting_time = self.timeout(domain, key, default)
+        start = time.time()
+        try:
+            result = wait(waiting_time)
+        except TimeoutException:
+            self._record(domain, key, adaptive, waiting_time, default, False, time.time() - start)
+            raise
+        self._record(domain, key, adaptive, waiting_time, default, result is not False, time.time() - start)
+        return result
+
+    def wait_for_function_truth(self, driver, condition_function, *args, key=None, time_to_wait=None, **kwargs):
+        ''':func:`selenium_extensions.helpers.wait_for_function_truth` with a timeout learned for ``key`` on the driver's domain
+
+        Args:
+            driver (selenium.webdriver.): Selenium webdriver the condition depends on.
+            condition_function (function): function to wait for.
+            *args: arguments that should be applied to the function.
+            key (str): name the waits are learned under, the name of ``condition_function`` by default.
+            time_to_wait (float): explicit time in seconds to wait or ``None`` to use the learned one, 10 seconds until it's learned.
+            **kwargs: ``time_step``, ``backoff`` and ``max_time_step`` of ``wait_for_function_truth``.
+
+        Returns:
+            bool: True if the condition came true in time.
+
+        Raises:
+            selenium.common.exceptions.TimeoutException: timeout waiting for the condition.
+        '''
+        from selenium_extensions.helpers import wait_for_function_truth
+
+        return self.wait(driver, key or condition_function.__name__, time_to_wait,
+                         lambda timeout: wait_for_function_truth(condition_function, *args,
+                                                                 time_to_wait=timeout, **kwargs),
+                         default=10)
+
+    def _record(self, domain, key, adaptive, waiting_time, default, succeeded, elapsed):
+        with self._lock:
+            self.stats['waits'] += 1
+            if adaptive:
+                self.stats['adaptive_waits'] += 1
+            if succeeded:
+                for sample_key in ((domain, key), (domain, ANY_LOCATOR)):
+                    samples = self._samples.get(sample_key)
+                    if samples is None:
+                        samples = self._samples[sample_key] = deque(maxlen=self.window)
+                    samples.append(round(elapsed, 3))
+                if adaptive and elapsed > default:
+                    self.stats['rescued'] += 1
+                    self.stats['saved_seconds'] -= elapsed - default
+            else:
+                self.stats['timeouts'] += 1
+                if adaptive:
+                    self.stats['saved_seconds'] += default - waiting_time
+                samples = self._samples.get((domain, key))
+                if samples is None or len(samples) < self.min_samples:
+                    self._timed_out.add((domain, key))
+        if self.path is not None and self.save_interval is not None and \
+                time.time() - self._last_save >= self.save_interval:
+            self.save()
+
+    def report(self):
+        '''Returns :attr:`stats` together with the learned timeouts
+
+        Returns:
+            dict: :attr:`stats` and ``learned`` - list of dicts with ``domain``, ``locator``, ``samples`` and ``timeout`` for every locator with enough samples.
+        '''
+        with self._lock:
+            report = dict(self.stats)
+            counts = [(domain, key, len(samples)) for (domain, key), samples in self._samples.items()
+                      if len(samples) >= self.min_samples]
+        report['learned'] = [{'domain': domain, 'locator': key, 'samples': count, 'timeout': self.timeout(domain, key)}
+                             for domain, key, count in sorted(counts)]
+        return report
+
+    def load(self, path):
+        '''Adds wait times saved by :meth:`save` to the learned ones
+
+        Args:
+            path (str): JSON file to load.
+        '''
+        with open(path) as samples_file:
+            saved = json.load(samples_file)
+        with self._lock:
+            for domain, key, times in saved['samples']:
+                samples = self._samples.get((domain, key))
+                if samples is None:
+                    samples = self._samples[(domain, key)] = deque(maxlen=self.window)
+                samples.extend(times)
+            self._timed_out.update((domain, key) for domain, key in saved.get('timed_out', []))
+
+    def save(self, path=None):
+        '''Saves the learned wait times, so the next run starts with them
+
+        Args:
+            path (str): JSON file to write, ``path`` of the store by default.
+        '''
+        import tempfile
+
+        path = path or self.path
+        with self._lock:
+            self._last_save = time.time()
+            saved = {'samples': [[domain, key, list(samples)] for (domain, key), samples in self._samples.items()],
+                     'timed_out': [[domain, key] for domain, key in sorted(self._timed_out)]}
+        directory = os.path.dirname(os.path.abspath(path))
+        descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(descriptor, 'w') as samples_file:
+            json.dump(saved, samples_file, separators=(',', ':'))
+        os.replace(temporary_path, path)